@@ -0,0 +1,239 @@
+"""
+dispatch latency benchmark of the SFS, UNIX, INET and NOF transports, spawning trivial runners (benchmarks/runner.py)
+locally through the ZSHSubmit* classes (or NOFDispatcher). the fork transport is SFS with the runners forked from a
+fork server that preloaded pubtk (see pubtk.runtk.zygotes), rather than started from a new interpreter.
+
+measures, per transport:
+    phases     - time in create_job, submit_job, accept (runner startup + connect) and recv (result) of single trials
+    roundtrip  - send / recv round trip latency for payloads from 100 B to 100 MB (sockets, through an echo runner),
+                 the time to collect a result of that size for SFS and NOF
+    throughput - trials per second with 1 / 16 / 256 trials in flight
+    compression - (SFS and sockets) time to collect json spike rasters of each size with and without zlib compression
+                  (see --compress), with the bytes saved and the CPU time spent compressing / decompressing
+results are written as json (--output) so that regressions can be caught between releases (--baseline).
+
+use:
+    python benchmarks/bench_dispatch.py --output dispatch.json
+    python benchmarks/bench_dispatch.py --transports inet unix --sizes 100 1000000 --concurrency 1 16
+    python benchmarks/bench_dispatch.py --transports sfs inet --compress 4096
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pubtk import runtk
+from pubtk.runtk.dispatchers import SFSDispatcher, UNIXDispatcher, INETDispatcher, NOFDispatcher
+from pubtk.runtk.submits import ZSHSubmitSFS, ZSHSubmitSOCK, ZSHForkSubmitSFS
+from pubtk.runtk.zygotes import ForkClient, start_fork_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNNER = os.path.join(ROOT, 'benchmarks', 'runner.py')
+COMMAND = "{} {}".format(sys.executable, RUNNER)
+
+TRANSPORTS = {
+    'sfs': (SFSDispatcher, ZSHSubmitSFS),
+    'fork': (SFSDispatcher, ZSHForkSubmitSFS),
+    'unix': (UNIXDispatcher, ZSHSubmitSOCK),
+    'inet': (INETDispatcher, ZSHSubmitSOCK),
+    'nof': (NOFDispatcher, None),
+}
+SIZES = [100, 10 ** 4, 10 ** 6, 10 ** 8]
+CONCURRENCY = [1, 16, 256]
+
+
+FORK_SERVER = os.path.join(tempfile.gettempdir(), 'bench_dispatch.{}.s'.format(os.getpid()))
+
+def get_submit(submit_constructor, shell):
+    submit = submit_constructor(socket_name=FORK_SERVER)
+    submit.submit_template.template = "{} {{output_path}}/{{label}}.sh".format(shell)
+    submit.update_templates(command=COMMAND)
+    return submit
+
+def get_dispatcher(transport, path, label, shell, compress=None):
+    dispatcher_constructor, submit_constructor = TRANSPORTS[transport]
+    if transport == 'nof':
+        return dispatcher_constructor(cmdstr=COMMAND, env={'PYTHONPATH': ROOT}, gid=label)
+    dispatcher = dispatcher_constructor(project_path=path, submit=get_submit(submit_constructor, shell), gid=label,
+                                        compress=compress)
+    dispatcher.update_env({'PYTHONPATH': ROOT}, format=False)
+    return dispatcher
+
+def trial(transport, path, label, shell, mappings, compress=None):
+    """
+    Returns
+    -------
+    (data, {phase: seconds}) of a single trial
+    """
+    dispatcher = get_dispatcher(transport, path, label, shell, compress)
+    dispatcher.update_env(mappings)
+    phases = {}
+    start = time.perf_counter()
+    if transport == 'nof':
+        data = dispatcher.run().stdout
+        phases['run'] = time.perf_counter() - start
+        return data, phases
+    dispatcher.create_job()
+    phases['create_job'] = time.perf_counter() - start
+    mark = time.perf_counter()
+    dispatcher.submit_job()
+    phases['submit_job'] = time.perf_counter() - mark
+    mark = time.perf_counter()
+    dispatcher.accept()
+    phases['accept'] = time.perf_counter() - mark
+    mark = time.perf_counter()
+    data = dispatcher.recv()
+    phases['recv'] = time.perf_counter() - mark
+    dispatcher.clean(list(dispatcher.handles))
+    phases['total'] = time.perf_counter() - start
+    return data, phases
+
+def bench_phases(transport, path, shell, repeat):
+    samples = [trial(transport, path, "phases_{}_{}".format(transport, i), shell, {'payload': i})[1]
+               for i in range(repeat)]
+    return {'transport': transport, 'repeat': repeat,
+            'phases': {phase: summarize([sample[phase] for sample in samples]) for phase in samples[0]}}
+
+def bench_roundtrip(transport, path, shell, size, repeat):
+    if transport in ('sfs', 'fork', 'nof'): # unidirectional, time to collect a result of size bytes
+        samples = []
+        for i in range(repeat):
+            data, phases = trial(transport, path, "result_{}_{}_{}".format(transport, size, i), shell, {'size': size})
+            assert len(data) == size
+            samples.append(phases['run' if transport == 'nof' else 'recv'])
+        return {'transport': transport, 'size': size, 'mode': 'result', 'latency': summarize(samples)}
+    dispatcher = get_dispatcher(transport, path, "roundtrip_{}_{}".format(transport, size), shell)
+    dispatcher.update_env({'echo': 1, 'payload': 'done'})
+    dispatcher.run()
+    dispatcher.accept()
+    payload = 'x' * size
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        dispatcher.send(payload)
+        data = dispatcher.recv()
+        samples.append(time.perf_counter() - start)
+        assert len(data) == size
+    dispatcher.release()
+    assert dispatcher.recv() == 'done'
+    dispatcher.clean(list(dispatcher.handles))
+    return {'transport': transport, 'size': size, 'mode': 'roundtrip', 'latency': summarize(samples),
+            'bandwidth': 2 * size / statistics.median(samples)}
+
+def bench_throughput(transport, path, shell, concurrency, trials):
+    trials = max(trials, concurrency)
+    def run(i):
+        data, phases = trial(transport, path, "throughput_{}_{}_{}".format(transport, concurrency, i), shell,
+                             {'payload': i})
+        assert data == str(i), data
+        return phases
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(run, range(trials)))
+    total = time.perf_counter() - start
+    return {'transport': transport, 'concurrency': concurrency, 'trials': trials, 'total': total,
+            'trials_per_sec': trials / total,
+            'latency': summarize([sample.get('total', sample.get('run')) for sample in samples])}
+
+def bench_compression(transport, path, shell, size, repeat, threshold):
+    latency = {}
+    for compress in (None, threshold):
+        samples = []
+        for i in range(repeat):
+            data, phases = trial(transport, path, "raster_{}_{}_{}_{}".format(transport, size, compress, i), shell,
+                                 {'raster': size}, compress)
+            samples.append(phases['recv'])
+        latency['on' if compress is not None else 'off'] = summarize(samples)
+    raw = data.encode()
+    start = time.process_time()
+    compressed = zlib.compress(raw, runtk.ZLIB_LEVEL)
+    compress_cpu = time.process_time() - start
+    start = time.process_time()
+    zlib.decompress(compressed)
+    decompress_cpu = time.process_time() - start
+    saved = len(raw) - len(compressed) if len(raw) >= threshold else 0
+    return {'transport': transport, 'size': len(raw), 'threshold': threshold,
+            'compressed_bytes': len(raw) - saved, 'saved_bytes': saved, 'compress_cpu': compress_cpu,
+            'decompress_cpu': decompress_cpu, 'latency': latency}
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {'mean': statistics.fmean(samples), 'median': statistics.median(samples), 'min': samples[0],
+            'max': samples[-1], 'p95': samples[min(int(len(samples) * 0.95), len(samples) - 1)]}
+
+def get_medians(results):
+    medians = {}
+    for result in results['phases']:
+        for phase, summary in result['phases'].items():
+            medians["phases/{}/{}".format(result['transport'], phase)] = summary['median']
+    for result in results['roundtrip']:
+        medians["roundtrip/{}/{}".format(result['transport'], result['size'])] = result['latency']['median']
+    for result in results['throughput']:
+        medians["throughput/{}/{}".format(result['transport'], result['concurrency'])] = result['latency']['median']
+    for result in results.get('compression', []):
+        for mode, summary in result['latency'].items():
+            medians["compression/{}/{}/{}".format(result['transport'], result['size'], mode)] = summary['median']
+    return medians
+
+def compare(results, baseline, tolerance):
+    """
+    Returns
+    -------
+    list of (key, baseline, current) median latencies that regressed by more than tolerance (fraction)
+    """
+    current, previous = get_medians(results), get_medians(baseline)
+    return [(key, previous[key], current[key]) for key in current
+            if key in previous and current[key] > previous[key] * (1 + tolerance)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transports', nargs='+', default=list(TRANSPORTS), choices=list(TRANSPORTS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES, help='payload sizes (bytes)')
+    parser.add_argument('--concurrency', nargs='+', type=int, default=CONCURRENCY, help='trials in flight')
+    parser.add_argument('--trials', type=int, default=64, help='trials per throughput measurement (at least concurrency)')
+    parser.add_argument('--repeat', type=int, default=5, help='samples per phase / payload measurement')
+    parser.add_argument('--compress', type=int, default=4096,
+                        help='compression threshold (bytes) of the compression measurements')
+    parser.add_argument('--shell', default=shutil.which('zsh') or 'sh', help='shell running the ZSHSubmit scripts')
+    parser.add_argument('--output', help='*Optional* json file to write the results to, defaults to stdout')
+    parser.add_argument('--baseline', help='*Optional* json results of a previous run, exits 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown (fraction) vs. --baseline')
+    args = parser.parse_args()
+    results = {'meta': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+                        'shell': args.shell, 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+               'phases': [], 'roundtrip': [], 'throughput': [], 'compression': []}
+    server = 'fork' in args.transports and start_fork_server(FORK_SERVER, preload=['pubtk.runtk'],
+                                                             env=os.environ | {'PYTHONPATH': ROOT})
+    with tempfile.TemporaryDirectory() as path:
+        for transport in args.transports:
+            results['phases'].append(bench_phases(transport, path, args.shell, args.repeat))
+            results['roundtrip'].extend(bench_roundtrip(transport, path, args.shell, size, args.repeat)
+                                        for size in args.sizes)
+            results['throughput'].extend(bench_throughput(transport, path, args.shell, concurrency, args.trials)
+                                         for concurrency in args.concurrency)
+            if transport != 'nof': # results are read from stdout
+                results['compression'].extend(bench_compression(transport, path, args.shell, size, args.repeat,
+                                                                args.compress) for size in args.sizes)
+    if server:
+        ForkClient(FORK_SERVER).stop()
+        server.wait()
+    if args.output:
+        with open(args.output, 'w') as fptr:
+            json.dump(results, fptr, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.baseline:
+        with open(args.baseline, 'r') as fptr:
+            regressions = compare(results, json.load(fptr), args.tolerance)
+        for key, previous, current in regressions:
+            print("regression {}: {:.6f}s -> {:.6f}s".format(key, previous, current), file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
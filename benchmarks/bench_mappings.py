@@ -0,0 +1,64 @@
+"""
+benchmark of runner startup with many exported mappings, the eager decode (every mapping deserialized on the first
+access of Runner.mappings, untyped mappings inferred by trying each converter) vs. the lazy decode (Runner, lazy=True,
+each mapping deserialized on its first access) with and without a declared schema (Runner, schema={path: type})
+
+use:
+    python benchmarks/bench_mappings.py --mappings 10000 --reads 10
+"""
+import argparse
+import json
+import time
+from pubtk.runtk.runners import Runner
+
+def get_env(mappings, untyped):
+    env, schema = {}, {}
+    for i in range(mappings):
+        kind = i % 3
+        value = [i * 0.5, 'FLOAT', float] if kind == 0 else [i, 'INT', int] if kind == 1 else \
+            [json.dumps({'weight': i, 'delay': 1.5}), 'JSON', dict]
+        path = 'cfg.param{}'.format(i)
+        prefix = '' if i < mappings * untyped else value[1] # untyped mappings are inferred without a schema
+        env["{}RUNTK{}".format(prefix, i)] = "{}={}".format(path, value[0])
+        schema[path] = value[2]
+    return env, schema
+
+def bench(label, env, reads, repeat, **kwargs):
+    times = {'init': [], 'read': [], 'all': []}
+    paths = ['cfg.param{}'.format(i) for i in range(reads)]
+    for _ in range(repeat):
+        start = time.perf_counter()
+        runner = Runner(env=env, **kwargs)
+        times['init'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        mappings = runner.mappings
+        [mappings[path] for path in paths]
+        times['read'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        dict(mappings.items())
+        times['all'].append(time.perf_counter() - start)
+    return {'mode': label, 'init': min(times['init']), 'read': min(times['read']), 'all': min(times['all'])}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mappings', type=int, default=10000, help='the number of exported mappings')
+    parser.add_argument('--reads', type=int, default=10, help='the number of mappings read by the trial')
+    parser.add_argument('--untyped', type=float, default=0.5, help='the fraction of untyped (inferred) mappings')
+    parser.add_argument('--repeat', type=int, default=5, help='the best of repeat runs is reported')
+    parser.add_argument('--json', action='store_true', help='print results as json')
+    args = parser.parse_args()
+    env, schema = get_env(args.mappings, args.untyped)
+    results = [bench('eager', env, args.reads, args.repeat),
+               bench('eager+schema', env, args.reads, args.repeat, schema=schema),
+               bench('lazy', env, args.reads, args.repeat, lazy=True),
+               bench('lazy+schema', env, args.reads, args.repeat, lazy=True, schema=schema)]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print("{:<14}{:>12}{:>22}{:>22}".format('mode', 'init (ms)', 'first reads (ms)', 'remaining reads (ms)'))
+    for result in results:
+        print("{:<14}{:>12.2f}{:>22.2f}{:>22.2f}".format(
+            result['mode'], result['init'] * 1e3, result['read'] * 1e3, result['all'] * 1e3))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+dispatch throughput and end-to-end latency of each dispatcher type against the local scheduler emulator
+(see pubtk.runtk.emulators), measuring the overhead of pubtk itself without a live cluster.
+
+for every transport, jobs trials are dispatched concurrently (create_job, qsub/sbatch, accept, recv, clean) with the
+trivial benchmarks/runner.py, the emulator runs them on slots local slots after latency seconds of queue wait.
+
+use:
+    python benchmarks/bench_scheduler.py --jobs 64 --slots 8 --latency 0.1 --json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pubtk.runtk.emulators import SchedulerEmulator
+from pubtk.runtk.dispatchers import SFSDispatcher, SFSArrayDispatcher, INETDispatcher, UNIXDispatcher
+from pubtk.runtk.submits import SGESubmitSFS, SGESubmitSOCK, SGEArraySubmit, SLURMSubmitSFS, SLURMSubmitSOCK
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNNER = os.path.join(ROOT, 'benchmarks', 'runner.py')
+
+TRANSPORTS = {
+    'sge-sfs': (SFSDispatcher, SGESubmitSFS),
+    'sge-inet': (INETDispatcher, SGESubmitSOCK),
+    'sge-unix': (UNIXDispatcher, SGESubmitSOCK),
+    'slurm-sfs': (SFSDispatcher, SLURMSubmitSFS),
+    'slurm-inet': (INETDispatcher, SLURMSubmitSOCK),
+}
+
+def get_submit(submit_constructor):
+    submit = submit_constructor()
+    submit.update_templates(command="{} {}".format(sys.executable, RUNNER), cores=1, vmem='1G')
+    return submit
+
+def trial(dispatcher_constructor, submit_constructor, path, i):
+    start = time.monotonic()
+    dispatcher = dispatcher_constructor(project_path=path, submit=get_submit(submit_constructor),
+                                        gid='bench_{}'.format(i))
+    dispatcher.update_env({'payload': i})
+    dispatcher.run()
+    submitted = time.monotonic()
+    dispatcher.accept()
+    data = dispatcher.recv()
+    dispatcher.clean()
+    assert data == str(i), data
+    return submitted - start, time.monotonic() - start
+
+def bench_transport(name, jobs, path):
+    dispatcher_constructor, submit_constructor = TRANSPORTS[name]
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        times = list(executor.map(lambda i: trial(dispatcher_constructor, submit_constructor, path, i), range(jobs)))
+    return summarize(name, jobs, time.monotonic() - start, [submit for submit, _ in times], [e2e for _, e2e in times])
+
+def bench_array(jobs, path):
+    start = time.monotonic()
+    dispatcher = SFSArrayDispatcher(project_path=path, submit=get_submit(SGEArraySubmit), gid='bench_array')
+    for i in range(jobs):
+        dispatcher.add_task({'payload': i})
+    dispatcher.run()
+    submitted = time.monotonic() - start
+    latencies = []
+    for i, task in enumerate(dispatcher.tasks):
+        assert task.recv() == str(i)
+        latencies.append(time.monotonic() - start)
+    dispatcher.clean()
+    return summarize('sge-array', jobs, time.monotonic() - start, [submitted], latencies)
+
+def summarize(name, jobs, total, submits, latencies):
+    latencies = sorted(latencies)
+    return {'transport': name, 'jobs': jobs, 'total': total, 'jobs_per_sec': jobs / total,
+            'submit_mean': sum(submits) / len(submits),
+            'latency_mean': sum(latencies) / len(latencies),
+            'latency_p50': latencies[len(latencies) // 2],
+            'latency_max': latencies[-1]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=32, help='the number of trials per transport')
+    parser.add_argument('--slots', type=int, default=os.cpu_count(), help='the slots of the emulated scheduler')
+    parser.add_argument('--latency', type=float, default=0.0, help='the emulated queue latency (in seconds)')
+    parser.add_argument('--transports', nargs='+', default=list(TRANSPORTS) + ['sge-array'],
+                        help='the transports to benchmark')
+    parser.add_argument('--json', action='store_true', help='print results as json')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as path:
+        emulator = SchedulerEmulator(os.path.join(path, 'scheduler.s'), slots=args.slots, latency=args.latency)
+        os.environ['PATH'] = "{}:{}".format(emulator.install(os.path.join(path, 'bin')), os.environ['PATH'])
+        os.environ['PYTHONPATH'] = ROOT
+        os.environ['HOME'] = path # the scripts source ~/.bashrc
+        emulator.start()
+        try:
+            results = [bench_array(args.jobs, path) if name == 'sge-array' else bench_transport(name, args.jobs, path)
+                       for name in args.transports]
+        finally:
+            emulator.close()
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print("{:<12}{:>6}{:>10}{:>10}{:>12}{:>12}{:>12}".format('transport', 'jobs', 'total (s)', 'jobs/s', 'submit (s)',
+                                                             'p50 (s)', 'max (s)'))
+    for result in results:
+        print("{transport:<12}{jobs:>6}{total:>10.2f}{jobs_per_sec:>10.1f}{submit_mean:>12.3f}{latency_p50:>12.3f}"
+              "{latency_max:>12.3f}".format(**result))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+benchmark of job rendering, compiled Template render plans (Submit.format_jobs) vs. the legacy path
+(Template.format merging the placeholder kwargs and retrying with re.findall on KeyError, one format_job per job)
+
+use:
+    python benchmarks/bench_templates.py --jobs 100000
+"""
+import argparse
+import json
+import time
+from pubtk.runtk.submits import ZSHSubmitSFS, SGESubmitSFS, serializers
+
+
+def legacy_format_job(submit, **kwargs):
+    return submit._jtuple(*[template.format_str(kwargs) for template in submit.templates])
+
+def get_kwargs(jobs, mappings):
+    env = serializers['sh']({"FLOATRUNTK{}".format(i): "cfg.param{}={}".format(i, i * 0.5) for i in range(mappings)})
+    return [{'project_path': '/tmp/project', 'output_path': '/tmp/project/batch', 'label': 'search_{}'.format(i),
+             'cores': 4, 'vmem': '8G', 'command': 'mpiexec -n 4 nrniv -python -mpi init.py', 'env': env}
+            for i in range(jobs)]
+
+def bench(submit, kwargs_list, repeat):
+    legacy, compiled = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        legacy_jobs = [legacy_format_job(submit, **kwargs) for kwargs in kwargs_list]
+        legacy.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        compiled_jobs = submit.format_jobs(kwargs_list)
+        compiled.append(time.perf_counter() - start)
+        assert legacy_jobs == compiled_jobs
+    return {'submit': type(submit).__name__, 'jobs': len(kwargs_list),
+            'legacy': min(legacy), 'compiled': min(compiled), 'speedup': min(legacy) / min(compiled)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=100000, help='the number of jobs rendered per repeat')
+    parser.add_argument('--mappings', type=int, default=8, help='the number of exported mappings per job')
+    parser.add_argument('--repeat', type=int, default=3, help='the best of repeat runs is reported')
+    parser.add_argument('--json', action='store_true', help='print results as json')
+    args = parser.parse_args()
+    kwargs_list = get_kwargs(args.jobs, args.mappings)
+    results = [bench(submit, kwargs_list, args.repeat) for submit in (ZSHSubmitSFS(), SGESubmitSFS())]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print("{:<16}{:>10}{:>12}{:>12}{:>10}".format('submit', 'jobs', 'legacy (s)', 'compiled (s)', 'speedup'))
+    for result in results:
+        print("{submit:<16}{jobs:>10}{legacy:>12.3f}{compiled:>12.3f}{speedup:>9.2f}x".format(**result))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+trivial runner for the benchmarks, communicates through a socket (SOCNAME exported), the shared file system (SGLFILE
+exported) or stdout (no file or socket handles, see NOFDispatcher)
+mappings:
+    payload - *Optional* the value sent back to the dispatcher
+    size    - *Optional* sends size bytes back to the dispatcher instead of payload
+    raster  - *Optional* sends a json spike raster of about raster bytes back to the dispatcher instead of payload
+    echo    - *Optional* (sockets) if true, echoes every message from the dispatcher until it is closed (runtk.CLOSE)
+"""
+import os
+import json
+import random
+import socket
+from pubtk import runtk
+from pubtk.runtk import Runner, FileRunner, SocketRunner
+
+if 'SOCNAME' in os.environ:
+    runner = SocketRunner()
+    runner.connect(socket.AF_INET if ',' in runner.socket_name else socket.AF_UNIX)
+elif 'SGLFILE' in os.environ:
+    runner = FileRunner()
+else:
+    runner = Runner()
+mappings = runner.mappings
+if mappings.get('echo'):
+    while True:
+        data = runner.recv()
+        if data is None or data == runtk.CLOSE:
+            break
+        runner.send(data)
+data = 'x' * mappings['size'] if 'size' in mappings else str(mappings.get('payload', ''))
+if 'raster' in mappings: # spike times (ms) and cell ids, about 14 bytes per spike
+    rng = random.Random(0)
+    spikes = sorted((round(rng.uniform(0, 1000), 3), rng.randrange(1000)) for _ in range(mappings['raster'] // 14))
+    data = json.dumps({'spkt': [spike[0] for spike in spikes], 'spkid': [spike[1] for spike in spikes]})
+if isinstance(runner, SocketRunner) or isinstance(runner, FileRunner):
+    runner.send(data)
+else:
+    print(data, end='')
+runner.close()
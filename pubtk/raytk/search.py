@@ -4,6 +4,55 @@ import os
 from ray import tune, train
 from ray.air import session, RunConfig
 from ray.tune.search import create_searcher, ConcurrencyLimiter, SEARCH_ALG_IMPORT
+from pubtk.runtk.caches import ResultCache
+from pubtk.runtk.monitors import get_monitor
+from pubtk.runtk.dispatchers import cancel_on_exit
+from pubtk.runtk.limiters import ConcurrencyController
+from pubtk.runtk.results import Result
+
+def report_step(step, metrics):
+    session.report(dict(metrics, step=step))
+
+class AdaptiveConcurrencyLimiter(ConcurrencyLimiter):
+    """
+    ConcurrencyLimiter whose max_concurrent follows a runtk.ConcurrencyController, updated with the queue wait and
+    runtime reported by each completed trial (see get_timing(), ray_search(adaptive=...)), so that the number of
+    trials in flight tracks how fast the scheduler starts the jobs
+    """
+    def __init__(self, searcher, controller=None, batch=False):
+        self.controller = controller or ConcurrencyController()
+        super().__init__(searcher=searcher, max_concurrent=self.controller.limit, batch=batch)
+
+    def on_trial_complete(self, trial_id, result=None, error=False):
+        if result and not error:
+            self.max_concurrent = self.controller.observe(wait=result.get('queue_wait'),
+                                                          runtime=result.get('runtime'))
+        super().on_trial_complete(trial_id, result=result, error=error)
+
+def get_limiter(searcher, max_concurrent=None, batch=False, adaptive=None):
+    """
+    Returns
+    -------
+    searcher wrapped in an AdaptiveConcurrencyLimiter if adaptive is set (True, or a dictionary of
+    runtk.ConcurrencyController arguments whose initial limit defaults to max_concurrent), otherwise in a
+    ConcurrencyLimiter of max_concurrent
+    """
+    if adaptive:
+        options = {} if adaptive is True else dict(adaptive)
+        max_concurrent and options.setdefault('initial', max_concurrent)
+        return AdaptiveConcurrencyLimiter(searcher, ConcurrencyController(**options), batch=batch)
+    return ConcurrencyLimiter(searcher=searcher, max_concurrent=max_concurrent, batch=batch)
+
+def get_timing(record):
+    """
+    Returns
+    -------
+    {'queue_wait', 'runtime'} (in seconds) of the merged timeline record of a trial (see runtk.merge_timelines()),
+    reported to the AdaptiveConcurrencyLimiter. the queue wait is measured up to the runner's start, or up to its
+    connection if the runner did not send its timeline
+    """
+    durations = record['durations']
+    return {'queue_wait': durations.get('queue', durations.get('accept')), 'runtime': durations.get('total')}
 
 def get_path(path):
     if path[0] == '/':
@@ -13,32 +62,60 @@ def get_path(path):
     else:
         raise ValueError("path must be an absolute path (starts with /) or relative to the current working directory (starts with .)")
 
-def ray_trial(config, label, dispatcher_constructor, project_path, output_path, submit):
+def ray_trial(config, label, dispatcher_constructor, project_path, output_path, submit, cache=None,
+              monitor_interval=None, timeline=False, report=None):
+    """
+    runs a single trial, returns the data (pandas.Series) of the trial, or (data, timeline record) if timeline is True
+    (see runtk.merge_timelines()). results sent as runtk.Result are returned as the series of their metrics
+    report - *Optional* callable(step, metrics) called with each intermediate report streamed by the runner before its
+             result (see runtk.SocketRunner.report, runtk.SOCKDispatcher.reports)
+    if the trial is stopped (or fails) before its result is received, its job is cancelled through the scheduler (see
+    runtk.SHDispatcher.cancel), as are the jobs of the trials still running when the worker exits or is signaled
+    """
     tid = ray.train.get_context().get_trial_id()
     tid = int(tid.split('_')[-1])  # integer value for the trial
     run_label = '{}_{}'.format(label, tid)
     dispatcher = dispatcher_constructor(project_path=project_path, output_path=output_path, submit=submit,
-                                        gid=run_label)
+                                        gid=run_label, cache=cache,
+                                        monitor=monitor_interval and get_monitor(monitor_interval),
+                                        timeline=timeline)
 
     dispatcher.update_env(dictionary=config)
+    dispatcher.cache_key = dispatcher.get_hash() # keyed by the config, not the trial specific entries below
     dispatcher.update_env(dictionary={
         'saveFolder': output_path,
         'simLabel': run_label,
     })
+    cancel_on_exit()
     try:
         dispatcher.run()
         dispatcher.accept()
+        if report:
+            for entry in dispatcher.reports():
+                report(entry['step'], entry['metrics'])
         data = dispatcher.recv()
+    except BaseException: # stopped by the scheduler (i.e. ASHA), interrupted or failed
+        dispatcher.cancel()
+        raise
+    finally:
         dispatcher.clean()
-    except Exception as e:
-        dispatcher.clean()
-        raise (e)
-    data = pandas.read_json(data, typ='series', dtype=float)
+    if isinstance(data, Result):
+        data = data.to_series()
+    else:
+        data = pandas.read_json(data, typ='series', dtype=float)
+    if timeline:
+        return data, dispatcher.get_timeline()
     return data
 
 def ray_search(dispatcher_constructor, submit_constructor, algorithm = "variant_generator", label = 'search',
                params = None, output_path = '../batch', checkpoint_path = '../ray',
-               batch_config = None, num_samples = 1, metric = "loss", mode = "min", algorithm_config = None):
+               batch_config = None, num_samples = 1, metric = "loss", mode = "min", algorithm_config = None,
+               cache_path = None, monitor_interval = None, timeline = False, stream = False, adaptive = None):
+    """
+    adaptive - *Optional* True, or a dictionary of runtk.ConcurrencyController arguments, replaces the fixed
+               max_concurrent of algorithm_config (the initial limit) with a limit adapted to the observed queue wait
+               and completion rate of the trials (see AdaptiveConcurrencyLimiter). defaults to None (fixed)
+    """
     ray.init(runtime_env={"working_dir": "."}) # TODO needed for python import statements ?
 
     if algorithm_config == None:
@@ -61,28 +138,33 @@ def ray_search(dispatcher_constructor, submit_constructor, algorithm = "variant_
     #  metric – The training result objective value attribute. Stopping procedures will use this attribute.
     #  mode – One of {min, max}. Determines whether objective is minimizing or maximizing the metric attribute.
     #  **kwargs – Additional parameters. These keyword arguments will be passed to the initialization function of the chosen class.
-    try:
-        algo = ConcurrencyLimiter(searcher=algo, max_concurrent=algorithm_config['max_concurrent'], batch=algorithm_config['batch'])
-    except:
-        pass
+    if adaptive or 'max_concurrent' in algorithm_config:
+        algo = get_limiter(algo, algorithm_config.get('max_concurrent'), algorithm_config.get('batch', False), adaptive)
 
     submit = submit_constructor()
     submit.update_templates(
         **batch_config
     )
     project_path = os.getcwd()
+    cache = cache_path and ResultCache(get_path(cache_path)) # reuse results of configs that were already evaluated
     def run(config):
-        data = ray_trial(config, label, dispatcher_constructor, project_path, output_path, submit)
+        data = ray_trial(config, label, dispatcher_constructor, project_path, output_path, submit, cache,
+                         monitor_interval, timeline or bool(adaptive), stream and report_step)
+        extra = {}
+        if timeline or adaptive:
+            data, record = data
+            timeline and extra.update(timeline=record)
+            adaptive and extra.update(get_timing(record)) # observed by the AdaptiveConcurrencyLimiter
         if isinstance(metric, str):
             metrics = {'config': config, 'data': data, metric: data[metric]}
-            session.report(metrics)
+            session.report(metrics | extra)
         elif isinstance(metric, (list, tuple)):
             metrics = {k: data[k] for k in metric}
             metrics['data'] = data
             metrics['config'] = config
-            session.report(metrics)
+            session.report(metrics | extra)
         else:
-            session.report({'data': data, 'config': config})
+            session.report({'data': data, 'config': config} | extra)
 
     tuner = tune.Tuner(
         run,
@@ -124,12 +206,13 @@ If you have previously evaluated the parameters passed in as points_to_evaluate
 def ray_optuna_search(dispatcher_constructor, submit_constructor, label = 'optuna_search',
                       params = None, output_path = '../batch', checkpoint_path = '../ray',
                       batch_config = None, max_concurrent = 1, batch = True, num_samples = 1,
-                      metric = "loss", mode = "min", optuna_config = None):
+                      metric = "loss", mode = "min", optuna_config = None, cache_path = None,
+                      monitor_interval = None, timeline = False, stream = False, adaptive = None):
     """
     ray_optuna_search(dispatcher_constructor, submit_constructor, label,
                       params, output_path, checkpoint_path,
                       batch_config, max_concurrent, batch, num_samples,
-                      metric, mode, optuna_config)
+                      metric, mode, optuna_config, cache_path, monitor_interval, timeline, stream, adaptive)
     Parameters
     ----------
     dispatcher_constructor
@@ -145,6 +228,17 @@ def ray_optuna_search(dispatcher_constructor, submit_constructor, label = 'optun
     metric
     mode
     optuna_config
+    cache_path - *Optional* directory of a runtk.ResultCache, configs that were already evaluated are not run again
+    monitor_interval - *Optional* the time (in seconds) between job state polls (see runtk.JobMonitor), trials whose
+                       job dies fail fast, freeing their concurrency slot. defaults to None (not monitored)
+    timeline - *Optional* if True, the merged phase timeline of each trial (see runtk.merge_timelines()) is reported
+               with the trial as 'timeline'. defaults to False
+    stream - *Optional* if True, the intermediate reports of the runners (see runtk.SocketRunner.report) are forwarded
+             to session.report as they arrive, so that trial schedulers (i.e. ASHA, HyperBand) can stop bad trials
+             mid-simulation. requires socket dispatchers, defaults to False
+    adaptive - *Optional* True, or a dictionary of runtk.ConcurrencyController arguments, max_concurrent is then the
+               initial limit, adapted to the observed queue wait and completion rate of the trials (see
+               AdaptiveConcurrencyLimiter). defaults to None (fixed max_concurrent)
 
     Returns
     -------
@@ -156,26 +250,32 @@ def ray_optuna_search(dispatcher_constructor, submit_constructor, label = 'optun
         optuna_config = {}
 
     storage_path = get_path(checkpoint_path)
-    algo = ConcurrencyLimiter(searcher=OptunaSearch(metric=metric, mode=mode, **optuna_config),
-                              max_concurrent=max_concurrent,
-                              batch=batch) #TODO does max_concurrent and batch work?
+    algo = get_limiter(OptunaSearch(metric=metric, mode=mode, **optuna_config), max_concurrent, batch,
+                       adaptive) #TODO does max_concurrent and batch work?
 
     submit = submit_constructor()
     submit.update_templates(
         **batch_config
     )
     project_path = os.getcwd()
+    cache = cache_path and ResultCache(get_path(cache_path))
 
     def run(config):
-        data = ray_trial(config, label, dispatcher_constructor, project_path, output_path, submit)
+        data = ray_trial(config, label, dispatcher_constructor, project_path, output_path, submit, cache,
+                         monitor_interval, timeline or bool(adaptive), stream and report_step)
+        extra = {}
+        if timeline or adaptive:
+            data, record = data
+            timeline and extra.update(timeline=record)
+            adaptive and extra.update(get_timing(record)) # observed by the AdaptiveConcurrencyLimiter
         if isinstance(metric, str):
             metrics = {'config': config, 'data': data, metric: data[metric]}
-            session.report(metrics)
+            session.report(metrics | extra)
         elif isinstance(metric, (list, tuple)):
             metrics = {k: data[k] for k in metric}
             metrics['config'] = config
             metrics['data'] = data
-            session.report(metrics)
+            session.report(metrics | extra)
         else:
             raise ValueError("metric must be a string or a list/tuple of strings")
 
@@ -3,3 +3,10 @@ from .dispatchers import *
 from .runners import *
 from .submits import *
 from .utils import *
+from .watchers import *
+from .pools import *
+from .caches import *
+from .monitors import *
+from .timelines import *
+from .limiters import *
+from .results import *
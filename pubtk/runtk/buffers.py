@@ -0,0 +1,104 @@
+import sys
+from multiprocessing import shared_memory, resource_tracker
+
+ALIGNMENT = 64 # offsets of the arrays in a segment are aligned to cache lines
+
+def open_segment(name, size=0, create=False):
+    """
+    opens (or creates) a named shared memory segment that is not tracked by the multiprocessing resource tracker, so
+    that the segment outlives the process that created it (the runner) and is removed by its owner (the dispatcher,
+    see close_segment()). an existing segment of the same name is replaced on create.
+    Parameters
+    ----------
+    name   - the name of the segment
+    size   - *Optional* the size (in bytes) of a created segment
+    create - *Optional* whether to create the segment, defaults to False (attach)
+    Returns
+    -------
+    multiprocessing.shared_memory.SharedMemory
+    """
+    if create:
+        try:
+            close_segment(open_segment(name), unlink=True) # stale segment of a previous run
+        except FileNotFoundError:
+            pass
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, create=create, size=max(size, 1), track=False)
+    segment = shared_memory.SharedMemory(name=name, create=create, size=max(size, 1))
+    resource_tracker.unregister(segment._name, 'shared_memory')
+    return segment
+
+def close_segment(segment, unlink=False):
+    """
+    closes (and unlinks) a segment, the mapping is kept open while arrays still view it (it is released once they are
+    garbage collected)
+    """
+    try:
+        segment.close()
+    except BufferError: # exported views of the segment still exist
+        pass
+    if unlink:
+        try:
+            segment.unlink() if sys.version_info >= (3, 13) else shared_memory._posixshmem.shm_unlink(segment._name)
+        except FileNotFoundError:
+            pass
+
+def contiguous(array):
+    """
+    Returns
+    -------
+    array, copied to a C contiguous (numpy) array if it is not contiguous
+    """
+    if hasattr(array, 'flags') and not array.flags['C_CONTIGUOUS']:
+        return array.copy(order='C')
+    return array
+
+def get_layout(arrays):
+    """
+    Parameters
+    ----------
+    arrays - dictionary of {name: buffer}, where buffer is a numpy array or any other C contiguous buffer
+             (i.e. array.array)
+    Returns
+    -------
+    (index, size), where index is {name: {'offset', 'nbytes', 'shape', 'format', 'dtype'}} of each array in a
+    segment of size bytes
+    """
+    index, offset = {}, 0
+    for name, array in arrays.items():
+        view = memoryview(array)
+        index[name] = {'offset': offset, 'nbytes': view.nbytes, 'shape': list(view.shape), 'format': view.format,
+                       'dtype': array.dtype.str if hasattr(array, 'dtype') else view.format}
+        offset = offset + -(-view.nbytes // ALIGNMENT) * ALIGNMENT
+    return index, offset
+
+def write_arrays(buffer, arrays, index):
+    """
+    copies the arrays into buffer (i.e. segment.buf) at the offsets of index (see get_layout())
+    """
+    for name, array in arrays.items():
+        entry = index[name]
+        buffer[entry['offset']: entry['offset'] + entry['nbytes']] = memoryview(array).cast('B')
+
+def read_arrays(buffer, index):
+    """
+    Returns
+    -------
+    dictionary of {name: array} viewing buffer (no copies), numpy arrays if numpy is installed, otherwise memoryviews
+    cast to the format and shape of each array
+    """
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+    view = memoryview(buffer)
+    arrays = {}
+    for name, entry in index.items():
+        data = view[entry['offset']: entry['offset'] + entry['nbytes']]
+        if numpy is not None:
+            arrays[name] = numpy.frombuffer(data, dtype=entry['dtype']).reshape(entry['shape'])
+        elif entry['shape']:
+            arrays[name] = data.cast(entry['format'].lstrip('@=<>!'), entry['shape'])
+        else:
+            arrays[name] = data.cast(entry['format'].lstrip('@=<>!'))
+    return arrays
@@ -0,0 +1,97 @@
+import os
+import tempfile
+from pubtk.runtk.header import FRAME
+from pubtk.runtk.results import Result, is_result
+from pubtk.runtk.sockets import HEADER, encode, decode
+from pubtk.utils import create_path
+
+
+class ResultCache(object):
+    """
+    content addressed, on disk result cache
+    results are stored in a directory sharded by the first two characters of the key:
+        {path}/{key[:2]}/{key}.out
+    keys are the canonical environment hashes of the dispatchers (see runtk.Dispatcher.get_hash), so that a
+    configuration that was already evaluated is not run again. writes are atomic (os.replace), so the cache can be
+    shared between processes (i.e. ray workers) and hosts on a shared file system.
+
+    use:
+        cache = ResultCache('../cache')
+        dispatcher = INETDispatcher(cache=cache, ...)
+        dispatcher.run() # returns immediately if the configuration was already evaluated
+    """
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path - the directory of the cache, created if it does not exist
+        """
+        self.path = create_path(path)
+
+    def get_path(self, key):
+        return os.path.join(self.path, key[:2], "{}.out".format(key))
+
+    def get(self, key, default=None):
+        """
+        Returns
+        -------
+        the cached result for key, as it was cached (see .put()), or default if the key is not cached
+        """
+        try:
+            with open(self.get_path(key), 'rb') as fptr:
+                data = fptr.read()
+        except FileNotFoundError:
+            return default
+        if is_result(data):
+            return Result.from_bytes(data)
+        if data.startswith(FRAME):
+            frame_type, flags, metalen, length = HEADER.unpack_from(data, len(FRAME))
+            offset = len(FRAME) + HEADER.size
+            return decode(frame_type, data[offset: offset + metalen], bytearray(data[offset + metalen:]))
+        return data.decode()
+
+    def serialize(self, data):
+        """
+        Returns
+        -------
+        the cached bytes of data: text as is, runtk.Result as its container, json serializable objects, bytes-like
+        and numpy arrays as their socket frame (see runtk.sockets.encode) prefixed by runtk.FRAME
+        raises TypeError (or ValueError) if data is not supported
+        """
+        if isinstance(data, str):
+            return data.encode()
+        if isinstance(data, Result):
+            return data.to_bytes()
+        frame_type, meta, payload = encode(data)
+        return b''.join([FRAME, HEADER.pack(frame_type, 0, len(meta), len(payload)), meta, payload])
+
+    def put(self, key, data):
+        """
+        caches data for key, see .serialize()
+        Returns
+        -------
+        True if data was cached, False if its type is not supported
+        """
+        try:
+            data = self.serialize(data)
+        except (TypeError, ValueError):
+            return False
+        path = self.get_path(key)
+        directory = create_path(os.path.dirname(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".{}.".format(key))
+        try:
+            with os.fdopen(fd, 'wb') as fptr:
+                fptr.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.path.exists(tmp) and os.remove(tmp)
+            raise
+        return True
+
+    def remove(self, key):
+        path = self.get_path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def __contains__(self, key):
+        return os.path.exists(self.get_path(key))
@@ -1,11 +1,32 @@
 import os
+import json
 import subprocess
 import hashlib
+import tempfile
+import zlib
+import collections
+import shutil
+import signal
+import atexit
+import weakref
+import select
+import math
 from pubtk import runtk
 from pubtk.runtk.submits import Submit
-from pubtk.runtk.sockets import INETSocket, UNIXSocket
+from pubtk.runtk.watchers import get_watcher
+from pubtk.runtk.timelines import Timeline, DISPATCHER, merge_timelines
+from pubtk.runtk.buffers import open_segment, close_segment, read_arrays
+from pubtk.runtk.results import Result, is_result
+from pubtk.runtk.sockets import Socket, INETSocket, UNIXSocket, AsyncINETSocket, AsyncUNIXSocket, REPORT, HEARTBEAT, \
+    decode
 from pubtk.utils import create_path
 import socket
+import asyncio
+import threading
+import queue
+import time
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 def format_env(dictionary, value_type=None, index=0):
     """
@@ -32,6 +53,36 @@ def format_env(dictionary, value_type=None, index=0):
                 "{}={}".format(key, value) for i, (key, value) in enumerate(dictionary.items())}
 
     # convert dictionary to proper elements
+
+def hash_env(env, grepstr=runtk.GREPSTR, **kwargs):
+    """
+    Parameters
+    ----------
+    env - the (formatted) environment dictionary, see format_env()
+    grepstr (optional) - the string used to identify formatted entries, defaults to runtk.GREPSTR
+    **kwargs (optional) - any additional values to include in the hash
+    Returns
+    -------
+    the canonical md5 hexdigest of the environment
+
+    the hash is independent of the order and indexing of the entries, i.e.:
+        {'INTRUNTK0': 'foo=1', 'FLOATRUNTK1': 'bar=2.0'} and {'FLOATRUNTK0': 'bar=2.0', 'INTRUNTK1': 'foo=1'}
+    have the same hash, while the (type, value) of each entry keeps the hash type stable, i.e.
+        {'INTRUNTK0': 'foo=1'} and {'FLOATRUNTK0': 'foo=1.0'}
+    have different hashes.
+    """
+    items = []
+    for key, value in env.items():
+        value = str(value)
+        if grepstr in key and '=' in value:
+            path, value = value.split('=', 1)
+            items.append([path.strip(), key.split(grepstr)[0], value.strip()])
+        else:
+            items.append([key, None, value])
+    items.sort(key=lambda item: (item[0], item[1] or '', item[2]))
+    gstr = json.dumps([items, sorted((str(key), str(val)) for key, val in kwargs.items())])
+    return hashlib.md5(gstr.encode()).hexdigest()
+
 class Dispatcher(object):
     """
     base class for all Dispatcher classes
@@ -51,7 +102,8 @@ class Dispatcher(object):
     """ 
     #obj_count = 0 # persistent count N.B. may be shared between objects. TODO no utility for this
 
-    def __init__(self, env=None, json=None, grepstr=runtk.GREPSTR, gid = None, **kwargs):
+    def __init__(self, env=None, json=None, grepstr=runtk.GREPSTR, gid = None, sidecar=False, timeline=False,
+                 compress=None, heartbeat=None, hang_timeout=None, **kwargs):
         """
         initializes base dispatcher class
         *Optional* Parameters
@@ -59,6 +111,25 @@ class Dispatcher(object):
         env     - any environmental variables to be passed to the created runner
         grepstr - the string ID for a subprocess to identify environment variables passed by the dispatcher
         gid     - an ID string that is unique to the dispatcher <-> runner pair
+        sidecar - if True, the mappings added with update_env() are kept in self.params and written once to a json
+                  sidecar file referenced by a single environment variable (PRMFILE), rather than exported one variable
+                  per mapping. for large configurations (i.e. connectivity matrices) that would otherwise bloat the
+                  submit script or exceed the environment size limits (see SHDispatcher.export_env())
+        timeline - if True, TIMELINE is exported so that the runner sends its timeline back with its results, merged
+                   with the dispatcher's own timeline by get_timeline(). the dispatcher's phases are always recorded
+                   (see runtk.Timeline)
+        compress - size threshold (in bytes) above which results are zlib compressed, offered to the runner as
+                   COMPRESS. socket runners accept it in their handshake (see runtk.Socket.hello()), file runners
+                   compress the results they write (see runtk.FileRunner.write()). defaults to None (not compressed)
+        heartbeat - the interval (in seconds) of the runner's heartbeats, exported as HEARTBEAT so that the runner
+                    reports its progress (simulated time, wall time and RSS, see runtk.Runner.start_heartbeat) while it
+                    runs, see .get_progress(). defaults to None (no heartbeats)
+        hang_timeout - the time (in seconds) without a heartbeat, or without the reported simulated time advancing,
+                       after which the trial is considered hung (see .is_hung()). blocking calls then cancel the job
+                       and raise RuntimeError, so that its slot is reused (see SHDispatcher.wait()). defaults to None
+                       (never considered hung). the runner's heartbeat thread does not run during C calls holding the
+                       interpreter (i.e. h.psolve() in NEURON), so hang_timeout must exceed the longest such call,
+                       unless the runner sends heartbeats from the simulation (see runtk.Runner.schedule_heartbeat)
         **kwargs are placed into a __dict__ item that can be accessed by __getattr__
 
         initializes gid, will set if the argument is supplied, otherwise the value will be
@@ -71,6 +142,17 @@ class Dispatcher(object):
         self.grepstr = grepstr
         self.gid = gid
         self.label = ''
+        self.sidecar = sidecar
+        self.params = {} # mappings written to the sidecar file
+        self.timeline = Timeline(DISPATCHER)
+        self.runner_timeline = None # received with the results of the runner, see unframe()
+        self.export_timeline = timeline
+        self.compress = compress
+        self.heartbeat = heartbeat
+        self.hang_timeout = hang_timeout
+        self.progress = None # the last heartbeat of the runner, see beat()
+        self.last_beat = None # time.monotonic() at which the last heartbeat was received
+        self.last_advance = None # time.monotonic() at which the simulated time last advanced
         #Dispatcher.obj_count = Dispatcher.obj_count + 1 #TODO no utility for this
 
     def add_json(self):
@@ -100,11 +182,29 @@ class Dispatcher(object):
         {'INTRUNTK0': 'foo=1', 'FLOATRUNTK1': 'bar=2.0', 'STRRUNTK2': 'baz=three'}
 
         """
-        if format:
+        if format and self.sidecar:
+            self.params.update(self.format_params(dictionary, value_type=value_type))
+        elif format:
             self.env.update(self.format_env(dictionary, value_type=value_type, index=len(self.env)))
         else:
             self.env.update(dictionary)
 
+    def format_params(self, dictionary, value_type=None):
+        """
+        Parameters
+        ----------
+        dictionary - the dictionary of variable_path: values to add to the sidecar
+        value_type (optional) - forces the type of values added to the dictionary (see runtk.SUPPORTS)
+        Returns
+        -------
+        dictionary of variable_path: values, json serializable values are kept as is
+        """
+        if not value_type or value_type.upper() not in runtk.SUPPORTS:
+            return dict(dictionary)
+        convert = runtk.SUPPORTS[value_type.upper()]
+        return {key: value if not isinstance(value, str) and value_type.upper() in ('JSON', 'DICT')
+                else convert(value if isinstance(value, str) else str(value)) for key, value in dictionary.items()}
+
     def format_env(self, dictionary, value_type=None, index=0):
         """
         Parameters
@@ -141,14 +241,110 @@ class Dispatcher(object):
             sets self.label = self.gid
             if self.gid already set, uses self.gid as self.label
         """
+        self.timeline.mark('init_run')
         if not self.gid:
-            gstr = str(self.env) + str(kwargs)
-            self.gid = hashlib.md5(gstr.encode()).hexdigest()
+            self.gid = self.get_hash(**kwargs)
             self.label = "{}_{}".format(self.grepstr.lower(), self.gid)
         else:
             self.label = self.gid
         # convert dictionary to proper elements
 
+    def get_hash(self, **kwargs):
+        """
+        Returns
+        -------
+        the canonical hash of self.env (and **kwargs), see hash_env()
+        """
+        env = self.env
+        if self.params: # sidecar mappings are hashed as their formatted entries
+            env = self.env | self.format_env(self.params, index=len(self.env))
+        return hash_env(env, grepstr=self.grepstr, **kwargs)
+
+    def unframe(self, data, meta=None):
+        """
+        Internal function for removing the runner's timeline from received data, the timeline is either carried in
+        the meta of a socket frame (see runtk.SocketRunner.send), in the meta of a result container (see runtk.Result)
+        or prefixes file results (see runtk.Timeline.frame())
+        Parameters
+        ----------
+        data - the received data
+        meta - *Optional* the (json) meta of the received frame
+        Returns
+        -------
+        data, without the timeline header
+        """
+        if meta:
+            timeline = json.loads(meta).get('timeline')
+            if timeline:
+                self.runner_timeline = Timeline.from_dict(timeline)
+            return data
+        if isinstance(data, Result):
+            timeline = data.meta.get('timeline')
+            if timeline:
+                self.runner_timeline = Timeline.from_dict(timeline)
+            return data
+        data, timeline = Timeline.unframe(data)
+        if timeline:
+            self.runner_timeline = timeline
+        return data
+
+    def get_timeline(self):
+        """
+        Returns
+        -------
+        the merged timeline record of the dispatcher and its runner (see runtk.merge_timelines())
+        """
+        return merge_timelines(self.timeline, self.runner_timeline, label=self.label)
+
+    def beat(self, heartbeat):
+        """
+        Internal function called with each heartbeat received from the runner (see runtk.Runner.get_heartbeat())
+        """
+        now = time.monotonic()
+        if self.progress is None or heartbeat.get('sim_time') != self.progress.get('sim_time'):
+            self.last_advance = now
+        self.progress = heartbeat
+        self.last_beat = now
+
+    def update_progress(self):
+        """
+        Internal function for collecting the heartbeats of runners that do not send them to the dispatcher (see
+        SFSDispatcher)
+        """
+        pass
+
+    def get_progress(self):
+        """
+        Returns
+        -------
+        the last heartbeat of the runner {'count', 'sim_time', 'wall_time', 'rss'} with 'age', the time (in seconds)
+        since it was received, and 'stalled', the time since the simulated time last advanced. None until the first
+        heartbeat
+        """
+        self.update_progress()
+        if self.progress is None:
+            return None
+        now = time.monotonic()
+        return self.progress | {'age': now - self.last_beat, 'stalled': now - self.last_advance}
+
+    def is_hung(self):
+        """
+        Returns
+        -------
+        True if the runner did not send a heartbeat for hang_timeout seconds (i.e. its process is stuck in a call
+        holding the interpreter, or its node died), or did not advance the reported simulated time for hang_timeout
+        seconds (set once the simulation runs, see runtk.Runner.progress). a runner is not considered hung before its
+        first heartbeat, so that the time spent in the queue is not counted. a runner blocked in a long C call (i.e.
+        h.psolve()) does not send heartbeats from its thread either, so hang_timeout must exceed the longest such call
+        unless the runner sends them from the simulation (see runtk.Runner.pulse, runtk.Runner.schedule_heartbeat)
+        """
+        progress = self.get_progress()
+        if self.hang_timeout is None or progress is None:
+            return False
+        if progress['age'] > self.hang_timeout:
+            return True
+        return progress['sim_time'] is not None and progress['stalled'] > self.hang_timeout
+
     #def __getattr__(self, k):
     #TODO see self.__dict__ in init... not sure of this function utility
     #    # only called if __getattribute__ fails
@@ -180,13 +376,19 @@ class SHDispatcher(Dispatcher):
     """
     Extension of base Dispatcher that extends functionality to handle job generating shell script to submit jobs
     """
-    def __init__(self, submit, project_path, output_path=".", **kwargs):
+    def __init__(self, submit, project_path, output_path=".", cache=None, monitor=None, **kwargs):
         """
         initializes dispatcher
         project_path - current directory where the relevant files to run are located.
         output_path  - path to output directory, can be either relative if starting with '.' or absolute if starting
                        with '/'. defaults to current directory
         submit       - Submit object (see pubtk.runk.submit)
+        cache        - *Optional* runtk.ResultCache, if the environment was already evaluated .run() does not submit
+                       the job and .accept() / .recv() return the cached result. otherwise the last data received from
+                       the runner is cached. the key is .cache_key, defaulting to the canonical hash of the environment
+                       at .run() (see get_hash())
+        monitor      - *Optional* runtk.JobMonitor, if provided the submitted job is monitored and blocking calls
+                       (.accept(), .recv()) raise RuntimeError once the job is no longer alive (see wait())
         in **kwargs:
             gid      - string to identify dispatcher by the created runner
             env      - dictionary of environmental variables to be passed to the created runner
@@ -197,6 +399,10 @@ class SHDispatcher(Dispatcher):
         self.submit = submit
         self.handles = None
         self.job_id = -1
+        self.cache = cache
+        self.cache_key = None
+        self.cached = None
+        self.monitor = monitor
         # create a "self.target" that contains the output_path and label?
         #self.label = self.gid
 
@@ -213,25 +419,151 @@ class SHDispatcher(Dispatcher):
         self.submit.create_job(label=self.label,
                                project_path=self.project_path,
                                output_path=self.output_path,
-                               env=self.env,
+                               env=self.export_env(),
                                **kwargs)
-        self.handles = self.submit.get_handles()
+        self.handles = self.get_handles()
+        self.timeline.mark('create_job')
+
+    def export_env(self):
+        """
+        Returns
+        -------
+        the environment to be exported to the runner, if there are sidecar mappings (see Dispatcher.update_env(),
+        sidecar=True), they are written to {output_path}/{label}.prm (json) and referenced by PRMFILE. TIMELINE and
+        COMPRESS are added if the runner's timeline or compression are requested, HEARTBEAT if heartbeats are (see
+        Dispatcher)
+        """
+        env = self.env | {'TIMELINE': '1'} if self.export_timeline else self.env
+        if self.compress is not None:
+            env = env | {'COMPRESS': str(self.compress)}
+        if self.heartbeat is not None:
+            env = env | {'HEARTBEAT': str(self.heartbeat)}
+        if not self.params:
+            return env
+        path = self.get_sidecar()
+        directory = create_path(os.path.dirname(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".{}.".format(self.label))
+        with os.fdopen(fd, 'w') as fptr:
+            json.dump(self.params, fptr)
+        os.replace(tmp, path)
+        return env | {'PRMFILE': path}
+
+    def get_sidecar(self):
+        return os.path.join(self.output_path, "{}.prm".format(self.label))
+
+    def get_handles(self):
+        """
+        Returns
+        -------
+        the handles of the submit instance, and the sidecar file (runtk.PARAMS) if there are sidecar mappings
+        """
+        handles = self.submit.get_handles()
+        if self.params:
+            handles[runtk.PARAMS] = self.get_sidecar()
+        return handles
 
     def submit_job(self):
         """
         submits the job through the submit instance
         """
         self.job_id = self.submit.submit_job()
+        self.timeline.mark('submit_job')
+        self.monitor and self.monitor.register(self.submit, self.job_id)
+        _add_live(self)
+
+    def cancel(self):
+        """
+        cancels the submitted job through the scheduler (see runtk.Submit.cancel_job), i.e. when the trial is stopped
+        before its result is received, so that the job does not keep its allocation. call .clean() afterwards
+        Returns
+        -------
+        True if the job was cancelled, False if there is no job to cancel (not submitted, cached or already finished)
+        """
+        _discard_live(self)
+        if self.cached is not None or self.job_id in (None, -1):
+            return False
+        try:
+            return self.submit.cancel_job(self.job_id)
+        except Exception: # the scheduler is unavailable, called on teardown so the original error is not masked
+            return False
+
+    def wait(self, call, timeout=None):
+        """
+        waits on a blocking call (call(timeout) raising TimeoutError if timeout is exceeded)
+        if a monitor is provided, the call is made in steps of monitor.interval, checking the state of the job between
+        steps so that a dead job fails fast rather than blocking forever. if a hang_timeout is provided, the call is
+        made in steps of the heartbeat interval (at most), and a hung job (see .is_hung()) is cancelled
+        Parameters
+        ----------
+        call    - callable taking a timeout (in seconds, None blocks)
+        timeout - *Optional* the overall time (in seconds) to wait, defaults to None (blocks)
+        Returns
+        -------
+        the return of call
+        """
+        if not self.monitor and self.hang_timeout is None:
+            return call(timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            step = self.monitor.interval if self.monitor else math.inf
+            if self.hang_timeout is not None:
+                step = min(step, self.hang_timeout, self.heartbeat or math.inf)
+            if deadline is not None:
+                step = min(step, max(deadline - time.monotonic(), 0))
+            try:
+                return call(step)
+            except (TimeoutError, futures.TimeoutError):
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+            if self.is_hung():
+                self.cancel()
+                raise RuntimeError("job {} ({}) hung, last heartbeat {}".format(self.job_id, self.label,
+                                                                                self.get_progress()))
+            if not self.monitor:
+                continue
+            state = self.monitor.status(self.submit, self.job_id)
+            if state not in runtk.ALIVE:
+                try: # the result may have been delivered just before the job exited
+                    return call(self.monitor.grace)
+                except (TimeoutError, futures.TimeoutError):
+                    raise RuntimeError("job {} ({}) {} without returning a result".format(self.job_id, self.label, state))
+
+    def get_cached(self):
+        """
+        Returns
+        -------
+        the cached result of the environment (see runtk.ResultCache), None if there is no cache or no result
+        """
+        if self.cache:
+            self.cache_key = self.cache_key or self.get_hash()
+            return self.cache.get(self.cache_key)
+        return None
+
+    def store(self, data):
+        """
+        caches data as the result of the environment if a cache is provided
+        Returns
+        -------
+        data
+        """
+        if self.cache and data is not None:
+            self.cache_key = self.cache_key or self.get_hash()
+            self.cache.put(self.cache_key, data)
+        return data
 
     def run(self, **kwargs):
         """
         creates and submits a job through the submit instance
         (calls .create_job() and .submit_job())
+        if the result is already cached, does nothing (see get_cached())
         :param kwargs:
         :return:
         """
+        self.cached = self.get_cached()
+        if self.cached is not None:
+            return
         self.create_job(**kwargs)
-        self.job_id = self.submit.submit_job()
+        self.submit_job()
 
     def accept(self, **kwargs):
         """
@@ -244,6 +576,14 @@ class SHDispatcher(Dispatcher):
         """
         pass
 
+    def reports(self):
+        """
+        Method for iterating the intermediate reports streamed by the runner if bidirectional communication is
+        implemented (see runtk.SOCKDispatcher.reports, runtk.SocketRunner.report)
+        Otherwise returns an empty iterator
+        """
+        return iter(())
+
 
     def recv(self, **kwargs):
         """
@@ -265,6 +605,34 @@ class SHDispatcher(Dispatcher):
         """
         pass
 
+    def dispatch(self, dictionary, value_type=None, **kwargs):
+        """
+        Method for handing a configuration to a persistent worker (see runtk.SocketRunner.tasks, runtk.WorkerPool),
+        requires bidirectional communication (see runtk.UNIXDispatcher, runtk.INETDispatcher).
+        the configuration is formatted (see format_env()) and sent to the worker, then the result is received.
+        Parameters
+        ----------
+        dictionary - the dictionary of key: values of the configuration
+        value_type (optional) - see update_env()
+        Returns
+        -------
+        data - the result sent back by the worker
+        """
+        env = self.format_env(dictionary, value_type=value_type, index=len(self.env))
+        if self.cache: # the configuration is keyed with the worker's environment
+            self.cache_key = hash_env(self.env | env, grepstr=self.grepstr)
+            data = self.cache.get(self.cache_key)
+            if data is not None:
+                return data
+        self.send(json.dumps(env))
+        return self.recv()
+
+    def release(self, **kwargs):
+        """
+        Method for ending a persistent worker (see runtk.SocketRunner.tasks)
+        """
+        self.send(runtk.CLOSE)
+
     def clean(self, handles = None, **kwargs):
         """
         Method called at close of the script, cleans up any open file handles or sockets, etc. To be implemented by
@@ -275,10 +643,13 @@ class SHDispatcher(Dispatcher):
 
         :return:
         """
+        self.monitor and self.monitor.unregister(self.submit, self.job_id)
+        _discard_live(self)
         if handles:
             for handle in handles:
-                if os.path.exists(self.handles[handle]):
+                if handle in self.handles and os.path.exists(self.handles[handle]):
                     os.remove(self.handles[handle])
+        self.timeline.mark('clean')
 
     def __repr__(self):
         repr = super().__repr__()
@@ -298,6 +669,13 @@ class SFSDispatcher(SHDispatcher):
     Shared File System Dispatcher utilizing file operations to submit jobs and collect results
     handles submitting the script to a Runner/Worker object
     """
+    def __init__(self, watcher=None, **kwargs):
+        """
+        watcher - *Optional* runtk.SFSWatcher that waits on the signal file, defaults to the process wide watcher
+                  (see runtk.get_watcher) shared by all SFSDispatchers
+        """
+        super().__init__(**kwargs)
+        self.watcher = watcher
 
     def create_job(self, **kwargs):
         super().create_job(**kwargs)
@@ -305,126 +683,639 @@ class SFSDispatcher(SHDispatcher):
     def run(self, **kwargs):
         super().run(**kwargs)
 
+    def get_heartbeat_file(self):
+        return os.path.join(self.output_path, "{}.hbt".format(self.label))
+
+    def export_env(self):
+        """
+        Returns
+        -------
+        see SHDispatcher.export_env(), with the heartbeat file (HBTFILE) the runner writes its heartbeats to if
+        heartbeats are requested
+        """
+        if self.heartbeat is None:
+            return super().export_env()
+        return super().export_env() | {'HBTFILE': self.get_heartbeat_file()}
+
+    def get_handles(self):
+        handles = super().get_handles()
+        if self.heartbeat is not None:
+            handles[runtk.HBTOUT] = self.get_heartbeat_file()
+        return handles
+
+    def update_progress(self):
+        """
+        Internal function reading the heartbeat file written by the runner (see runtk.FileRunner.beat)
+        """
+        if self.heartbeat is None or not self.handles:
+            return
+        try:
+            with open(self.handles[runtk.HBTOUT], 'r') as fptr:
+                heartbeat = json.load(fptr)
+        except (OSError, ValueError): # not written yet
+            return
+        if self.progress is None or heartbeat['count'] != self.progress['count']:
+            self.beat(heartbeat)
+
     def get_run(self):
         # if file exists, return data, otherwise return False
         if os.path.exists(self.handles[runtk.SGLOUT]):
-            with open(self.handles[runtk.MSGOUT], 'r') as fptr:
+            with open(self.handles[runtk.MSGOUT], 'rb') as fptr:
                 data = fptr.read()
-            return data # what if data itself is False equivalence
+            if data.startswith(runtk.ZLIB): # compressed by the runner (see runtk.FileRunner.write)
+                data = zlib.decompress(memoryview(data)[len(runtk.ZLIB):])
+            if is_result(data): # binary result container (see runtk.Result)
+                return Result.from_bytes(data)
+            return data.decode() # what if data itself is False equivalence
         return False
 
-    def recv(self, **kwargs): # blocking function,
-        data = False
-        while not data:
-            data = self.get_run()
-        return data
+    def watch(self, callback=None):
+        """
+        Parameters
+        ----------
+        callback - *Optional* callable to be called with the future once the runner signals completion
+        Returns
+        -------
+        a concurrent.futures.Future, resolved once the runner signals completion
+        """
+        return (self.watcher or get_watcher()).watch(self.handles[runtk.SGLOUT], callback)
 
+    def recv(self, timeout=None, **kwargs): # blocking function,
+        """
+        waits for the runner to signal completion (see runtk.SFSWatcher)
+        Parameters
+        ----------
+        timeout - *Optional* the time (in seconds) to wait, raises TimeoutError if exceeded, defaults to None (blocks)
+        Returns
+        -------
+        data - the data written by the runner
+        raises RuntimeError if the job dies before signaling completion (requires a monitor, see SHDispatcher.wait())
+        """
+        if self.cached is not None:
+            return self.cached
+        self.wait(self.watch().result, timeout)
+        self.timeline.mark('first_byte')
+        data = self.unframe(self.get_run())
+        self.timeline.mark('recv')
+        return self.store(data)
+
+    def clean(self, handles=None, **kwargs):
+        if self.handles and runtk.SGLOUT in self.handles:
+            (self.watcher or get_watcher()).unwatch(self.handles[runtk.SGLOUT])
+        if self.handles and runtk.HBTOUT in self.handles and os.path.exists(self.handles[runtk.HBTOUT]):
+            os.remove(self.handles[runtk.HBTOUT])
+        super().clean(handles, **kwargs)
+
+
+class SFSArrayDispatcher(SFSDispatcher):
+    """
+    Shared File System Dispatcher for array jobs (see runtk.SGEArraySubmit), submits many tasks as a single job.
+    update_env() sets the mappings shared by all tasks, add_task() adds a task with its own mappings.
+    after .create_job(), .tasks holds a per task SFSDispatcher so that results can be collected individually:
+        dispatcher = SFSArrayDispatcher(project_path=..., submit=SGEArraySubmit(), gid='array')
+        for config in configs:
+            dispatcher.add_task(config)
+        dispatcher.run()
+        for task in dispatcher.tasks:
+            data = task.recv()
+    """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.table = [] # (dictionary, value_type) per task
+        self.tasks = []
 
+    def add_task(self, dictionary, value_type=None):
+        """
+        adds a task to the array job
+        Parameters
+        ----------
+        dictionary - the dictionary of key: values specific to this task (see update_env())
+        value_type (optional) - see update_env()
+        Returns
+        -------
+        the (1-indexed) task id
+        """
+        self.table.append((dictionary, value_type))
+        return len(self.table)
 
+    def create_job(self, **kwargs):
+        super().init_run()
+        # task entries are indexed after the shared environment to avoid overwriting shared entries in the runner
+        table = [self.format_env(dictionary, value_type=value_type, index=len(self.env))
+                 for dictionary, value_type in self.table]
+        self.submit.create_job(label=self.label,
+                               project_path=self.project_path,
+                               output_path=self.output_path,
+                               env=self.export_env(),
+                               table=table,
+                               **kwargs)
+        self.handles = self.get_handles()
+        self.timeline.mark('create_job')
+        self.tasks = [self.create_task(task) for task in range(1, len(table) + 1)]
+
+    def create_task(self, task):
+        dispatcher = SFSDispatcher(submit=self.submit, project_path=self.project_path, output_path=self.output_path,
+                                   watcher=self.watcher, monitor=self.monitor, gid="{}.{}".format(self.label, task))
+        dispatcher.label = dispatcher.gid
+        dispatcher.timeline.marks = dict(self.timeline.marks) # the tasks share the job's phases up to submission
+        dispatcher.handles = self.submit.get_task_handles(task)
+        return dispatcher
+
+    def submit_job(self):
+        self.job_id = self.submit.submit_job()
+        self.timeline.mark('submit_job')
+        for task, dispatcher in enumerate(self.tasks, 1):
+            dispatcher.job_id = "{}.{}".format(self.job_id, task)
+            dispatcher.timeline.mark('submit_job', self.timeline.marks['submit_job'])
+            self.monitor and self.monitor.register(self.submit, dispatcher.job_id)
+
+    def run(self, **kwargs):
+        self.create_job(**kwargs)
+        self.submit_job()
 
-class UNIXDispatcher(SHDispatcher):
+    def recv(self, timeout=None, **kwargs):
+        """
+        Returns
+        -------
+        list of the data of every task (in task order), see .tasks to collect results individually
+        """
+        return [task.recv(timeout=timeout) for task in self.tasks]
+
+    def clean(self, handles=None, **kwargs):
+        for task in self.tasks:
+            task.clean(handles)
+        super().clean(handles, **kwargs)
+
+class SHMDispatcher(SFSDispatcher):
     """
-    AF UNIX Dispatcher utilizing sockets (requires socket forwarding)
-    handles submitting the script to a Runner/Worker object
+    Shared memory Dispatcher for runners on the same host (i.e. ZSHSubmitSFS, see runtk.SHMRunner)
+    the runner writes its (numeric) results to the shared memory segment SHMNAME exported by the dispatcher rather
+    than serializing them, then signals completion as a FileRunner would. .recv() maps the arrays of the segment
+    without copies (numpy arrays, or memoryviews if numpy is not installed). results sent as text are received as
+    by the SFSDispatcher.
+    the arrays view the segment, which is removed by .clean(), copy the arrays that should outlive the dispatcher.
 
-    #TODO can we consolidate UNIXDispatcher and INETDispatcher into a single class?
+    use:
+        dispatcher = SHMDispatcher(project_path=..., submit=ZSHSubmitSFS(), gid='shm')
+        dispatcher.run()
+        arrays = dispatcher.recv() # {'rates': array, 'spkt': array, ...}
+        ...
+        dispatcher.clean()
     """
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.socket = None
-        self.server = None
+        self.segment = None
 
-    def create_job(self, **kwargs):
-        super().create_job()
-        socket_name = "{}/{}.s".format(self.output_path, self.label)  # the socket file
-        try:
-            os.unlink(socket_name)
-        except OSError as e:
-            if os.path.exists(socket_name):
-                raise OSError("issue when creating socket {}:".format(socket_name), e)
-        self.socket = UNIXSocket(socket_name = socket_name)
-        self.socket.listen()
-        self.submit.create_job(label=self.label, project_path=self.project_path,
-                               output_path=self.output_path, env=self.env, sockname=socket_name, **kwargs)
-        self.handles = self.submit.get_handles()
+    def get_segment_name(self):
+        # short (macOS allows 31 characters) and unique per output_path and label
+        return "pubtk_{}".format(hashlib.md5(os.path.join(self.output_path, self.label).encode()).hexdigest()[:16])
 
+    def export_env(self):
+        return super().export_env() | {'SHMNAME': self.get_segment_name()}
 
-    def run(self, **kwargs):
-        self.create_job(**kwargs)
-        self.job_id = self.submit.submit_job()
+    def recv(self, timeout=None, **kwargs):
+        """
+        Returns
+        -------
+        dictionary of {name: array} of the arrays written to shared memory by the runner (see runtk.SHMRunner),
+        or the data written by the runner if it was sent as text
+        """
+        data = super().recv(timeout=timeout)
+        if isinstance(data, str) and data.startswith(runtk.SHM):
+            if self.segment:
+                close_segment(self.segment)
+            self.segment = open_segment(self.get_segment_name())
+            return read_arrays(self.segment.buf, json.loads(data[len(runtk.SHM):]))
+        return data
 
-    def accept(self):
+    def store(self, data):
+        if isinstance(data, str) and data.startswith(runtk.SHM): # the segment does not outlive the dispatcher
+            return data
+        return super().store(data)
+
+    def clean(self, handles=None, **kwargs):
+        try:
+            segment = self.segment or (self.label and open_segment(self.get_segment_name()))
+        except FileNotFoundError: # the runner did not write to shared memory
+            segment = None
+        if segment:
+            close_segment(segment, unlink=True)
+        self.segment = None
+        super().clean(handles, **kwargs)
+
+class SOCKDispatcher(SHDispatcher):
+    """
+    base class of the socket Dispatchers (see UNIXDispatcher, INETDispatcher), bidirectional communication with a
+    runtk.SocketRunner. besides its result, the runner may stream intermediate reports (see runtk.SocketRunner.report),
+    iterated with .reports() before the result is received:
+        dispatcher.run()
+        dispatcher.accept()
+        for report in dispatcher.reports(): # ends once the runner sends its result
+            print(report['step'], report['metrics'])
+        data = dispatcher.recv()
+    """
+    def __init__(self, server=None, **kwargs):
+        """
+        server - *Optional* a listening runtk.DispatcherServer shared between dispatchers, if provided the dispatcher
+                 registers with the server rather than listening on its own port / socket file
+        """
+        super().__init__(**kwargs)
+        self.socket = None
+        self.server = server
+        self.pending_reports = collections.deque() # reports received while waiting on a result
+        self.pending_results = collections.deque() # results received while iterating reports
+        self.received = False # whether the result of the current exchange was consumed by recv()
+
+    def accept(self, timeout=None):
         """
-        accept incoming connection from client
+        accept incoming connection from runner
         this function is blocking
+        raises RuntimeError if the job dies before connecting (requires a monitor, see SHDispatcher.wait())
         """
-        connection, peer_address = self.socket.accept()  # actual blocking statement
+        if self.cached is not None:
+            return None, None
+        if self.server:
+            self.socket, peer_address = self.wait(lambda step: self.server.accept(self.label, step), timeout)
+            self.timeline.mark('accept')
+            return self.socket.connection, peer_address
+        connection, peer_address = self.wait(self.accept_socket, timeout)  # actual blocking statement
+        self.timeline.mark('accept')
         return connection, peer_address
 
-    def recv(self):
+    def accept_socket(self, timeout=None):
+        self.socket.socket.settimeout(timeout)
+        try:
+            return self.socket.accept()
+        finally:
+            self.socket.socket.settimeout(None)
+
+    def poll(self, timeout=None):
+        """
+        Internal function waiting up to timeout (in seconds) for the runner to send a frame, raises TimeoutError if it
+        does not, so that no frame is partially received (see .recv_message())
         """
+        if timeout is not None and not select.select([self.socket.connection], [], [], timeout)[0]:
+            raise TimeoutError("no frame received within {} seconds".format(timeout))
 
+    def recv_message(self):
+        """
+        Internal function receiving the next frame from the runner, heartbeats are consumed (see .beat())
         Returns
         -------
+        (is_report, message), (False, None) if the connection was closed. the runner's timeline is taken from the
+        meta of results (see .unframe())
+        raises RuntimeError if the job dies or hangs before sending a frame (see SHDispatcher.wait())
+        """
+        while True:
+            self.wait(self.poll)
+            frame = self.socket.recv_frame()
+            if frame is None:
+                return False, None
+            frame_type, flags, meta, payload = frame
+            if frame_type != HEARTBEAT:
+                break
+            self.beat(decode(frame_type, meta, payload))
+        if frame_type == REPORT:
+            return True, decode(frame_type, meta, payload)
+        return False, self.unframe(decode(frame_type, meta, payload), meta)
 
+    def recv(self):
         """
-        return self.socket.recv()
+        blocking call, waits for the next result sent by the runner (reports sent in the meantime are kept for
+        .reports())
+        Returns
+        -------
+        data - the data sent by the runner, None if the connection was closed
+        """
+        if self.cached is not None:
+            return self.cached
+        self.received = True
+        if self.pending_results:
+            return self.pending_results.popleft()
+        is_report, data = self.recv_message()
+        while is_report:
+            self.pending_reports.append(data)
+            is_report, data = self.recv_message()
+        self.timeline.mark('first_byte', self.socket.first_byte)
+        self.timeline.mark('recv')
+        return self.store(data)
+
+    def reports(self):
+        """
+        generator of the intermediate reports streamed by the runner (see runtk.SocketRunner.report), ends once the
+        runner sends its next result (returned by the following .recv()) or closes the connection
+        Returns
+        -------
+        generator of {'step': step, 'metrics': metrics}
+        """
+        while self.pending_reports:
+            yield self.pending_reports.popleft()
+        if self.cached is not None or self.pending_results or self.received: # the result was already received
+            return
+        while True:
+            is_report, data = self.recv_message()
+            if not is_report:
+                self.timeline.mark('first_byte', self.socket.first_byte)
+                self.timeline.mark('recv')
+                self.pending_results.append(self.store(data))
+                return
+            yield data
 
     def send(self, data):
+        self.received = False # a new exchange, i.e. a configuration sent to a persistent worker
         self.socket.send(data)
+
     def clean(self, handles=None):
         super().clean(handles)
+        if self.server:
+            self.server.unregister(self.label)
         if self.socket:
             self.socket.close()
 
-class INETDispatcher(SHDispatcher):
+class UNIXDispatcher(SOCKDispatcher):
     """
-    AF INET Dispatcher utilizing sockets
+    AF UNIX Dispatcher utilizing sockets (requires socket forwarding)
     handles submitting the script to a Runner/Worker object
+    server - *Optional* a listening runtk.DispatcherServer (AF_UNIX) shared between dispatchers, if provided the
+             dispatcher registers with the server rather than binding its own socket file
     """
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.socket = None
+    def create_job(self, **kwargs):
+        if self.server:
+            super().init_run(**kwargs)
+            socket_name = self.server.register(self.label)
+            self.submit.create_job(label=self.label, project_path=self.project_path, output_path=self.output_path,
+                                   env=self.export_env() | {'SOCGID': self.label}, sockname=socket_name, **kwargs)
+            self.handles = self.get_handles()
+            self.timeline.mark('create_job')
+            return
+        super().create_job()
+        socket_name = "{}/{}.s".format(self.output_path, self.label)  # the socket file
+        try:
+            os.unlink(socket_name)
+        except OSError as e:
+            if os.path.exists(socket_name):
+                raise OSError("issue when creating socket {}:".format(socket_name), e)
+        self.socket = UNIXSocket(socket_name = socket_name)
+        self.socket.listen()
+        self.submit.create_job(label=self.label, project_path=self.project_path,
+                               output_path=self.output_path, env=self.export_env(), sockname=socket_name, **kwargs)
+        self.handles = self.get_handles()
+        self.timeline.mark('create_job')
 
+class INETDispatcher(SOCKDispatcher):
+    """
+    AF INET Dispatcher utilizing sockets
+    handles submitting the script to a Runner/Worker object
+    server - *Optional* a listening runtk.DispatcherServer (AF_INET) shared between dispatchers, if provided the
+             dispatcher registers with the server rather than listening on its own port
+    """
     def create_job(self, **kwargs):
         super().init_run(**kwargs)
-        self.socket = INETSocket()
-        socket_name = self.socket.listen() # one server <-> one client
+        env = self.export_env()
+        if self.server:
+            socket_name = self.server.register(self.label) # runners identify themselves by SOCGID on connect
+            env = env | {'SOCGID': self.label}
+        else:
+            self.socket = INETSocket()
+            socket_name = self.socket.listen() # one server <-> one client
         self.submit.create_job(label=self.label, project_path=self.project_path,
-                               output_path=self.output_path, env=self.env, sockname=socket_name, **kwargs)
-        self.handles = self.submit.get_handles()
-
+                               output_path=self.output_path, env=env, sockname=socket_name, **kwargs)
+        self.handles = self.get_handles()
+        self.timeline.mark('create_job')
 
-    def submit_job(self):
-        self.job_id = self.submit.submit_job()
-    
-    def run(self, **kwargs):
-        self.create_job(**kwargs)
-        self.job_id = self.submit.submit_job()
+class DispatcherServer(object):
+    """
+    single listening endpoint (AF_INET or AF_UNIX) shared by many INET/UNIX Dispatchers
+    rather than each dispatcher listening on its own port / socket file, the dispatchers register their label with the
+    server. each runner sends its label (SOCGID) in a handshake frame upon connect (see runtk.SocketRunner.connect),
+    and the server routes the connection to the matching dispatcher.
 
-    def accept(self):
+    use:
+        server = DispatcherServer()
+        server.listen()
+        dispatcher = INETDispatcher(server=server, submit=..., project_path=..., gid=...)
+        dispatcher.run()
+        dispatcher.accept()
+        ...
+        server.close()
+    """
+    def __init__(self, socket_name=None, socket_type=socket.AF_INET, backlog=socket.SOMAXCONN, timeout=10.0):
         """
-        accept incoming connection from runner
-        this function is blocking
+        socket_name - *Optional* the address to bind, for AF_INET defaults to (hostname, 0) (OS chooses port),
+                      for AF_UNIX the socket file (required)
+        socket_type - socket.AF_INET or socket.AF_UNIX
+        backlog     - the listen backlog of the server
+        timeout     - the time (in seconds) allowed for a connecting runner to send its handshake
         """
-        connection, peer_address = self.socket.accept()  # actual blocking statement
-        return connection, peer_address
+        if socket_type == socket.AF_UNIX:
+            self.socket = UNIXSocket(socket_name=socket_name)
+        else:
+            self.socket = INETSocket(socket_name=socket_name)
+        self.type = socket_type
+        self.name = None
+        self.backlog = backlog
+        self.timeout = timeout
+        self.routes = {} # label -> queue of (Socket, peer_address)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.closed = False
+
+    def listen(self):
+        """
+        binds the endpoint and starts routing connections in a background thread
+        Returns
+        -------
+        the name of the endpoint (to be passed to runners as SOCNAME)
+        """
+        self.name = self.socket.listen(self.backlog)
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+        return self.name
+
+    def serve(self):
+        while not self.closed:
+            try:
+                connection, peer_address = self.socket.socket.accept()
+            except OSError:
+                if self.closed:
+                    return
+                continue
+            threading.Thread(target=self.route, args=(connection, peer_address), daemon=True).start()
+
+    def route(self, connection, peer_address):
+        connection.settimeout(self.timeout)
+        peer = Socket(socket_name=self.name, socket_type=self.type, connection=connection)
+        try:
+            label = peer.recv()
+        except OSError:
+            label = None
+        with self.lock:
+            route = self.routes.get(label)
+        if route is None: # unknown or unregistered runner
+            peer.close()
+            return
+        connection.settimeout(None)
+        peer.peer_address = peer_address
+        route.put((peer, peer_address))
+
+    def register(self, label):
+        """
+        registers a dispatcher label with the server
+        Returns
+        -------
+        the name of the endpoint
+        """
+        with self.lock:
+            self.routes.setdefault(label, queue.Queue())
+        return self.name
 
-    def recv(self):
+    def unregister(self, label):
+        with self.lock:
+            self.routes.pop(label, None)
+
+    def accept(self, label, timeout=None):
         """
+        blocking call, waits until the runner with the matching label connects to the server
+        Returns
+        -------
+        (Socket, peer_address) - the routed connection, wrapped in a runtk.Socket
+        """
+        with self.lock:
+            route = self.routes[label]
+        try:
+            return route.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("no connection from {} on {}".format(label, self.name))
 
+    def close(self):
+        self.closed = True
+        try:
+            self.socket.socket.shutdown(socket.SHUT_RDWR) # wakes the blocking accept() in serve()
+        except OSError:
+            pass
+        self.socket.close()
+        if self.thread:
+            self.thread.join()
+
+class AsyncSOCKDispatcher(SHDispatcher):
+    """
+    asyncio socket Dispatcher, awaitable counterpart of the INET/UNIX Dispatchers
+    create_job, submit_job, run, accept, recv, send and clean are coroutines, so that a single event loop can supervise
+    many dispatcher <-> runner pairs at once, i.e.:
+        await asyncio.gather(*[trial(dispatcher) for dispatcher in dispatchers])
+    communicates with the (blocking) runtk.SocketRunner using the same framing as runtk.Socket
+    """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.socket = None
+
+    def create_socket(self):
+        """
+        Method for creating the (unbound) AsyncSocket of the job. To be implemented by inherited classes.
         Returns
         -------
+        socket - the AsyncSocket (see runtk.AsyncINETSocket, runtk.AsyncUNIXSocket) listened on by create_job()
+        """
+        pass
 
+    async def create_job(self, **kwargs):
+        super().init_run(**kwargs)
+        self.socket = self.create_socket()
+        socket_name = await self.socket.listen() # one server <-> one client
+        self.submit.create_job(label=self.label, project_path=self.project_path,
+                               output_path=self.output_path, env=self.export_env(), sockname=socket_name, **kwargs)
+        self.handles = self.get_handles()
+        self.timeline.mark('create_job')
+
+    async def submit_job(self):
+        """
+        submits the job through the submit instance, the (blocking) submission is run in the default executor
+        """
+        self.job_id = await asyncio.to_thread(self.submit.submit_job)
+        self.timeline.mark('submit_job')
+        _add_live(self)
+
+    async def run(self, **kwargs):
+        self.cached = self.get_cached()
+        if self.cached is not None:
+            return
+        await self.create_job(**kwargs)
+        await self.submit_job()
+
+    async def accept(self, timeout=None):
+        """
+        await incoming connection from runner
+        Parameters
+        ----------
+        timeout - *Optional* the time (in seconds) to wait for the connection, defaults to None (waits indefinitely),
+                  raises TimeoutError if exceeded
         """
-        return self.socket.recv()
+        if self.cached is not None:
+            return None, None
+        # shielded, so that the connection can still be awaited after a timeout
+        connection, peer_address = await asyncio.wait_for(asyncio.shield(self.socket.accept()), timeout)
+        self.timeline.mark('accept')
+        return connection, peer_address
 
-    def send(self, data):
-        self.socket.send(data)
-    def clean(self, handles=None):
+    async def recv(self, timeout=None):
+        """
+        await the next result of the runner
+        Parameters
+        ----------
+        timeout - *Optional* the time (in seconds) to wait for the result, defaults to None (waits indefinitely),
+                  raises TimeoutError if exceeded (a partially received frame is lost)
+        Returns
+        -------
+        data - the data sent by the runner, None if the connection was closed. heartbeats are consumed (see .beat())
+        """
+        if self.cached is not None:
+            return self.cached
+        frame = await asyncio.wait_for(self.recv_result(), timeout)
+        self.timeline.mark('first_byte', self.socket.first_byte)
+        data = None
+        if frame is not None:
+            frame_type, flags, meta, payload = frame
+            data = self.unframe(decode(frame_type, meta, payload), meta)
+        self.timeline.mark('recv')
+        return self.store(data)
+
+    async def recv_result(self):
+        frame = await self.socket.recv_frame()
+        while frame is not None and frame[0] == HEARTBEAT:
+            frame_type, flags, meta, payload = frame
+            self.beat(decode(frame_type, meta, payload))
+            frame = await self.socket.recv_frame()
+        return frame
+
+    async def send(self, data):
+        await self.socket.send(data)
+
+    async def clean(self, handles=None):
         super().clean(handles)
         if self.socket:
-            self.socket.close()
+            await self.socket.close()
+
+class AsyncINETDispatcher(AsyncSOCKDispatcher):
+    """
+    asyncio AF INET Dispatcher utilizing sockets
+    handles submitting the script to a Runner/Worker object
+    """
+    def create_socket(self):
+        return AsyncINETSocket()
+
+class AsyncUNIXDispatcher(AsyncSOCKDispatcher):
+    """
+    asyncio AF UNIX Dispatcher utilizing sockets (requires socket forwarding)
+    handles submitting the script to a Runner/Worker object
+    """
+    def create_socket(self):
+        socket_name = "{}/{}.s".format(self.output_path, self.label)  # the socket file
+        try:
+            os.unlink(socket_name)
+        except OSError as e:
+            if os.path.exists(socket_name):
+                raise OSError("issue when creating socket {}:".format(socket_name), e)
+        return AsyncUNIXSocket(socket_name = socket_name)
 
 class NOFDispatcher(Dispatcher):
     """
@@ -441,20 +1332,225 @@ class NOFDispatcher(Dispatcher):
         """
         super().__init__(env=env, **kwargs)
         self.cmdstr = cmdstr
-        self.env.update(os.environ.copy())
 
     def run(self):
         super().init_run()
-        self.proc = subprocess.run(self.cmdstr.split(), env=self.env, text=True, stdout=subprocess.PIPE, \
+        self.proc = subprocess.run(self.cmdstr.split(), env=os.environ | self.env, text=True, stdout=subprocess.PIPE, \
             stderr=subprocess.PIPE)
+        self.timeline.mark('recv')
         return self.proc
 
 
+class LocalPoolDispatcher(NOFDispatcher):
+    """
+    Local process pool dispatcher, runs an iterable of configurations as local subprocesses (see NOFDispatcher) with
+    bounded concurrency, each child pinned to its own chunk of CPUs, yielding results as they complete.
+    allows workstation sweeps to use every core without ray or a job scheduler.
+
+    use:
+        dispatcher = LocalPoolDispatcher(cmdstr='python runner.py', threads=2)
+        for index, proc in dispatcher.run([{'foo': 1}, {'foo': 2}, ...]):
+            print(index, proc.stdout)
+    """
+    def __init__(self, cmdstr='', env=None, concurrency=None, threads=1, pin=True, fork_server=None, kill_timeout=1.0,
+                 **kwargs):
+        """
+        Parameters
+        ----------
+        cmdstr      - command line call to be executed for each configuration
+        env         - any environmental variables shared by every configuration
+        concurrency - the maximum number of concurrent subprocesses, defaults to (available cores) // threads
+        threads     - the number of cores used by each subprocess
+        pin         - whether to pin each subprocess to its own chunk of threads cores (linux only). the mask is applied
+                      before the command is executed, by prefixing it with taskset -c if available, the chunk is
+                      also exported as CPUSET so that the runner pins itself otherwise (see runtk.Runner)
+        fork_server - *Optional* the AF_UNIX socket file of a fork server (see runtk.zygotes), the subprocesses are then
+                      forked from the server (which preloaded their imports) rather than started from scratch. the
+                      children pin themselves from CPUSET
+        kill_timeout - the time (in seconds) the subprocesses are given to exit once terminated, when the results are
+                       not consumed to the end (see run()), before they are killed
+        """
+        super().__init__(cmdstr=cmdstr, env=env, **kwargs)
+        if hasattr(os, 'sched_getaffinity'):
+            self.cpus = sorted(os.sched_getaffinity(0))
+        else:
+            self.cpus = list(range(os.cpu_count() or 1))
+        self.threads = max(int(threads), 1)
+        self.concurrency = concurrency or max(len(self.cpus) // self.threads, 1)
+        self.pin = pin and hasattr(os, 'sched_setaffinity') and len(self.cpus) >= self.threads * self.concurrency
+        self.taskset = shutil.which('taskset')
+        self.fork_server = fork_server
+        self.kill_timeout = kill_timeout
+        self.procs = {}
+        self.lock = threading.Lock() # guards self.procs, mutated by the worker threads
+
+    def get_chunks(self):
+        """
+        Returns
+        -------
+        list of the (concurrency) CPU sets the subprocesses are pinned to, [None, ...] if not pinning
+        """
+        if not self.pin:
+            return [None] * self.concurrency
+        return [set(self.cpus[i * self.threads: (i + 1) * self.threads]) for i in range(self.concurrency)]
+
+    def get_command(self, cpus):
+        """
+        Internal function
+        Returns
+        -------
+        the arguments of the command pinned to cpus (taskset -c), so that the mask is set before the command is
+        executed and inherited by every thread it spawns
+        """
+        args = self.cmdstr.split()
+        if cpus and self.taskset:
+            return [self.taskset, '-c', ','.join(str(cpu) for cpu in sorted(cpus))] + args
+        return args
+
+    def execute(self, index, env, chunks, stop):
+        cpus = chunks.get()
+        try:
+            if cpus: # the runner pins itself on startup if taskset is not available
+                env = env | {'CPUSET': ','.join(str(cpu) for cpu in sorted(cpus))}
+            with self.lock:
+                if stop.is_set(): # the run was closed, see run()
+                    return None
+                if self.fork_server:
+                    from pubtk.runtk.zygotes import ForkClient
+                    proc = ForkClient(self.fork_server).popen(self.cmdstr, env=env, cwd=os.getcwd())
+                else:
+                    proc = subprocess.Popen(self.get_command(cpus), env=env, text=True, stdout=subprocess.PIPE,
+                                            stderr=subprocess.PIPE)
+                self.procs[index] = proc
+            stdout, stderr = proc.communicate()
+            with self.lock:
+                self.procs.pop(index, None)
+            return subprocess.CompletedProcess(proc.args, proc.returncode, stdout, stderr)
+        finally:
+            chunks.put(cpus)
+
+    def run(self, configs=(), value_type=None):
+        """
+        Parameters
+        ----------
+        configs - iterable of dictionaries of key: values (see Dispatcher.update_env), consumed lazily so that at most
+                  concurrency configurations are pending at a time
+        value_type (optional) - see Dispatcher.update_env()
+        Returns
+        -------
+        generator of (index, subprocess.CompletedProcess) tuples, in order of completion, where index is the position
+        of the configuration in configs. closing the generator early (i.e. breaking out of the loop) terminates the
+        running subprocesses (killed after kill_timeout seconds) without waiting for them
+        """
+        super().init_run()
+        chunks = queue.Queue()
+        for chunk in self.get_chunks():
+            chunks.put(chunk)
+        base = os.environ | self.env
+        configs = enumerate(configs)
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            pending = {}
+            def fill():
+                for index, config in configs:
+                    env = base | self.format_env(config, value_type=value_type, index=len(self.env))
+                    pending[executor.submit(self.execute, index, env, chunks, stop)] = index
+                    if len(pending) >= self.concurrency:
+                        return
+            fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    yield index, future.result()
+                fill()
+        finally: # no-op once every configuration completed
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.terminate(timeout=self.kill_timeout)
+
+    def terminate(self, timeout=None):
+        """
+        terminates any running subprocesses
+        Parameters
+        ----------
+        timeout - *Optional* the time (in seconds) after which the subprocesses that did not exit are killed, defaults
+                  to None (not killed)
+        """
+        with self.lock:
+            procs = list(self.procs.values())
+        for proc in procs:
+            proc.poll() is None and proc.terminate()
+        if timeout is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self.procs and time.monotonic() < deadline: # the worker threads discard the subprocesses that exited
+            time.sleep(0.01)
+        with self.lock:
+            procs = list(self.procs.values())
+        for proc in procs:
+            proc.poll() is None and proc.kill()
+
+
+_live = weakref.WeakSet() # dispatchers whose job was submitted but not cleaned (or cancelled)
+_live_lock = threading.RLock() # reentrant, the signal handlers (see cancel_on_exit) may interrupt its holder
+_handled = False
+def _add_live(dispatcher):
+    with _live_lock:
+        _live.add(dispatcher)
+
+def _discard_live(dispatcher):
+    with _live_lock:
+        _live.discard(dispatcher)
+
+def cancel_live():
+    """
+    cancels the jobs of every dispatcher of the process that was submitted but not yet cleaned (see SHDispatcher.cancel)
+    Returns
+    -------
+    the number of cancelled jobs
+    """
+    with _live_lock:
+        dispatchers = list(_live)
+    return sum(bool(dispatcher.cancel()) for dispatcher in dispatchers)
+
+def cancel_on_exit(signals=(signal.SIGTERM, signal.SIGINT)):
+    """
+    cancels the live jobs (see cancel_live()) when the process exits or receives one of signals, so that an
+    interrupted search does not leave its jobs running. signal handlers can only be installed from the main thread,
+    otherwise only the exit handler is. the previous handlers are called afterwards. idempotent
+    """
+    global _handled
+    with _live_lock:
+        if _handled:
+            return
+        _handled = True
+    atexit.register(cancel_live)
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for signum in signals:
+        previous = signal.getsignal(signum)
+        def handler(signum, frame, previous=previous):
+            cancel_live()
+            if callable(previous):
+                return previous(signum, frame)
+            if previous == signal.SIG_IGN:
+                return
+            signal.signal(signum, signal.SIG_DFL)
+            os.kill(os.getpid(), signum)
+        signal.signal(signum, handler)
+
 DISPATCHERS = {
     'INET': INETDispatcher,
     'UNIX': UNIXDispatcher,
     'SFS': SFSDispatcher,
-    'NOF': NOFDispatcher
+    'SFSARRAY': SFSArrayDispatcher,
+    'SHM': SHMDispatcher,
+    'NOF': NOFDispatcher,
+    'LOCALPOOL': LocalPoolDispatcher,
+    'ASYNCINET': AsyncINETDispatcher,
+    'ASYNCUNIX': AsyncUNIXDispatcher,
 }
 def create_dispatcher(dispatcher_type):
     """
@@ -0,0 +1,424 @@
+"""
+local batch scheduler emulator, for measuring the dispatch overhead of pubtk without a live cluster.
+a daemon (SchedulerEmulator) runs submitted scripts as local processes on a fixed number of slots, with configurable
+queue latency and failure injection. qsub / qstat / qdel (SGE) and sbatch / squeue / scancel / srun (SLURM) shims are
+installed into a directory, so that the emulator is used by simply putting that directory on PATH (or by using the
+shims as the command of a Submit's submit_template).
+
+use:
+    emulator = SchedulerEmulator('/tmp/scheduler.s', slots=8, latency=0.5, failure_rate=0.05)
+    emulator.install('/tmp/scheduler/bin') # then export PATH=/tmp/scheduler/bin:$PATH
+    emulator.start()
+    ...
+    emulator.close()
+or from the command line:
+    python -m pubtk.runtk.emulators --socket /tmp/scheduler.s --bin /tmp/scheduler/bin --slots 8 --latency 0.5
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import signal
+import socket
+import argparse
+import itertools
+import threading
+import subprocess
+from xml.sax.saxutils import escape
+from pubtk.runtk.sockets import Socket, UNIXSocket, HEADER, TEXT
+
+SGE = 'sge'
+SLURM = 'slurm'
+COMMANDS = {'qsub': SGE, 'qstat': SGE, 'qdel': SGE, 'sbatch': SLURM, 'squeue': SLURM, 'scancel': SLURM}
+REQUESTS = set(COMMANDS) | {'stats'} # the methods clients may call through the socket
+
+# the shims are standalone (no pubtk import) so that their startup cost is close to that of a real client
+CLIENT = """\
+#!{python}
+# {command} shim of the pubtk scheduler emulator (see pubtk.runtk.emulators)
+import os, sys, json, socket, struct
+connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+connection.connect({socket_name!r})
+message = json.dumps({{'command': {command!r}, 'args': sys.argv[1:], 'cwd': os.getcwd(),
+                      'env': dict(os.environ)}}).encode()
+header = struct.Struct({header!r}) # a TEXT frame, see pubtk.runtk.sockets
+connection.sendall(header.pack({text}, 0, 0, len(message)) + message)
+def recvn(n):
+    data = bytearray()
+    while len(data) < n:
+        packet = connection.recv(n - len(data))
+        if not packet:
+            sys.exit("scheduler emulator closed the connection")
+        data.extend(packet)
+    return data
+_, _, metalen, length = header.unpack(recvn(header.size))
+reply = json.loads(recvn(metalen + length)[metalen:])
+sys.stdout.write(reply['stdout'])
+sys.stderr.write(reply['stderr'])
+sys.exit(reply['returncode'])
+"""
+
+SRUN = """\
+#!/bin/sh
+# srun shim of the pubtk scheduler emulator, runs the job step locally
+while [ "${1#-}" != "$1" ]; do shift; done
+exec "$@"
+"""
+
+DIRECTIVES = {
+    SGE: {'prefix': '#$', 'array': r'-t\s+(\S+)', 'name': r'-N\s+(\S+)', 'output': r'-o\s+(\S+)'},
+    SLURM: {'prefix': '#SBATCH', 'array': r'--array[=\s]+(\S+)', 'name': r'--job-name[=\s]+(\S+)',
+            'output': r'(?:-o|--output)[=\s]+(\S+)'},
+}
+
+STATES = { # (sge, slurm) state codes
+    'queued': ('qw', 'PD'),
+    'running': ('r', 'R'),
+    'failed': ('Eqw', 'F'),
+}
+
+
+class Task(object):
+    """
+    a single task (a job, or one task of an array job) of the emulator
+    """
+    def __init__(self, job, task, flavor, name, script, cwd, env, output, eligible):
+        self.job = job
+        self.task = task # None if not an array job
+        self.flavor = flavor
+        self.name = name
+        self.script = script
+        self.cwd = cwd
+        self.env = env
+        self.output = output
+        self.state = 'queued'
+        self.submitted = time.monotonic()
+        self.eligible = eligible
+        self.started = None
+        self.finished = None
+        self.returncode = None
+        self.proc = None
+
+    def get_id(self):
+        if self.task is None:
+            return str(self.job)
+        return "{}{}{}".format(self.job, '.' if self.flavor == SGE else '_', self.task)
+
+    def get_code(self):
+        return STATES[self.state][self.flavor == SLURM]
+
+
+class SchedulerEmulator(object):
+    """
+    local batch scheduler emulator, see module docstring
+    """
+    def __init__(self, socket_name, slots=4, latency=0.0, failure_rate=0.0, seed=None, shell='/bin/bash'):
+        """
+        Parameters
+        ----------
+        socket_name  - the AF_UNIX socket file the daemon listens on (and the shims connect to)
+        slots        - the number of tasks run concurrently
+        latency      - the time (in seconds) a task waits in the queue before it is eligible to run
+        failure_rate - the probability that a task fails instead of running (reported as Eqw / F until deleted)
+        seed         - *Optional* seed of the failure injection
+        shell        - the shell used to run the submitted scripts
+        """
+        self.socket = UNIXSocket(socket_name=socket_name)
+        self.name = socket_name
+        self.slots = slots
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.shell = shell
+        self.jobs = itertools.count(1)
+        self.tasks = {} # id -> Task, queued, running or failed
+        self.done = [] # finished Tasks
+        self.running = 0
+        self.condition = threading.Condition()
+        self.threads = []
+        self.closed = False
+
+    def install(self, bin_path):
+        """
+        writes the qsub / qstat / qdel / sbatch / squeue / scancel / srun shims to bin_path
+        Returns
+        -------
+        bin_path
+        """
+        os.makedirs(bin_path, exist_ok=True)
+        for command in COMMANDS:
+            self.write_shim(os.path.join(bin_path, command),
+                            CLIENT.format(python=sys.executable, command=command, socket_name=self.name,
+                                          header=HEADER.format, text=TEXT))
+        self.write_shim(os.path.join(bin_path, 'srun'), SRUN)
+        return bin_path
+
+    def write_shim(self, path, content):
+        with open(path, 'w') as fptr:
+            fptr.write(content)
+        os.chmod(path, 0o755)
+
+    def start(self):
+        """
+        starts the daemon in background threads
+        """
+        self.socket.listen(socket.SOMAXCONN)
+        for target in (self.serve, self.schedule):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self.name
+
+    def serve(self):
+        while not self.closed:
+            try:
+                connection, _ = self.socket.socket.accept()
+            except OSError:
+                if self.closed:
+                    return
+                continue
+            threading.Thread(target=self.handle, args=(connection,), daemon=True).start()
+
+    def handle(self, connection):
+        peer = Socket(socket_name=self.name, socket_type=socket.AF_UNIX, connection=connection)
+        try:
+            command = None
+            try:
+                request = json.loads(peer.recv())
+                command = request['command']
+                if command not in REQUESTS:
+                    raise ValueError("unknown command")
+                stdout = getattr(self, command)(request['args'], request['cwd'], request['env'])
+                reply = {'stdout': stdout, 'stderr': '', 'returncode': 0}
+            except Exception as e:
+                reply = {'stdout': '', 'stderr': "{}: {}\n".format(command, e), 'returncode': 1}
+            peer.send(json.dumps(reply))
+        finally:
+            peer.close()
+
+    def parse(self, script, flavor):
+        """
+        Returns
+        -------
+        (name, tasks, output) from the directives of script, tasks is None if not an array job
+        """
+        directives = DIRECTIVES[flavor]
+        with open(script, 'r') as fptr:
+            lines = [line[len(directives['prefix']):] for line in fptr if line.startswith(directives['prefix'])]
+        values = {}
+        for key in ('array', 'name', 'output'):
+            for line in lines:
+                match = re.search(directives[key], line)
+                if match:
+                    values[key] = match.group(1)
+        tasks = None
+        if 'array' in values:
+            tasks = []
+            for chunk in values['array'].split('%')[0].split(','):
+                span, _, step = chunk.partition(':')
+                start, _, stop = span.partition('-')
+                tasks.extend(range(int(start), int(stop or start) + 1, int(step or 1)))
+        return values.get('name', os.path.basename(script)), tasks, values.get('output')
+
+    def submit(self, args, cwd, env, flavor):
+        script = os.path.join(cwd, args[-1])
+        name, tasks, output = self.parse(script, flavor)
+        with self.condition:
+            job = next(self.jobs)
+            eligible = time.monotonic() + self.latency
+            for task in tasks or [None]:
+                task = Task(job, task, flavor, name, script, cwd, env, output, eligible)
+                self.tasks[task.get_id()] = task
+            self.condition.notify_all()
+        return job, name, tasks
+
+    def qsub(self, args, cwd, env):
+        job, name, tasks = self.submit(args, cwd, env, SGE)
+        if tasks:
+            return 'Your job-array {}.{}-{}:1 ("{}") has been submitted\n'.format(job, tasks[0], tasks[-1], name)
+        return 'Your job {} ("{}") has been submitted\n'.format(job, name)
+
+    def sbatch(self, args, cwd, env):
+        job, name, tasks = self.submit(args, cwd, env, SLURM)
+        if '--parsable' in args:
+            return "{}\n".format(job)
+        return "Submitted batch job {}\n".format(job)
+
+    def get_tasks(self, flavor):
+        with self.condition:
+            return [task for task in self.tasks.values() if task.flavor == flavor]
+
+    def qstat(self, args, cwd, env):
+        tasks = self.get_tasks(SGE)
+        if '-xml' not in args:
+            lines = ["{:<10} {:<10} {:<5} {}".format(task.job, task.name[:10], task.get_code(), task.task or '')
+                     for task in tasks]
+            return "".join("{}\n".format(line) for line in lines)
+        running = [task for task in tasks if task.state == 'running']
+        pending = [task for task in tasks if task.state != 'running']
+        def job_list(task, state):
+            return ("    <job_list state=\"{}\">\n      <JB_job_number>{}</JB_job_number>\n"
+                    "      <JB_name>{}</JB_name>\n      <state>{}</state>\n{}    </job_list>\n").format(
+                state, task.job, escape(task.name), task.get_code(),
+                "      <tasks>{}</tasks>\n".format(task.task) if task.task is not None else "")
+        return ("<?xml version='1.0'?>\n<job_info>\n  <queue_info>\n{}  </queue_info>\n  <job_info>\n{}  </job_info>\n"
+                "</job_info>\n").format("".join(job_list(task, 'running') for task in running),
+                                        "".join(job_list(task, 'pending') for task in pending))
+
+    def squeue(self, args, cwd, env):
+        tasks = self.get_tasks(SLURM)
+        header = '-h' not in args and '--noheader' not in args
+        fmt = args[args.index('-o') + 1] if '-o' in args else '%i %j %t'
+        if '-j' in args:
+            jobs = set(args[args.index('-j') + 1].split(','))
+            tasks = [task for task in tasks if str(task.job) in jobs or task.get_id() in jobs]
+        fields = {'%i': lambda task: task.get_id(), '%j': lambda task: task.name, '%t': lambda task: task.get_code(),
+                  '%A': lambda task: str(task.job), '%a': lambda task: str(task.task or '')}
+        def format_line(values):
+            line = fmt
+            for field, value in values.items():
+                line = line.replace(field, value)
+            return "{}\n".format(line)
+        lines = [format_line({'%i': 'JOBID', '%j': 'NAME', '%t': 'ST', '%A': 'ARRAY_JOB_ID', '%a': 'ARRAY_TASK_ID'})
+                 ] if header else []
+        lines.extend(format_line({field: get(task) for field, get in fields.items()}) for task in tasks)
+        return "".join(lines)
+
+    def delete(self, args, flavor):
+        targets = {arg.replace('_', '.') for arg in args if not arg.startswith('-')}
+        deleted = []
+        with self.condition:
+            for task_id, task in list(self.tasks.items()):
+                if task.flavor != flavor or not ({str(task.job), task_id.replace('_', '.')} & targets):
+                    continue
+                del self.tasks[task_id]
+                deleted.append(task)
+                if task.proc and task.proc.poll() is None:
+                    try:
+                        os.killpg(task.proc.pid, signal.SIGTERM)
+                    except ProcessLookupError:
+                        pass
+        return deleted
+
+    def qdel(self, args, cwd, env):
+        deleted = self.delete(args, SGE)
+        return "".join("{} has deleted job {}\n".format(env.get('USER', 'user'), task.get_id()) for task in deleted)
+
+    def scancel(self, args, cwd, env):
+        self.delete(args, SLURM)
+        return ""
+
+    def stats(self, args=None, cwd=None, env=None):
+        """
+        Returns
+        -------
+        json of the task counts, and of the mean queue wait and run time (in seconds) of the finished tasks
+        """
+        with self.condition:
+            done = list(self.done)
+            states = [task.state for task in self.tasks.values()]
+        count = len(done) or 1
+        return json.dumps({'queued': states.count('queued'), 'running': states.count('running'),
+                           'failed': states.count('failed'), 'finished': len(done),
+                           'wait': sum(task.started - task.submitted for task in done) / count,
+                           'run': sum(task.finished - task.started for task in done) / count})
+
+    def schedule(self):
+        with self.condition:
+            while not self.closed:
+                now = time.monotonic()
+                queued = sorted((task for task in self.tasks.values() if task.state == 'queued'),
+                                key=lambda task: task.eligible)
+                for task in queued:
+                    if task.eligible > now or self.running >= self.slots:
+                        break
+                    if self.random.random() < self.failure_rate:
+                        task.state = 'failed'
+                        continue
+                    self.launch(task)
+                waits = [task.eligible - now for task in queued if task.state == 'queued' and task.eligible > now]
+                self.condition.wait(min(waits) if waits and self.running < self.slots else None)
+
+    def launch(self, task):
+        # called with self.condition held
+        env = dict(task.env)
+        if task.flavor == SGE:
+            env.update({'JOB_ID': str(task.job), 'JOB_NAME': task.name,
+                        'SGE_TASK_ID': str(task.task) if task.task is not None else 'undefined'})
+        else:
+            env.update({'SLURM_JOB_ID': str(task.job), 'SLURM_JOB_NAME': task.name})
+            if task.task is not None:
+                env.update({'SLURM_ARRAY_JOB_ID': str(task.job), 'SLURM_ARRAY_TASK_ID': str(task.task)})
+        stdout = subprocess.DEVNULL
+        if task.output:
+            output = task.output.replace('$JOB_ID', str(task.job)).replace('%j', str(task.job))\
+                .replace('%A', str(task.job)).replace('$TASK_ID', str(task.task)).replace('%a', str(task.task))
+            try:
+                stdout = open(os.path.join(task.cwd, output), 'w')
+            except OSError:
+                stdout = subprocess.DEVNULL
+        task.proc = subprocess.Popen([self.shell, task.script], cwd=task.cwd, env=env, stdout=stdout,
+                                     stderr=subprocess.STDOUT, start_new_session=True)
+        if stdout is not subprocess.DEVNULL:
+            stdout.close()
+        task.state = 'running'
+        task.started = time.monotonic()
+        self.running += 1
+        threading.Thread(target=self.reap, args=(task,), daemon=True).start()
+
+    def reap(self, task):
+        task.returncode = task.proc.wait()
+        with self.condition:
+            task.finished = time.monotonic()
+            self.running -= 1
+            if self.tasks.get(task.get_id()) is task:
+                del self.tasks[task.get_id()]
+                self.done.append(task)
+            self.condition.notify_all()
+
+    def close(self):
+        """
+        stops the daemon, running tasks are terminated
+        """
+        with self.condition:
+            self.closed = True
+            for task in self.tasks.values():
+                if task.proc and task.proc.poll() is None:
+                    try:
+                        os.killpg(task.proc.pid, signal.SIGTERM)
+                    except ProcessLookupError:
+                        pass
+            self.condition.notify_all()
+        try:
+            self.socket.socket.shutdown(socket.SHUT_RDWR) # wakes the blocking accept() in serve()
+        except OSError:
+            pass
+        self.socket.close()
+        for thread in self.threads:
+            thread.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="pubtk local batch scheduler emulator")
+    parser.add_argument('--socket', required=True, help='the AF_UNIX socket file of the daemon')
+    parser.add_argument('--bin', help='*Optional* directory to install the qsub/qstat/qdel/sbatch/squeue/scancel shims')
+    parser.add_argument('--slots', type=int, default=4, help='the number of tasks run concurrently')
+    parser.add_argument('--latency', type=float, default=0.0, help='the queue latency (in seconds) of each task')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='the probability that a task fails')
+    parser.add_argument('--seed', type=int, help='seed of the failure injection')
+    args = parser.parse_args(argv)
+    emulator = SchedulerEmulator(args.socket, slots=args.slots, latency=args.latency,
+                                 failure_rate=args.failure_rate, seed=args.seed)
+    args.bin and emulator.install(args.bin)
+    emulator.start()
+    print("scheduler emulator listening on {}".format(args.socket), flush=True)
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    stop.wait()
+    emulator.close()
+
+if __name__ == '__main__':
+    main()
@@ -6,7 +6,10 @@ SUBMIT = 'submit'
 STDOUT = 'stdout'
 MSGOUT = 'msgout'
 SGLOUT = 'signal'
+HBTOUT = 'heartbeat' # heartbeat file of a file runner (see runtk.Dispatcher, heartbeat=...)
 SOCKET = 'socketname'
+TABLE = 'table' # parameter table of array jobs, one row of mappings per task (see runtk.SGEArraySubmit)
+PARAMS = 'params' # sidecar file of mappings (see runtk.Dispatcher, sidecar=True)
 
 HANDLES = {SUBMIT: 'runtk.SUBMIT',
            STDOUT: 'runtk.STDOUT',
@@ -14,6 +17,22 @@ HANDLES = {SUBMIT: 'runtk.SUBMIT',
            SGLOUT: 'runtk.SGLOUT',
            SOCKET: 'runtk.SOCKET'}
 
+CLOSE = '__close__' # sent by a dispatcher to end a persistent worker (see runtk.SocketRunner.tasks)
+TIMELINE = '__timeline__' # header of results framed with the runner's timeline (see runtk.Timeline)
+ZLIB = b'\x00zlib\n' # magic prefix of zlib compressed result files (see runtk.FileRunner.write)
+RESULT = b'\x00rslt\n' # magic prefix of binary result containers (see runtk.Result)
+FRAME = b'\x00frme\n' # magic prefix of cached socket frames, json, bytes and arrays (see runtk.ResultCache)
+SHM = '__shm__' # header of the array index of results written to shared memory (see runtk.SHMRunner)
+ZLIB_LEVEL = 1 # compression level of results, favoring speed (see runtk.sockets.compress)
+
+# job states reported by Submit.query_jobs (see runtk.JobMonitor)
+QUEUED = 'queued'
+RUNNING = 'running'
+FINISHED = 'finished' # no longer known to the scheduler
+FAILED = 'failed'
+UNKNOWN = 'unknown'
+ALIVE = {QUEUED, RUNNING, UNKNOWN}
+
 SUPPORTS = {
     'INT': int,
     'FLOAT': float,
@@ -25,10 +44,16 @@ SUPPORTS = {
 
 ALIASES = namedtuple('ALIASES', 'SOCKET FILE')(
     {'socketname': 'SOCNAME',
+     'socketgid': 'SOCGID',
+     'paramfile': 'PRMFILE',
      'jobid': 'JOBID'},
     {'signalfile': 'SGLFILE',
      'writefile': 'OUTFILE',
-     'jobid': 'JOBID'})
+     'jobid': 'JOBID',
+     'tablefile': 'TBLFILE',
+     'paramfile': 'PRMFILE',
+     'heartbeatfile': 'HBTFILE',
+     'taskid': 'TASKID'})
 
 EXTENSIONS = { #anything that can be found in a path name to be included.
     SUBMIT: '[a-zA-Z0-9\{\}_/\.]*\.[a-z]*sh', # sh, bash, csh, zsh, tcsh, etc. ask a sysadmin how they'd do this.
@@ -0,0 +1,103 @@
+import math
+import time
+
+
+class ConcurrencyController(object):
+    """
+    adaptive limit on the number of concurrent trials, additive increase / multiplicative decrease (AIMD) driven by
+    the observed queue wait (job submission -> runner start) and completion rate of the trials.
+    the limit widens while jobs start within target_wait (the scheduler has free slots) and shrinks once they sit in
+    the queue, so that the cluster is kept busy without the searcher committing to configurations that only wait.
+    the limit is also capped by the number of trials needed to sustain the observed completion rate (Little's law,
+    completion rate x trial runtime) with some headroom, so that it does not run away from the throughput.
+    (see raytk.AdaptiveConcurrencyLimiter)
+
+    use:
+        controller = ConcurrencyController(initial=4, maximum=64, target_wait=30)
+        ...
+        limit = controller.observe(wait=record['durations']['queue'], runtime=record['durations']['total'])
+    """
+    def __init__(self, initial=4, minimum=1, maximum=64, target_wait=30.0, increase=1, decrease=0.5, alpha=0.3,
+                 headroom=1.5):
+        """
+        Parameters
+        ----------
+        *Optional*
+        initial     - the initial limit
+        minimum     - the lower bound of the limit
+        maximum     - the upper bound of the limit
+        target_wait - the queue wait (in seconds) under which jobs are considered to start immediately
+        increase    - the additive increase of the limit per trial that started immediately
+        decrease    - the multiplicative decrease of the limit once trials wait in the queue
+        alpha       - the smoothing factor of the moving averages (queue wait, runtime, interval between completions)
+        headroom    - the factor of the throughput cap (completion rate x runtime x headroom)
+        """
+        self.limit = max(min(int(initial), maximum), minimum)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_wait = target_wait
+        self.increase = increase
+        self.decrease = decrease
+        self.alpha = alpha
+        self.headroom = headroom
+        self.wait = None     # moving average of the queue wait
+        self.runtime = None  # moving average of the trial runtime (submission -> result)
+        self.interval = None # moving average of the time between completions
+        self.last = None     # time.monotonic() of the last completion
+        self.cooldown = 0    # completions before the limit can decrease again
+
+    def average(self, average, value):
+        return value if average is None else average + self.alpha * (value - average)
+
+    @property
+    def rate(self):
+        """
+        the observed completion rate (trials per second), None until two trials completed
+        """
+        if not self.interval:
+            return None
+        return 1 / self.interval
+
+    def capacity(self):
+        """
+        Returns
+        -------
+        the number of concurrent trials needed to sustain the observed completion rate (with headroom), the maximum
+        until the rate and runtime are known
+        """
+        if self.rate is None or self.runtime is None:
+            return self.maximum
+        return max(math.ceil(self.rate * self.runtime * self.headroom), self.minimum)
+
+    def observe(self, wait=None, runtime=None, now=None):
+        """
+        updates the limit with a completed trial
+        Parameters
+        ----------
+        wait    - *Optional* the queue wait (in seconds) of the trial, the limit is only adapted to observed waits
+        runtime - *Optional* the runtime (in seconds) of the trial, submission to result
+        now     - *Optional* the time.monotonic() time of completion, defaults to now
+        Returns
+        -------
+        the updated limit
+        """
+        now = time.monotonic() if now is None else now
+        if self.last is not None:
+            self.interval = self.average(self.interval, now - self.last)
+        self.last = now
+        if runtime is not None:
+            self.runtime = self.average(self.runtime, runtime)
+        self.cooldown = max(self.cooldown - 1, 0)
+        if wait is None:
+            return self.limit
+        self.wait = self.average(self.wait, wait)
+        if self.wait > self.target_wait:
+            if not self.cooldown: # once per generation, the trials in flight were submitted at the previous limit
+                self.limit = max(int(self.limit * self.decrease), self.minimum)
+                self.cooldown = self.limit
+        elif self.limit < self.capacity():
+            self.limit = min(self.limit + self.increase, self.maximum)
+        return self.limit
+
+    def __repr__(self):
+        return "ConcurrencyController(limit={}, wait={}, rate={})".format(self.limit, self.wait, self.rate)
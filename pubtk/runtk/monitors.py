@@ -0,0 +1,114 @@
+import threading
+from pubtk import runtk
+
+
+class JobMonitor(object):
+    """
+    shared job state monitor
+    keeps the job ids of every registered (submitted) job and polls their state in batches, with a single scheduler
+    call per Submit class per interval (i.e. one `qstat -xml` for every SGE job, one `ps` for every ZSH pid, see
+    Submit.query_jobs) rather than one call per job.
+    dispatchers given a monitor check it while waiting on their runner and fail fast (RuntimeError) once the job is
+    no longer alive, rather than blocking forever on a crashed job.
+
+    use:
+        monitor = JobMonitor(interval=10)
+        dispatcher = SFSDispatcher(monitor=monitor, ...)
+        dispatcher.run()
+        data = dispatcher.recv() # raises RuntimeError if the job dies before signaling completion
+    """
+    def __init__(self, interval=10.0, grace=None):
+        """
+        *Optional* Parameters
+        ----------
+        interval - the time (in seconds) between polls of the scheduler
+        grace    - the time (in seconds) a dispatcher still waits for a result after its job is found dead, covering
+                   results written just before the job exited, defaults to min(interval, 1.0)
+        """
+        self.interval = interval
+        self.grace = min(interval, 1.0) if grace is None else grace
+        self.jobs = {} # (Submit class, job_id) -> state
+        self.lock = threading.Lock()
+        self.event = threading.Event()
+        self.thread = None
+        self.closed = False
+
+    def start(self):
+        if not self.thread:
+            self.thread = threading.Thread(target=self.serve, daemon=True)
+            self.thread.start()
+
+    def register(self, submit, job_id):
+        """
+        starts monitoring a submitted job
+        Parameters
+        ----------
+        submit - the Submit object (or class) the job was submitted with
+        job_id - the job id returned by submit.submit_job()
+        """
+        key = (self.get_class(submit), str(job_id))
+        with self.lock:
+            self.jobs.setdefault(key, runtk.UNKNOWN)
+        self.start()
+
+    def unregister(self, submit, job_id):
+        with self.lock:
+            self.jobs.pop((self.get_class(submit), str(job_id)), None)
+
+    def get_class(self, submit):
+        return submit if isinstance(submit, type) else type(submit)
+
+    def status(self, submit, job_id):
+        """
+        Returns
+        -------
+        the last polled state of the job (see runtk.QUEUED, runtk.RUNNING, runtk.FINISHED, runtk.FAILED), runtk.UNKNOWN
+        if the job has not been polled yet or is not registered
+        """
+        with self.lock:
+            return self.jobs.get((self.get_class(submit), str(job_id)), runtk.UNKNOWN)
+
+    def alive(self, submit, job_id):
+        return self.status(submit, job_id) in runtk.ALIVE
+
+    def poll(self):
+        """
+        polls the state of every registered job, one Submit.query_jobs call per Submit class
+        """
+        with self.lock:
+            batches = {}
+            for cls, job_id in self.jobs:
+                batches.setdefault(cls, []).append(job_id)
+        for cls, job_ids in batches.items():
+            try:
+                states = cls.query_jobs(job_ids)
+            except Exception: # the scheduler is unavailable, keep the last known states
+                continue
+            with self.lock:
+                for job_id, state in states.items():
+                    if (cls, job_id) in self.jobs:
+                        self.jobs[(cls, job_id)] = state
+
+    def serve(self):
+        while not self.event.wait(self.interval):
+            self.poll()
+
+    def close(self):
+        self.closed = True
+        self.event.set()
+        if self.thread:
+            self.thread.join()
+
+_monitor = None
+_monitor_lock = threading.Lock()
+def get_monitor(interval=10.0):
+    """
+    Returns
+    -------
+    the process wide JobMonitor, created with interval on first use
+    """
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = JobMonitor(interval=interval)
+        return _monitor
@@ -0,0 +1,349 @@
+import queue
+import threading
+import statistics
+import time
+from concurrent.futures import Future
+
+
+class WorkerPool(object):
+    """
+    pool of persistent workers, each a long lived runner (see runtk.SocketRunner.tasks) started once through a
+    bidirectional dispatcher (runtk.INETDispatcher, runtk.UNIXDispatcher). configurations are queued and handed to
+    whichever worker is idle, so that the cost of job submission and runner startup (importing NEURON, loading
+    mechanisms, building the network) is paid once per worker rather than once per configuration.
+
+    use:
+        pool = WorkerPool(INETDispatcher, submit=submit, project_path=os.getcwd(), size=4)
+        pool.start()
+        results = list(pool.map(configs))
+        pool.close()
+    """
+    def __init__(self, dispatcher_constructor, submit, project_path, output_path='.', size=1, label='worker',
+                 env=None, timeout=None, **kwargs):
+        """
+        Parameters
+        ----------
+        dispatcher_constructor - constructor of a bidirectional dispatcher (runtk.INETDispatcher, runtk.UNIXDispatcher)
+        submit                 - Submit object whose command starts a persistent worker
+        project_path           - see runtk.SHDispatcher
+        output_path            - see runtk.SHDispatcher
+        size                   - the number of workers
+        label                  - the workers are labeled {label}_{0..size-1}
+        env                    - *Optional* dictionary of mappings shared by all workers (see runtk.Dispatcher.update_env)
+        timeout                - *Optional* the time (in seconds) to wait for each worker to connect, defaults to None
+                                 (blocks). a worker that does not connect in time, or whose job dies before connecting
+                                 (monitor=runtk.JobMonitor, see runtk.SHDispatcher.wait), is lost
+        **kwargs               - passed to the dispatcher_constructor (i.e. server=runtk.DispatcherServer,
+                                 monitor=runtk.JobMonitor)
+        """
+        self.dispatchers = [dispatcher_constructor(project_path=project_path, output_path=output_path, submit=submit,
+                                                   gid="{}_{}".format(label, i), **kwargs) for i in range(size)]
+        for dispatcher in self.dispatchers:
+            env and dispatcher.update_env(env)
+        self.queue = queue.Queue()
+        self.threads = []
+        self.alive = 0
+        self.error = None # set once every worker is lost, failing the configurations submitted afterwards
+        self.timeout = timeout
+        self.lock = threading.Lock()
+
+    def start(self, **kwargs):
+        """
+        submits the workers, each worker is served by a thread that accepts its connection then dispatches queued
+        configurations to it
+        """
+        for dispatcher in self.dispatchers:
+            dispatcher.run(**kwargs)
+            thread = threading.Thread(target=self.work, args=(dispatcher,), daemon=True)
+            self.threads.append(thread)
+            with self.lock:
+                self.alive += 1
+            thread.start()
+
+    def work(self, dispatcher):
+        try:
+            dispatcher.accept(timeout=self.timeout)
+        except Exception as e:
+            self.lose(RuntimeError("worker {} did not connect: {!r}".format(dispatcher.label, e)))
+            return
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            future, dictionary, value_type = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                data = dispatcher.dispatch(dictionary, value_type=value_type)
+            except Exception as e:
+                data, error = None, e
+            else:
+                error = RuntimeError("worker {} closed its connection".format(dispatcher.label)) if data is None else None
+            if error: # the worker is lost, stop handing it configurations
+                future.set_exception(error)
+                self.lose(error)
+                return
+            future.set_result(data)
+        dispatcher.release()
+
+    def lose(self, error):
+        with self.lock:
+            self.alive -= 1
+            if self.alive:
+                return
+            self.error = error
+        while True: # no workers left, fail whatever is still queued
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if item and item[0].set_running_or_notify_cancel():
+                item[0].set_exception(error)
+
+    def submit(self, dictionary, value_type=None):
+        """
+        queues a configuration for the next idle worker
+        Parameters
+        ----------
+        dictionary - the dictionary of key: values of the configuration
+        value_type (optional) - see runtk.Dispatcher.update_env()
+        Returns
+        -------
+        a concurrent.futures.Future of the result, failed if every worker was lost
+        """
+        future = Future()
+        with self.lock:
+            if self.error:
+                future.set_exception(self.error)
+                return future
+            self.queue.put((future, dictionary, value_type))
+        return future
+
+    def map(self, dictionaries, value_type=None):
+        """
+        Returns
+        -------
+        generator of results, in the order of dictionaries
+        """
+        futures = [self.submit(dictionary, value_type) for dictionary in dictionaries]
+        return (future.result() for future in futures)
+
+    def close(self, handles=None):
+        """
+        ends the workers once the queued configurations are done, then cleans the dispatchers
+        """
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        for dispatcher in self.dispatchers:
+            dispatcher.clean(handles)
+
+class _Trial(object):
+    """
+    a configuration of a SpeculativePool, its future and the dispatchers of its attempts
+    """
+    def __init__(self, index, dictionary, value_type):
+        self.index = index
+        self.dictionary = dictionary
+        self.value_type = value_type
+        self.future = Future()
+        self.start = time.monotonic()
+        self.attempts = [] # the dispatchers of the attempts still running
+        self.launched = 0 # the number of attempts launched, failed attempts included
+        self.done = False
+
+class SpeculativePool(object):
+    """
+    pool of one-shot trials, each configuration runs as its own job (see runtk.SHDispatcher), with speculative
+    re-execution of stragglers: once a trial has run longer than factor x the median runtime (submission to result) of
+    the completed trials, a duplicate of its configuration is submitted. the first result wins, the other attempts are
+    cancelled through the scheduler (see runtk.SHDispatcher.cancel) and cleaned, so that the last few trials of a
+    batch landing on slow or overloaded nodes do not hold up the whole batch.
+
+    use:
+        pool = SpeculativePool(SFSDispatcher, submit=submit, project_path=os.getcwd(), factor=2.0)
+        results = list(pool.map(configs))
+        pool.close()
+    """
+    def __init__(self, dispatcher_constructor, submit, project_path, output_path='.', label='trial', env=None,
+                 factor=2.0, min_completed=3, duplicates=1, interval=1.0, timeout=None, handles=None, **kwargs):
+        """
+        Parameters
+        ----------
+        dispatcher_constructor - constructor of the dispatchers (i.e. runtk.SFSDispatcher, runtk.INETDispatcher)
+        submit                 - Submit object of the trials, shared by the dispatchers (jobs are submitted one at a
+                                 time)
+        project_path           - see runtk.SHDispatcher
+        output_path            - see runtk.SHDispatcher
+        label                  - the trials are labeled {label}_{index}, their duplicates {label}_{index}_{attempt}
+        env                    - *Optional* dictionary of mappings shared by all trials (see runtk.Dispatcher.update_env)
+        factor                 - a trial is duplicated once it has run for factor x the median runtime
+        min_completed          - the number of completed trials before the median runtime is trusted
+        duplicates             - the maximum number of duplicates launched per trial (failed duplicates included)
+        interval               - the interval (in seconds) at which running trials are checked
+        timeout                - *Optional* the time (in seconds) to wait for each attempt to connect (see
+                                 runtk.SOCKDispatcher.accept), defaults to None (blocks)
+        handles                - *Optional* the handles removed when the attempts are cleaned (see
+                                 runtk.SHDispatcher.clean)
+        **kwargs               - passed to the dispatcher_constructor (i.e. monitor=runtk.JobMonitor, hang_timeout=...)
+        """
+        self.dispatcher_constructor = dispatcher_constructor
+        self.kwargs = dict(kwargs, submit=submit, project_path=project_path, output_path=output_path)
+        self.label = label
+        self.env = env
+        self.factor = factor
+        self.min_completed = min_completed
+        self.duplicates = duplicates
+        self.interval = interval
+        self.timeout = timeout
+        self.handles = handles
+        self.trials = [] # running trials
+        self.runtimes = [] # of the completed trials
+        self.duplicated = 0 # the number of duplicates submitted
+        self.count = 0
+        self.lock = threading.Lock()
+        self.submit_lock = threading.Lock() # the dispatchers share the submit instance
+        self.event = threading.Event()
+        self.thread = None
+
+    def create_dispatcher(self, trial):
+        gid = "{}_{}".format(self.label, trial.index)
+        if trial.launched: # unique per attempt, so that attempts do not share files or sockets
+            gid = "{}_{}".format(gid, trial.launched)
+        dispatcher = self.dispatcher_constructor(gid=gid, **self.kwargs)
+        self.env and dispatcher.update_env(self.env)
+        dispatcher.update_env(trial.dictionary, value_type=trial.value_type)
+        return dispatcher
+
+    def launch(self, trial):
+        # called with self.lock held
+        dispatcher = self.create_dispatcher(trial)
+        trial.attempts.append(dispatcher)
+        trial.launched = trial.launched + 1
+        threading.Thread(target=self.attempt, args=(trial, dispatcher), daemon=True).start()
+
+    def attempt(self, trial, dispatcher):
+        try:
+            with self.submit_lock:
+                if trial.done:
+                    return
+                dispatcher.run()
+            if trial.done: # decided while submitting
+                dispatcher.cancel()
+                dispatcher.clean(self.handles)
+                return
+            dispatcher.accept(timeout=self.timeout)
+            if trial.done: # cancelled and cleaned by the winner
+                return
+            data = dispatcher.recv()
+        except Exception as e:
+            data, error = None, e
+        else:
+            error = RuntimeError("{} closed its connection".format(dispatcher.label)) if data is None else None
+        self.finish(trial, dispatcher, data, error)
+
+    def finish(self, trial, dispatcher, data, error):
+        with self.lock:
+            if trial.done: # lost to another attempt, cancelled and cleaned by the winner
+                return
+            if error and len(trial.attempts) > 1: # the other attempts may still succeed
+                trial.attempts.remove(dispatcher)
+                losers = [dispatcher]
+            else:
+                trial.done = True
+                self.trials.remove(trial)
+                error or self.runtimes.append(time.monotonic() - trial.start)
+                losers = [attempt for attempt in trial.attempts if attempt is not dispatcher]
+        for loser in losers:
+            loser.cancel()
+            loser.clean(self.handles)
+        if not trial.done:
+            return
+        dispatcher.clean(self.handles)
+        if error:
+            trial.future.set_exception(error)
+        else:
+            trial.future.set_result(data)
+
+    def get_threshold(self):
+        """
+        Returns
+        -------
+        the runtime (in seconds) after which a trial is duplicated, None until min_completed trials completed
+        """
+        with self.lock:
+            if len(self.runtimes) < max(self.min_completed, 1):
+                return None
+            return self.factor * statistics.median(self.runtimes)
+
+    def speculate(self, now=None):
+        """
+        submits a duplicate of each trial that has run longer than the threshold (see .get_threshold())
+        Returns
+        -------
+        the number of duplicates submitted
+        """
+        threshold = self.get_threshold()
+        if threshold is None:
+            return 0
+        now = time.monotonic() if now is None else now
+        count = 0
+        with self.lock:
+            for trial in self.trials:
+                if trial.launched <= self.duplicates and now - trial.start > threshold * trial.launched:
+                    self.launch(trial)
+                    count = count + 1
+            self.duplicated = self.duplicated + count
+        return count
+
+    def watch(self):
+        while not self.event.wait(self.interval):
+            self.speculate()
+
+    def submit(self, dictionary, value_type=None):
+        """
+        submits a configuration as its own job
+        Parameters
+        ----------
+        dictionary - the dictionary of key: values of the configuration
+        value_type (optional) - see runtk.Dispatcher.update_env()
+        Returns
+        -------
+        a concurrent.futures.Future of the result (of the first attempt to return one)
+        """
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.watch, daemon=True)
+                self.thread.start()
+            trial = _Trial(self.count, dictionary, value_type)
+            self.count = self.count + 1
+            self.trials.append(trial)
+            self.launch(trial)
+        return trial.future
+
+    def map(self, dictionaries, value_type=None):
+        """
+        Returns
+        -------
+        generator of results, in the order of dictionaries
+        """
+        futures = [self.submit(dictionary, value_type) for dictionary in dictionaries]
+        return (future.result() for future in futures)
+
+    def close(self):
+        """
+        stops checking for stragglers, cancels and cleans the attempts of the trials still running
+        """
+        self.event.set()
+        self.thread and self.thread.join()
+        with self.lock:
+            trials, self.trials = self.trials, []
+            for trial in trials:
+                trial.done = True
+        for trial in trials:
+            for dispatcher in trial.attempts:
+                dispatcher.cancel()
+                dispatcher.clean(self.handles)
+            trial.future.cancel() or trial.future.done() or trial.future.set_exception(
+                RuntimeError("the pool was closed"))
@@ -0,0 +1,173 @@
+import array
+import json
+import struct
+from pubtk.runtk.header import RESULT
+from pubtk.runtk.buffers import ALIGNMENT, contiguous, get_layout, write_arrays, read_arrays
+
+LENGTH = struct.Struct('!Q') # length of the json header of a container, following the RESULT prefix
+
+def is_array(value):
+    """
+    Returns
+    -------
+    whether value is sent as an array (numpy arrays of at least one dimension, array.array) rather than as a metric
+    """
+    if isinstance(value, array.array):
+        return True
+    return hasattr(value, '__array_interface__') and getattr(value, 'ndim', 1) > 0
+
+def is_result(data):
+    """
+    Returns
+    -------
+    whether data (bytes-like) is a binary result container (see Result.to_bytes())
+    """
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:len(RESULT)]) == RESULT
+
+class Result(object):
+    """
+    builder of the results of a trial, scalar metrics (json serializable values, i.e. loss, rates) and arrays (i.e.
+    spike times, rate time series) are collected separately, so that arrays are sent as their raw buffers rather than
+    as lists of python floats.
+    results are sent in a binary container (see .to_bytes()), a json header of the metrics and the array index (name,
+    offset, dtype and shape of each array, see runtk.buffers.get_layout) followed by the array buffers, which the
+    dispatcher maps to numpy arrays without parsing them (see .from_bytes()).
+
+    use:
+        runner.result['loss'] = loss
+        runner.result['spkt'] = numpy.array(sim.allSimData['spkt'])
+        runner.send(runner.result)
+    then:
+        result = dispatcher.recv()    # runtk.Result
+        result['loss'], result['spkt'] # float, numpy array (viewing the received buffer)
+        result.to_dataframe(['spkt', 'spkid'])
+    """
+    def __init__(self, metrics=None, arrays=None, meta=None):
+        """
+        Parameters
+        ----------
+        *Optional*
+        metrics - dictionary of {name: value}, json serializable values
+        arrays  - dictionary of {name: array}, numpy arrays or any other C contiguous buffers (i.e. array.array)
+        meta    - dictionary of the container's metadata, i.e. the runner's timeline (see runtk.Runner.frame())
+        """
+        self.metrics = dict(metrics or {})
+        self.arrays = dict(arrays or {})
+        self.meta = dict(meta or {})
+
+    def add(self, name, value):
+        """
+        adds a metric or an array (see is_array()), numpy scalars are added as python scalars
+        """
+        self.metrics.pop(name, None)
+        self.arrays.pop(name, None)
+        if is_array(value):
+            self.arrays[name] = value
+        else:
+            self.metrics[name] = value.item() if hasattr(value, 'item') and hasattr(value, 'ndim') else value
+        return self
+
+    def update(self, values=None, **kwargs):
+        """
+        adds the values of a dictionary (and name=value), see .add()
+        """
+        for name, value in dict(values or {}, **kwargs).items():
+            self.add(name, value)
+        return self
+
+    def clear(self):
+        self.metrics.clear()
+        self.arrays.clear()
+        self.meta.clear()
+
+    def __setitem__(self, name, value):
+        self.add(name, value)
+
+    def __getitem__(self, name):
+        if name in self.metrics:
+            return self.metrics[name]
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.metrics or name in self.arrays
+
+    def __len__(self):
+        return len(self.metrics) + len(self.arrays)
+
+    def keys(self):
+        return list(self.metrics) + list(self.arrays)
+
+    def to_dict(self):
+        """
+        Returns
+        -------
+        dictionary of {name: value} of the metrics and arrays
+        """
+        return self.metrics | self.arrays
+
+    def to_bytes(self, meta=None):
+        """
+        Parameters
+        ----------
+        meta - *Optional* dictionary added to the metadata of the container
+        Returns
+        -------
+        the binary container (bytearray) of the result:
+            RESULT | header length (LENGTH) | json header {'metrics', 'arrays', 'meta'} | padding | array buffers
+        the buffers start at a multiple of runtk.buffers.ALIGNMENT, the offsets of the array index are relative to it
+        """
+        arrays = {name: contiguous(value) for name, value in self.arrays.items()}
+        index, size = get_layout(arrays)
+        header = json.dumps({'metrics': self.metrics, 'arrays': index, 'meta': self.meta | (meta or {})}).encode()
+        start = len(RESULT) + LENGTH.size + len(header)
+        start = -(-start // ALIGNMENT) * ALIGNMENT
+        data = bytearray(start + size)
+        data[:len(RESULT)] = RESULT
+        LENGTH.pack_into(data, len(RESULT), len(header))
+        data[len(RESULT) + LENGTH.size: len(RESULT) + LENGTH.size + len(header)] = header
+        write_arrays(memoryview(data)[start:], arrays, index)
+        return data
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Parameters
+        ----------
+        data - the binary container (bytes-like, see .to_bytes())
+        Returns
+        -------
+        the Result, its arrays view data (no copies) as numpy arrays if numpy is installed, otherwise as memoryviews
+        (see runtk.buffers.read_arrays)
+        """
+        if not is_result(data):
+            raise ValueError("data is not a result container")
+        view = memoryview(data)
+        length, = LENGTH.unpack_from(view, len(RESULT))
+        offset = len(RESULT) + LENGTH.size
+        header = json.loads(bytes(view[offset: offset + length]))
+        start = -(-(offset + length) // ALIGNMENT) * ALIGNMENT
+        return cls(header['metrics'], read_arrays(view[start:], header['arrays']), header['meta'])
+
+    def to_series(self):
+        """
+        Returns
+        -------
+        pandas.Series of the metrics
+        """
+        import pandas # only required to convert results
+        return pandas.Series(self.metrics)
+
+    def to_dataframe(self, names=None):
+        """
+        Parameters
+        ----------
+        names - *Optional* the names of the (1-d, equal length) arrays of the columns, defaults to every array
+        Returns
+        -------
+        pandas.DataFrame of the arrays
+        """
+        import pandas # only required to convert results
+        return pandas.DataFrame({name: self.arrays[name] for name in (names or self.arrays)})
+
+    def __repr__(self):
+        return "Result(metrics={}, arrays={})".format(self.metrics, list(self.arrays))
@@ -1,13 +1,104 @@
 import os
+import sys
 import json
+import zlib
 from pubtk.runtk.utils import convert, set_map
 from pubtk import runtk
-from pubtk.runtk.sockets import INETSocket, UNIXSocket
+from pubtk.runtk.sockets import INETSocket, UNIXSocket, REPORT, HEARTBEAT
+from pubtk.runtk.timelines import Timeline, RUNNER
+from pubtk.runtk.buffers import open_segment, close_segment, contiguous, get_layout, write_arrays
+from pubtk.runtk.results import Result
 import socket
 import logging
 import time
+import threading
+from collections.abc import MutableMapping
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
+def get_rss():
+    """
+    Returns
+    -------
+    the resident set size (in bytes) of the process, its peak resident set size where /proc is not available
+    """
+    try:
+        with open('/proc/self/statm', 'r') as fptr:
+            return int(fptr.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == 'darwin' else rss * 1024 # bytes on macOS, kilobytes on linux
+
+class Encoded(object):
+    """
+    a mapping value that has not been deserialized yet, the type of its environment variable and its string
+    """
+    __slots__ = ('type', 'string')
+
+    def __init__(self, _type, string):
+        self.type = _type
+        self.string = string
+
+class LazyMappings(MutableMapping):
+    """
+    dictionary of {path: value} whose values are deserialized on first access (see Runner, lazy=True), so that a
+    runner only pays for the mappings it reads
+    """
+    def __init__(self, data=None, get_converter=None):
+        """
+        Parameters
+        ----------
+        data          - *Optional* dictionary of {path: value}, where values that are Encoded are deserialized on
+                        first access
+        get_converter - *Optional* the function (path, type) -> converter of Encoded values (see
+                        Runner.get_converter), defaults to runtk.SUPPORTS[type]
+        """
+        self.data = dict(data or {})
+        self.get_converter = get_converter or staticmethod(lambda path, _type: runtk.SUPPORTS[_type])
+
+    def __getitem__(self, path):
+        value = self.data[path]
+        if type(value) is Encoded:
+            value = self.data[path] = self.get_converter(path, value.type)(value.string)
+        return value
+
+    def __setitem__(self, path, value):
+        self.data[path] = value
+
+    def __delitem__(self, path):
+        del self.data[path]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, path):
+        return path in self.data
+
+    def update(self, other=(), **kwargs):
+        if isinstance(other, LazyMappings) and other.get_converter == self.get_converter: # merged without deserializing
+            self.data.update(other.data)
+            other = ()
+        super().update(other, **kwargs)
+
+    def copy(self):
+        return LazyMappings(self.data, self.get_converter)
+
+    def __or__(self, other):
+        mappings = self.copy()
+        mappings.update(other)
+        return mappings
+
+    def __ror__(self, other):
+        mappings = LazyMappings(other, self.get_converter)
+        mappings.update(self)
+        return mappings
+
+    def __repr__(self):
+        return "LazyMappings({})".format(dict(self))
+
 class Runner(object):
     """
     base class for all Runner classes
@@ -24,6 +115,8 @@ class Runner(object):
         aliases: Optional[Dict] = None, #expecting dictionary, defaults to empty dictionary
         supports: Optional[Dict] = None, #expecting dictionary, defaults to runtk.SUPPORTS (header.py)
         log: Optional[Union[str, logging.Logger]] = None, #expecting string or logging.Logger instance, the string will create a log.
+        lazy: Optional[bool] = False, #expecting bool, whether mappings are deserialized on first access
+        schema: Optional[Dict] = None, #expecting dictionary, the declared types of the mappings {path: type}
         **kwargs
     ):
         """
@@ -39,8 +132,30 @@ class Runner(object):
                    functions
         log      - a string or logging.Logger instance that creates a log for runtime, if not provided, no logging
                    will be done. If a string is provided, a log file will be created with the string as the name.
+        lazy     - whether the environment is only grepped on the first access of .mappings, and each mapping only
+                   deserialized on its first access (see LazyMappings), defaults to False
+        schema   - a dictionary of the declared types of mappings {path: type}, where type is a key of supports
+                   (i.e. 'FLOAT') or a python type (int, float, str, dict, list), compiled into a converter per path so
+                   that declared mappings are not inferred (see .compile_schema(), .convert())
         **kwargs - unused placeholder
+
+        the runner records the timestamps of its phases in self.timeline (see runtk.Timeline), sent back with its
+        results if TIMELINE is exported by the dispatcher (see .frame())
+        metrics and arrays can be collected in self.result (see runtk.Result) and sent with .send(runner.result)
+        if HEARTBEAT is exported by the dispatcher, the runner sends heartbeats (see .start_heartbeat()), set
+        self.progress to a callable returning the simulated time (i.e. lambda: h.t) to report the progress, and
+        send heartbeats from the simulation itself during long calls (see .pulse(), .schedule_heartbeat())
         """
+        self.timeline = Timeline(RUNNER)
+        self.timeline.mark('start')
+        self.result = Result()
+        self.progress = None # callable returning the simulated time, reported in heartbeats
+        self.heartbeat = None # (thread, event) of the heartbeat, see .start_heartbeat()
+        self.beats = 0
+        self.beat_interval = None # the interval (in seconds) of the heartbeats, see .start_heartbeat()
+        self.last_beat = None # time.monotonic() of the last heartbeat, see .pulse()
+        self.beat_lock = threading.Lock() # heartbeats are sent from the heartbeat thread and the simulation
+        self.beat_handler = None # the h.FInitializeHandler of .schedule_heartbeat()
         # Initialize logger
         self.logger = log
         if isinstance(log, str):
@@ -54,21 +169,122 @@ class Runner(object):
             pass
         self.env = os.environ.copy()
         env and self.env.update(env) # update the self.env if (env) evaluates to True
+        if 'CPUSET' in self.env and hasattr(os, 'sched_setaffinity'): # see runtk.LocalPoolDispatcher, pin=True
+            os.sched_setaffinity(0, {int(cpu) for cpu in self.env['CPUSET'].split(',')})
+        if 'TBLFILE' in self.env and 'TASKID' in self.env: # array job, see runtk.SGEArraySubmit
+            self.env.update(self.get_task(self.env['TBLFILE'], int(self.env['TASKID'])))
         self.aliases = aliases or {}
         self.supports = supports or runtk.SUPPORTS
         self.grepstr = grepstr or runtk.GREPSTR
         self.grepfunc = staticmethod(lambda key: self.grepstr in key )
-        self.greptups = {key: self.env[key].split('=') for key in self.env if
-                         self.grepfunc(key)}
+        self.lazy = lazy
+        self.schema = self.compile_schema(schema or {})
+        self._greptups = None if lazy else self.grep(self.env) # grepped on first access, see .greptups
         # readability, greptups as the environment variables: (key,value) passed by runtk.GREPSTR environment variables
         # saved the environment variables TODO JSON vs. STRING vs. FLOAT
-        self.mappings = { # export JSONPMAP0="cfg.settings={...}" for instance would map the {...} as a json to cfg.settings
-            val[0].strip(): self.convert(key.split(self.grepstr)[0], val[1].strip())
-            for key, val in self.greptups.items()
-        }
+        self._mappings = None # deserialized on first access, see .mappings
         if kwargs:
             self.log("Unused arguments were passed into base class Runner.__init__(): {}".format(kwargs), level='info')
 
+    def grep(self, env):
+        """
+        Internal function for selecting the runtk.GREPSTR environment variables
+        Returns
+        -------
+        greptups - {key: [path, value]} for each key in env including self.grepstr
+        """
+        return {key: env[key].split('=') for key in env if self.grepfunc(key)}
+
+    @property
+    def greptups(self):
+        if self._greptups is None:
+            self._greptups = self.grep(self.env)
+        return self._greptups
+
+    @greptups.setter
+    def greptups(self, greptups):
+        self._greptups = greptups
+
+    def compile_schema(self, schema):
+        """
+        Internal function called during initialization for compiling the declared types of mappings
+        Parameters
+        ----------
+        schema - dictionary of {path: type}, where type is a key of self.supports or a python type
+        Returns
+        -------
+        dictionary of {path: converter}
+        """
+        types = {int: 'INT', float: 'FLOAT', str: 'STR', dict: 'JSON', list: 'JSON'}
+        compiled = {}
+        for path, _type in schema.items():
+            _type = types.get(_type, _type)
+            if _type not in self.supports:
+                raise KeyError("unsupported type {} of mapping {}".format(_type, path))
+            compiled[path] = self.supports[_type]
+        return compiled
+
+    def decode(self, greptups):
+        """
+        Internal function for deserializing the selected environment variables (see .grep(), .convert())
+        Returns
+        -------
+        mappings - {path: value}, a LazyMappings of the (not yet deserialized) values if self.lazy
+        """
+        # export JSONPMAP0="cfg.settings={...}" for instance would map the {...} as a json to cfg.settings
+        if self.lazy: # the converters are selected on access
+            return LazyMappings({val[0].strip(): Encoded(key.partition(self.grepstr)[0], val[1].strip())
+                                 for key, val in greptups.items()}, self.get_converter)
+        mappings = {}
+        for key, val in greptups.items():
+            path = val[0].strip()
+            mappings[path] = self.get_converter(path, key.partition(self.grepstr)[0])(val[1].strip())
+        return mappings
+
+    @property
+    def mappings(self):
+        """
+        the deserialized mappings {path: value}, decoded on first access from the environment variables and, if
+        PRMFILE is exported (see runtk.Dispatcher, sidecar=True), the json sidecar file
+        """
+        if self._mappings is None:
+            mappings = self.decode(self.greptups)
+            if 'PRMFILE' in self.env:
+                mappings.update(self.get_params(self.env['PRMFILE']))
+            self._mappings = mappings
+        return self._mappings
+
+    @mappings.setter
+    def mappings(self, mappings):
+        self._mappings = mappings
+
+    def get_params(self, path):
+        """
+        Internal function for loading the sidecar file of mappings
+        Returns
+        -------
+        the dictionary of {path: value} written by the dispatcher
+        """
+        with open(path, 'r') as fptr:
+            return json.load(fptr)
+
+    def get_task(self, table, task):
+        """
+        Internal function called during initialization for array jobs, reads the task's row of the parameter table
+        Parameters
+        ----------
+        table - the parameter table file (json lines, one row of environment variables per task)
+        task  - the (1-indexed) task id
+        Returns
+        -------
+        the dictionary of environment variables of the task
+        """
+        with open(table, 'r') as fptr:
+            for i, row in enumerate(fptr, 1):
+                if i == task:
+                    return json.loads(row)
+        raise IndexError("task {} not in {}".format(task, table))
+
     def get_mappings(self):
         """
         Returns
@@ -106,11 +322,31 @@ class Runner(object):
         if _type in self.supports:
             return self.supports[_type](val)
         if _type == '':
-            for _type in self.supports:
-                try:
-                    return self.supports[_type](val)
-                except:
-                    pass
+            return self.infer(val)
+        raise KeyError(_type)
+
+    def infer(self, val: object):
+        """
+        Internal function for converting untyped environment values with the first converter that accepts them
+        """
+        for _type in self.supports:
+            try:
+                return self.supports[_type](val)
+            except:
+                pass
+        raise KeyError('')
+
+    def get_converter(self, path: str, _type: str):
+        """
+        Internal function for selecting the converter of a mapping, the declared type of its path (see schema), the
+        type of its environment variable or, for untyped variables, inferred on conversion (see .infer())
+        """
+        if path in self.schema:
+            return self.schema[path]
+        if _type in self.supports:
+            return self.supports[_type]
+        if _type == '':
+            return self.infer
         raise KeyError(_type)
 
     def connect(self, **kwargs):
@@ -138,6 +374,27 @@ class Runner(object):
         """
         pass
 
+    def frame(self, data):
+        """
+        Internal function called when sending (file) results, marks the 'send' phase and, if TIMELINE is exported (see
+        runtk.Dispatcher, timeline=True), prefixes data with the runner's timeline (see runtk.Timeline.frame()).
+        only text results can be prefixed, sockets carry the timeline in the meta of the frame instead (see
+        SocketRunner.send). results (see runtk.Result) are serialized to their binary container, with the timeline in
+        its meta
+        Returns
+        -------
+        the data to send
+        """
+        self.timeline.mark('send')
+        if isinstance(data, Result):
+            return data.to_bytes({'timeline': self.timeline.to_dict()} if 'TIMELINE' in self.env else None)
+        if 'TIMELINE' not in self.env:
+            return data
+        if not isinstance(data, str):
+            raise TypeError("cannot frame {} results with the timeline, send the results as str".format(
+                type(data).__name__))
+        return self.timeline.frame(data)
+
     def log(self, message, level='info'):
         """
         Method for logging messages
@@ -148,6 +405,111 @@ class Runner(object):
         """
         if self.logger:
             getattr(self.logger, level)(message)
+    def start_heartbeat(self, interval=None, progress=None):
+        """
+        starts a (daemon) thread sending a heartbeat (see .get_heartbeat(), .beat()) every interval seconds until
+        .close(), so that the dispatcher can tell a hung trial from a slow one (see runtk.Dispatcher, heartbeat=...)
+        the thread only runs while the interpreter is released: a long C call holding it (i.e. h.psolve() in NEURON)
+        stops the heartbeats, so either send them from the simulation (see .pulse(), .schedule_heartbeat()) or set the
+        dispatcher's hang_timeout above the longest such call
+        Parameters
+        ----------
+        interval - *Optional* the interval (in seconds) between heartbeats, defaults to HEARTBEAT
+        progress - *Optional* callable returning the simulated time, i.e. lambda: h.t, defaults to self.progress
+        """
+        if self.heartbeat:
+            return
+        interval = float(interval or self.env['HEARTBEAT'])
+        self.progress = progress or self.progress
+        self.beat_interval = interval
+        event = threading.Event()
+        def run():
+            while True:
+                try:
+                    self.send_beat()
+                except OSError: # the connection was closed or the file system is unavailable
+                    return
+                if event.wait(interval):
+                    return
+        thread = threading.Thread(target=run, name='heartbeat', daemon=True)
+        self.heartbeat = (thread, event)
+        thread.start()
+
+    def stop_heartbeat(self):
+        if self.heartbeat:
+            thread, event = self.heartbeat
+            event.set()
+            thread is not threading.current_thread() and thread.join()
+            self.heartbeat = None
+
+    def get_heartbeat(self):
+        """
+        Returns
+        -------
+        the heartbeat {'count', 'sim_time', 'wall_time', 'rss'}, the number of heartbeats sent, the simulated time
+        (None without self.progress), the time (in seconds) since the runner started and its resident set size
+        (in bytes)
+        """
+        self.beats = self.beats + 1
+        return {'count': self.beats,
+                'sim_time': self.progress() if self.progress else None,
+                'wall_time': time.monotonic() - self.timeline.marks['start'],
+                'rss': get_rss()}
+
+    def send_beat(self):
+        with self.beat_lock:
+            self.beat()
+            self.last_beat = time.monotonic()
+
+    def pulse(self, t=None):
+        """
+        sends a heartbeat (see .beat()) if the last one is older than the heartbeat interval (HEARTBEAT), to be called
+        from the simulation's own callbacks, which run during the calls that stop the heartbeat thread (see
+        .start_heartbeat()). does nothing if HEARTBEAT is not exported
+        use:
+            sim.runSimWithIntervalFunc(10, runner.pulse) # netpyne, every 10 ms of simulated time
+        or see .schedule_heartbeat()
+        Parameters
+        ----------
+        t - *Optional* the simulated time, unused (passed by netpyne interval functions)
+        """
+        interval = self.beat_interval or float(self.env.get('HEARTBEAT', 0))
+        if interval and (self.last_beat is None or time.monotonic() - self.last_beat >= interval):
+            try:
+                self.send_beat()
+            except OSError: # as the heartbeat thread, never fail the simulation
+                pass
+
+    def schedule_heartbeat(self, h, step=1.0):
+        """
+        sends heartbeats from a NEURON simulation, an event (h.cvode.event) every step of simulated time calls
+        .pulse(), from each initialization (h.FInitializeHandler) on. reports h.t as the progress unless
+        self.progress is set
+        use:
+            from neuron import h
+            runner.schedule_heartbeat(h) # before h.finitialize(), i.e. before sim.runSim()
+        Parameters
+        ----------
+        h    - the NEURON hoc interpreter (neuron.h)
+        step - *Optional* the simulated time (in ms) between the events, defaults to 1.0 (the heartbeats themselves
+               are sent at most every HEARTBEAT seconds)
+        Returns
+        -------
+        the h.FInitializeHandler, also kept in self.beat_handler
+        """
+        self.progress = self.progress or (lambda: h.t)
+        def event():
+            self.pulse()
+            h.cvode.event(h.t + step, event)
+        self.beat_handler = h.FInitializeHandler(lambda: h.cvode.event(h.t + step, event))
+        return self.beat_handler
+
+    def beat(self):
+        """
+        Method for sending a heartbeat to the host (dispatcher). To be implemented by inherited classes.
+        """
+        pass
+
     def send(self, data, **kwargs):
         """
         Method for sending data to the host (dispatcher). To be implemented by inherited classes.
@@ -157,6 +519,17 @@ class Runner(object):
         """
         pass
 
+    def report(self, step, metrics, **kwargs):
+        """
+        Method for streaming intermediate metrics to the host (dispatcher) before the final result, i.e. for early
+        stopping (see runtk.SOCKDispatcher.reports). To be implemented by inherited classes.
+        Parameters
+        ----------
+        step    - the step (i.e. simulation time) of the report
+        metrics - json serializable dictionary of metrics
+        """
+        pass
+
     def recv(self, **kwargs):
         """
         Method for receiving data from the host (dispatcher). To be implemented by inherited classes.
@@ -171,6 +544,7 @@ class Runner(object):
         Method called at close of the script, cleans up any open file handles or sockets, etc. To be implemented by
         inherited classes.
         """
+        self.stop_heartbeat()
         if self.logger:
             for handler in self.logger.handlers:
                 handler.close()
@@ -191,6 +565,7 @@ class FileRunner(Runner):
     export SGLFILE="foo.sgl" -> runner.signalfile = "foo.sgl"
     export OUTFILE="bar.out" -> runner.writefile = "bar.out"
     export JOBID="1234"      -> runner.jobid = "1234"
+    if HEARTBEAT is exported, heartbeats are written (json) to the heartbeat file (HBTFILE) from initialization
     """
     def __init__(self, **kwargs):
         'aliases' in kwargs or kwargs.update(
@@ -199,22 +574,97 @@ class FileRunner(Runner):
                   'signal_file': 'SGLFILE',
                   'writefile': 'OUTFILE',
                   'write_file': 'OUTFILE',
+                  'paramfile': 'PRMFILE',
+                  'heartbeatfile': 'HBTFILE',
+                  'heartbeat_file': 'HBTFILE',
                   'jobid': 'JOBID'}
             }
         )
         super().__init__(**kwargs)
+        if 'HEARTBEAT' in self.env and 'HBTFILE' in self.env:
+            self.start_heartbeat()
 
     def signal(self):
         open(self.signal_file, 'w').close()
 
+    def beat(self):
+        """
+        writes the heartbeat (see .get_heartbeat()) to the heartbeat file, replacing the previous one
+        """
+        tmp = "{}.{}".format(self.heartbeat_file, os.getpid())
+        with open(tmp, 'w') as fptr:
+            json.dump(self.get_heartbeat(), fptr)
+        os.replace(tmp, self.heartbeat_file)
+
     def write(self, data, mode = 'w'):
+        """
+        writes data (str, or bytes-like i.e. a result container, see runtk.Result) to the write_file, if COMPRESS (a
+        size threshold in bytes) is exported by the dispatcher, data of at least that size is written zlib compressed,
+        prefixed by runtk.ZLIB (not when appending)
+        """
+        if mode == 'w' and 'COMPRESS' in self.env and len(data) >= int(self.env['COMPRESS']):
+            with open(self.write_file, 'wb') as fptr:
+                fptr.write(runtk.ZLIB)
+                fptr.write(zlib.compress(data.encode() if isinstance(data, str) else data, runtk.ZLIB_LEVEL))
+            return
+        if not isinstance(data, str):
+            mode = mode + 'b'
         with open(self.write_file, mode) as fptr:
             fptr.write(data)
 
     def send(self, data, mode = 'w'):
-        self.write(data, mode)
+        self.write(self.frame(data) if mode == 'w' else data, mode) # appended data is not framed
         self.signal()
 
+class SHMRunner(FileRunner):
+    """
+    Extension of FileRunner for runners on the same host as their dispatcher (see runtk.SHMDispatcher). numeric
+    results (i.e. rates, spike arrays) are written to the shared memory segment named by the dispatcher (SHMNAME)
+    rather than serialized, the dispatcher maps them without copies. text is sent as by the FileRunner.
+    see class FileRunner
+
+    custom aliases -> FileRunner aliases and {'shmname': 'SHMNAME', 'shm_name': 'SHMNAME'}
+
+    use:
+        runner = SHMRunner()
+        runner.send_arrays(rates=rates, spkt=spkt, spkid=spkid)
+        runner.close()
+    """
+    def __init__(self, **kwargs):
+        'aliases' in kwargs or kwargs.update(
+            {'aliases':
+                 {'signalfile': 'SGLFILE',
+                  'signal_file': 'SGLFILE',
+                  'writefile': 'OUTFILE',
+                  'write_file': 'OUTFILE',
+                  'paramfile': 'PRMFILE',
+                  'shmname': 'SHMNAME',
+                  'shm_name': 'SHMNAME',
+                  'heartbeatfile': 'HBTFILE',
+                  'heartbeat_file': 'HBTFILE',
+                  'jobid': 'JOBID'}
+            }
+        )
+        super().__init__(**kwargs)
+
+    def send_arrays(self, arrays=None, **kwargs):
+        """
+        writes the arrays to shared memory and signals the dispatcher, the index (name, offset, dtype and shape of
+        each array) is sent through the write_file
+        Parameters
+        ----------
+        arrays   - *Optional* dictionary of {name: array}, numpy arrays or any other buffers (i.e. array.array)
+        **kwargs - name=array, added to arrays
+        """
+        arrays = {name: contiguous(array) for name, array in dict(arrays or {}, **kwargs).items()}
+        index, size = get_layout(arrays)
+        segment = open_segment(self.shm_name, size, create=True)
+        try:
+            write_arrays(segment.buf, arrays, index)
+        finally:
+            close_segment(segment)
+        self.send(runtk.SHM + json.dumps(index))
+
 class SocketRunner(Runner):
     """
     Extension of base Runner class that handles communication with the dispatcher by sending and receiving data through
@@ -227,17 +677,24 @@ class SocketRunner(Runner):
     runner.send(data) -> dispatcher.recv()
     runner.recv()     <- dispatcher.send(data)
 
-    custom aliases -> {'socketname': 'SOCNAME', 'socket_name': 'SOCNAME', 'jobid': 'JOBID'}
+    custom aliases -> {'socketname': 'SOCNAME', 'socket_name': 'SOCNAME', 'socket_gid': 'SOCGID', 'jobid': 'JOBID'}
     can be used to reference environment variables:
     i.e.
     export SOCNAME="foo.soc" -> runner.socket_name = "foo.soc"
     ...
+    if SOCGID is exported (see runtk.DispatcherServer), the runner identifies itself by sending it as the first frame
+    upon .connect()
+    if COMPRESS is exported (see runtk.Dispatcher, compress=...), the runner accepts compression of payloads of at least
+    COMPRESS bytes in a HELLO frame upon .connect()
+    if HEARTBEAT is exported (see runtk.Dispatcher, heartbeat=...), the runner sends heartbeats from .connect()
     """
     def __init__(self, **kwargs):
         'aliases' in kwargs or kwargs.update(
             {'aliases':
                 {'socketname': 'SOCNAME',
                  'socket_name': 'SOCNAME',
+                 'socket_gid': 'SOCGID',
+                 'paramfile': 'PRMFILE',
                  'jobid': 'JOBID'}
             }
         )
@@ -259,17 +716,70 @@ class SocketRunner(Runner):
                 raise ValueError(socket_type)
         self.socket.socket.settimeout(timeout)
         self.socket.connect()
+        self.timeline.mark('connect')
+        if 'SOCGID' in self.env: # handshake with a shared runtk.DispatcherServer
+            self.socket.send(self.socket_gid)
+        if 'COMPRESS' in self.env: # accept the compression offered by the dispatcher
+            self.socket.hello(int(self.env['COMPRESS']))
+        if 'HEARTBEAT' in self.env:
+            self.start_heartbeat()
         return self.host_socket
 
     def write(self, data):
         self.send(data)
 
     def send(self, data):
-        self.socket.send(data)
+        """
+        sends data (str, bytes-like, numpy array, runtk.Result or json serializable object, see runtk.sockets.encode)
+        to the dispatcher, with the runner's timeline in the meta of the frame if TIMELINE is exported
+        """
+        self.timeline.mark('send')
+        if 'TIMELINE' in self.env:
+            return self.socket.send(data, meta={'timeline': self.timeline.to_dict()})
+        return self.socket.send(data)
+
+    def report(self, step, metrics):
+        """
+        streams intermediate metrics to the dispatcher (see runtk.SOCKDispatcher.reports), i.e. from a netpyne
+        interval function, so that a search algorithm can stop the trial early
+        use:
+            runner.report(250, {'loss': loss(sim.analysis.popAvgRates(tranges=[0, 250], show=False))})
+        """
+        self.socket.send({'step': step, 'metrics': metrics}, frame_type=REPORT)
+
+    def beat(self):
+        """
+        sends the heartbeat (see .get_heartbeat()) in a HEARTBEAT frame, consumed by the dispatcher (see
+        runtk.Dispatcher.get_progress())
+        """
+        self.socket.send(self.get_heartbeat(), frame_type=HEARTBEAT)
 
     def recv(self):
         return self.socket.recv()
 
+    def tasks(self):
+        """
+        persistent worker mode, a generator that waits for configurations sent by the dispatcher (see
+        runtk.SHDispatcher.dispatch, runtk.WorkerPool) and yields the updated mappings for each. after each yield the
+        result is expected to be sent back with .send(), the generator ends when the dispatcher closes the worker.
+        use:
+            runner.connect()
+            for mappings in runner.tasks():
+                runner.send(simulate(mappings))
+            runner.close()
+        Returns
+        -------
+        generator of mappings, the mappings exported to the worker updated with those of the current configuration
+        """
+        mappings = self.mappings
+        while True:
+            data = self.recv()
+            if data is None or data == runtk.CLOSE:
+                self.mappings = mappings
+                return
+            self.mappings = mappings | self.decode(self.grep(json.loads(data)))
+            yield self.mappings
+
     def close(self):
         super().close()
         self.socket.close()
@@ -277,6 +787,7 @@ class SocketRunner(Runner):
 RUNNERS = {
     'socket': SocketRunner,
     'file': FileRunner,
+    'shm': SHMRunner,
 }
 def create_runner(runner_type):
     """
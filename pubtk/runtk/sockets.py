@@ -1,26 +1,154 @@
+import asyncio
 import socket
 import struct
+import json
+import time
+import zlib
 import os
+import threading
+from pubtk.runtk.header import ZLIB_LEVEL
+from pubtk.runtk.results import Result
+
+# frame types, a frame is a HEADER (type, flags, meta length, payload length) followed by the meta and payload bytes
+TEXT = 0   # str, utf-8 encoded
+JSON = 1   # any json serializable object
+BYTES = 2  # bytes, bytearray, memoryview or any other (contiguous) buffer
+ARRAY = 3  # numpy array, the meta holds its dtype and shape
+HELLO = 4  # json options negotiated per connection, consumed by the receiving socket (see Socket.hello())
+REPORT = 5 # json intermediate report of a runner (see runtk.SocketRunner.report)
+RESULT = 6 # binary result container (see runtk.Result)
+HEARTBEAT = 7 # json heartbeat of a runner (see runtk.Runner.start_heartbeat)
+HEADER = struct.Struct('!BBHQ')
+
+# frame flags
+COMPRESSED = 0x01 # the payload is zlib compressed
+
+def encode(message, frame_type=None, meta=None):
+    """
+    Parameters
+    ----------
+    message    - str, bytes-like, numpy array, runtk.Result or json serializable object
+    frame_type - *Optional* the frame type (TEXT, JSON, BYTES, ARRAY or RESULT), inferred from message by default
+    meta       - *Optional* dictionary (json serializable) sent in the meta of the frame alongside the message, i.e.
+                 the runner's timeline (see runtk.SocketRunner.send)
+    Returns
+    -------
+    (frame_type, meta, payload) where meta and payload are bytes-like, buffers are not copied (memoryview) unless they
+    are not contiguous
+    """
+    frame_type, info, payload = encode_message(message, frame_type)
+    if meta:
+        info = json.dumps((json.loads(info) if info else {}) | meta).encode()
+    return frame_type, info, payload
+
+def encode_message(message, frame_type=None):
+    if frame_type is None:
+        if isinstance(message, str):
+            frame_type = TEXT
+        elif hasattr(message, '__array_interface__'):
+            frame_type = ARRAY
+        elif isinstance(message, Result):
+            frame_type = RESULT
+        elif isinstance(message, (bytes, bytearray, memoryview)):
+            frame_type = BYTES
+        else:
+            frame_type = JSON
+    if frame_type == TEXT:
+        return TEXT, b'', message.encode()
+    if frame_type in (JSON, HELLO, REPORT, HEARTBEAT):
+        return frame_type, b'', json.dumps(message).encode()
+    if frame_type == ARRAY:
+        meta = json.dumps({'dtype': message.dtype.str, 'shape': list(message.shape)}).encode()
+        if not message.flags['C_CONTIGUOUS']:
+            message = message.copy(order='C')
+        return ARRAY, meta, memoryview(message).cast('B')
+    if frame_type == RESULT:
+        return RESULT, b'', message.to_bytes()
+    view = memoryview(message)
+    if not view.c_contiguous:
+        view = memoryview(view.tobytes())
+    return BYTES, b'', view.cast('B')
+
+def compress(payload, flags, threshold, level=ZLIB_LEVEL):
+    """
+    Returns
+    -------
+    (flags, payload), the payload zlib compressed (and flagged COMPRESSED) if threshold is not None and the payload is
+    at least threshold bytes
+    """
+    if threshold is None or len(payload) < threshold:
+        return flags, payload
+    return flags | COMPRESSED, zlib.compress(payload, level)
+
+def decompress(flags, payload):
+    """
+    Returns
+    -------
+    (flags, payload), the payload decompressed (and the COMPRESSED flag cleared) if it was compressed
+    """
+    if not flags & COMPRESSED:
+        return flags, payload
+    return flags & ~COMPRESSED, zlib.decompress(payload)
+
+def decode(frame_type, meta, payload):
+    """
+    Returns
+    -------
+    the message of a received frame (see encode()): str (TEXT), object (JSON), bytearray (BYTES), numpy array
+    (ARRAY, viewing the received buffer) or runtk.Result (RESULT, its arrays viewing the received buffer)
+    """
+    if frame_type == TEXT:
+        return payload.decode()
+    if frame_type in (JSON, REPORT, HEARTBEAT):
+        return json.loads(payload)
+    if frame_type == ARRAY:
+        import numpy # only required by the peers exchanging arrays
+        meta = json.loads(meta)
+        return numpy.frombuffer(payload, dtype=meta['dtype']).reshape(meta['shape'])
+    if frame_type == BYTES:
+        return payload
+    if frame_type == RESULT:
+        return Result.from_bytes(payload)
+    raise ValueError("unknown frame type {}".format(frame_type))
 
 class Socket(object):
     """
     socket class
     protocolized socket for communication between dispatchers <-> runners
+    messages are sent as typed frames (see encode(), HEADER), so that text, json and binary buffers (i.e. numpy
+    arrays) can share a connection. buffers are sent without copies (socket.sendmsg scatter-gather of the header,
+    meta and payload) and received into a single preallocated buffer (socket.recv_into)
+    payloads of at least .compress bytes are zlib compressed, compression is enabled per connection by a HELLO frame
+    (see .hello()), compressed frames are flagged so that the receiver decompresses them regardless
+    sends are serialized by a lock, so that a thread (i.e. the runner's heartbeat) can send on the same connection
+
+    use:
+        sock.send("text")               -> peer.recv() == "text"
+        sock.send({'loss': 0.1})        -> peer.recv() == {'loss': 0.1}
+        sock.send(numpy.zeros(10))      -> peer.recv() (numpy array)
+        sock.send(b'bytes')             -> peer.recv() == bytearray(b'bytes')
     #TODO: implement security measures for communication
     """
-    def __init__(self, socket_name=None, socket_type=socket.AF_INET, timeout=None):
+    def __init__(self, socket_name=None, socket_type=socket.AF_INET, timeout=None, connection=None):
         self.name = socket_name
         self.type = socket_type
         self.timeout = timeout
-        self.socket = socket.socket(self.type, socket.SOCK_STREAM)
-        self.socket.settimeout(self.timeout)
-        self.connection = None
+        if connection: # wraps an already accepted connection (see runtk.DispatcherServer)
+            self.socket = None
+        else:
+            self.socket = socket.socket(self.type, socket.SOCK_STREAM)
+            self.socket.settimeout(self.timeout)
+        self.connection = connection
         self.peer_address = None
         self.timeout = None
+        self.first_byte = None # time.monotonic() at which the header of the last frame was received
+        self.compress = None # size threshold (in bytes) of compressed payloads, None does not compress
+        self.level = ZLIB_LEVEL
+        self.lock = threading.Lock()
 
-    def listen(self):
+    def listen(self, backlog=1):
         self.socket.bind(self.name)
-        self.socket.listen(1)
+        self.socket.listen(backlog)
         self.name = self.socket.getsockname() # works both INET and UNIX, redundant for UNIX
         return self.name
 
@@ -29,43 +157,172 @@ class Socket(object):
         self.connection.settimeout(self.timeout)
         return self.connection, self.peer_address
 
-    def connect(self):
+    def connect(self, socket_name=None):
+        """
+        Parameters
+        ----------
+        socket_name - *Optional* the address to connect to, defaults to the socket_name the socket was created with
+        """
+        self.name = socket_name or self.name
         self.peer_address = self.name
         self.connection = socket.socket(self.type, socket.SOCK_STREAM)
         self.connection.settimeout(self.timeout)
         self.connection.connect(self.name)
 
+    def send(self, message, frame_type=None, flags=0, meta=None):
+        """
+        Parameters
+        ----------
+        message    - str, bytes-like, numpy array or json serializable object (see encode())
+        frame_type - *Optional* the frame type, inferred from message by default
+        flags      - *Optional* frame flags (0-255, COMPRESSED is set by the socket), received with the frame
+        meta       - *Optional* json serializable dictionary sent in the meta of the frame (see recv_frame())
+        Returns
+        -------
+        the number of bytes sent
+        """
+        frame_type, meta, payload = encode(message, frame_type, meta)
+        flags, payload = compress(payload, flags, self.compress, self.level)
+        with self.lock:
+            return self.sendv([HEADER.pack(frame_type, flags, len(meta), len(payload)), meta, payload])
 
-    #def send(self, message):
-    #    bmsg = message.encode()
-    #    self.connection.sendall(struct.pack('!I', len(bmsg)) + bmsg)
+    def hello(self, threshold=0):
+        """
+        enables compression of payloads of at least threshold bytes, on this end and (upon receiving the HELLO frame)
+        on the peer's end of the connection
+        """
+        self.send({'compression': ['zlib'], 'threshold': threshold}, frame_type=HELLO)
+        self.compress = threshold
 
-    def send(self, message):
-        bmsg = message.encode()
-        msg_with_length = struct.pack('!I', len(bmsg)) + bmsg
+    def negotiate(self, options):
+        """
+        Internal function called with the options of a received HELLO frame
+        """
+        if 'zlib' in options.get('compression', ()):
+            self.compress = options.get('threshold', 0)
+
+    def sendv(self, buffers):
+        """
+        sends the buffers in order without joining them (scatter-gather)
+        Returns
+        -------
+        the number of bytes sent
+        """
+        views = [memoryview(buffer) for buffer in buffers if len(buffer)]
         total_sent = 0
-        while total_sent < len(msg_with_length):
-            sent = self.connection.send(msg_with_length[total_sent:])
+        if not hasattr(self.connection, 'sendmsg'): # i.e. windows
+            for view in views:
+                self.connection.sendall(view)
+                total_sent = total_sent + len(view)
+            return total_sent
+        while views:
+            sent = self.connection.sendmsg(views)
             if sent == 0:
                 raise RuntimeError("socket connection broken")
             total_sent = total_sent + sent
+            while views and sent >= len(views[0]): # drop the buffers that were sent, slice the partial one
+                sent = sent - len(views[0])
+                views.pop(0)
+            if views and sent:
+                views[0] = views[0][sent:]
         return total_sent
 
     def recv(self):
-        msglen = self.connection.recv(4)
-        if not msglen:
+        """
+        Returns
+        -------
+        the message of the next frame (see decode()), None if the connection was closed
+        """
+        frame = self.recv_frame()
+        if frame is None:
+            return None
+        frame_type, flags, meta, payload = frame
+        return decode(frame_type, meta, payload)
+
+    def recv_header(self):
+        """
+        Returns
+        -------
+        (frame_type, flags, meta, length) of the next frame, None if the connection was closed. HELLO frames are
+        consumed (see .negotiate())
+        """
+        while True:
+            header = self.recvn(HEADER.size)
+            if header is None:
+                return None
+            self.first_byte = time.monotonic()
+            frame_type, flags, metalen, length = HEADER.unpack(header)
+            meta = self.recvn(metalen) if metalen else b''
+            if meta is None:
+                return None
+            if frame_type != HELLO:
+                return frame_type, flags, meta, length
+            options = self.recvn(length)
+            if options is None:
+                return None
+            self.negotiate(json.loads(options))
+
+    def recv_frame(self):
+        """
+        Returns
+        -------
+        (frame_type, flags, meta, payload) of the next frame, None if the connection was closed
+        """
+        header = self.recv_header()
+        if header is None:
+            return None
+        frame_type, flags, meta, length = header
+        payload = self.recvn(length)
+        if payload is None:
             return None
-        msglen = struct.unpack('!I', msglen)[0]
-        return self.recvn(msglen).decode()
+        flags, payload = decompress(flags, payload)
+        return frame_type, flags, meta, payload
+
+    def recv_into(self, buffer):
+        """
+        receives the payload of the next frame into a preallocated buffer (i.e. a numpy array), without copies
+        Parameters
+        ----------
+        buffer - writable buffer of at least the size of the payload
+        Returns
+        -------
+        (frame_type, flags, meta, nbytes) of the frame, None if the connection was closed
+        """
+        header = self.recv_header()
+        if header is None:
+            return None
+        frame_type, flags, meta, length = header
+        view = memoryview(buffer).cast('B')
+        if flags & COMPRESSED: # decompressed into the buffer
+            payload = self.recvn(length)
+            if payload is None:
+                return None
+            flags, payload = decompress(flags, payload)
+            length = len(payload)
+            if length > len(view):
+                raise ValueError("buffer of {} bytes is too small for a frame of {} bytes".format(len(view), length))
+            view[:length] = payload
+            return frame_type, flags, meta, length
+        if length > len(view):
+            raise ValueError("buffer of {} bytes is too small for a frame of {} bytes".format(len(view), length))
+        if self.recvn_into(view[:length]) is None:
+            return None
+        return frame_type, flags, meta, length
 
     def recvn(self, n):
-        data = bytearray()
-        while len(data) < n:
-            packet = self.connection.recv(n - len(data))
-            if not packet:
+        buffer = bytearray(n)
+        if self.recvn_into(memoryview(buffer)) is None:
+            return None
+        return buffer
+
+    def recvn_into(self, view):
+        received = 0
+        while received < len(view):
+            count = self.connection.recv_into(view[received:])
+            if not count:
                 return None
-            data.extend(packet)
-        return data
+            received = received + count
+        return received
 
     def close(self):
         if self.socket:
@@ -83,8 +340,124 @@ class INETSocket(Socket):
 class UNIXSocket(Socket):
     def __init__(self, socket_name):
         super().__init__(socket_name=socket_name, socket_type=socket.AF_UNIX)
+        self.bound = False
+
+    def listen(self, backlog=1):
+        name = super().listen(backlog)
+        self.bound = True
+        return name
 
     def close(self):
         super().close()
+        if self.bound and os.path.exists(self.name): # only the listening end owns the socket file
+            os.unlink(self.name)
+
+class AsyncSocket(object):
+    """
+    asyncio socket class
+    awaitable counterpart of Socket built on asyncio streams, uses the same typed framing (see HEADER) so that it can
+    communicate with a (blocking) Socket on the other end. one server <-> one client
+    """
+    def __init__(self, socket_name=None, socket_type=socket.AF_INET):
+        self.name = socket_name
+        self.type = socket_type
+        self.server = None
+        self.reader = None
+        self.writer = None
+        self.peer_address = None
+        self.connected = None
+        self.first_byte = None # time.monotonic() at which the header of the last frame was received
+        self.compress = None # size threshold (in bytes) of compressed payloads, see Socket
+        self.level = ZLIB_LEVEL
+
+    async def listen(self):
+        self.connected = asyncio.get_running_loop().create_future()
+        if self.type == socket.AF_UNIX:
+            self.server = await asyncio.start_unix_server(self._on_connect, path=self.name)
+        else:
+            self.server = await asyncio.start_server(self._on_connect, host=self.name[0], port=self.name[1],
+                                                     family=socket.AF_INET)
+        self.name = self.server.sockets[0].getsockname()
+        return self.name
+
+    def _on_connect(self, reader, writer):
+        if self.connected.done(): # one server <-> one client, refuse any further peers
+            writer.close()
+            return
+        self.reader, self.writer = reader, writer
+        self.peer_address = writer.get_extra_info('peername')
+        self.connected.set_result((writer, self.peer_address))
+
+    async def accept(self):
+        return await self.connected
+
+    async def connect(self):
+        if self.type == socket.AF_UNIX:
+            self.reader, self.writer = await asyncio.open_unix_connection(path=self.name)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host=self.name[0], port=self.name[1])
+        self.peer_address = self.name
+
+    async def send(self, message, frame_type=None, flags=0, meta=None):
+        frame_type, meta, payload = encode(message, frame_type, meta)
+        flags, payload = compress(payload, flags, self.compress, self.level)
+        self.writer.writelines([HEADER.pack(frame_type, flags, len(meta), len(payload)), meta, payload])
+        await self.writer.drain()
+        return HEADER.size + len(meta) + len(payload)
+
+    async def hello(self, threshold=0):
+        await self.send({'compression': ['zlib'], 'threshold': threshold}, frame_type=HELLO)
+        self.compress = threshold
+
+    def negotiate(self, options):
+        if 'zlib' in options.get('compression', ()):
+            self.compress = options.get('threshold', 0)
+
+    async def recv(self):
+        frame = await self.recv_frame()
+        if frame is None:
+            return None
+        frame_type, flags, meta, payload = frame
+        return decode(frame_type, meta, payload)
+
+    async def recv_frame(self):
+        try:
+            while True:
+                header = await self.reader.readexactly(HEADER.size)
+                self.first_byte = time.monotonic()
+                frame_type, flags, metalen, length = HEADER.unpack(header)
+                meta = await self.reader.readexactly(metalen) if metalen else b''
+                payload = await self.reader.readexactly(length)
+                if frame_type != HELLO:
+                    flags, payload = decompress(flags, payload)
+                    return frame_type, flags, meta, payload
+                self.negotiate(json.loads(payload))
+        except asyncio.IncompleteReadError:
+            return None
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+class AsyncINETSocket(AsyncSocket):
+    def __init__(self, socket_name=None):
+        if not socket_name: #either allow OS to choose, or use provided
+            socket_name = (socket.gethostname(), 0)
+        super().__init__(socket_name=socket_name, socket_type=socket.AF_INET)
+
+
+class AsyncUNIXSocket(AsyncSocket):
+    def __init__(self, socket_name):
+        super().__init__(socket_name=socket_name, socket_type=socket.AF_UNIX)
+
+    async def close(self):
+        await super().close()
         if os.path.exists(self.name):
             os.unlink(self.name)
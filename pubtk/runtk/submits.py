@@ -1,13 +1,26 @@
 ### Submit class ###
 import subprocess
 import logging
+import os
+import signal
 from collections import namedtuple
 from pubtk import runtk
 import re
+import math
+import json
+import string
+import getpass
+import xml.etree.ElementTree as ElementTree
 from pubtk.utils import path_open
 
 
 class Template(object):
+    """
+    string template with {placeholders}, keys that are not supplied to .format() are kept as placeholders.
+    the template is compiled once (on first use, and again after .update()) into a render plan of
+    (literal, field) segments, so that rendering is a single pass over the plan (see .render()).
+    """
+    _formatter = string.Formatter()
 
     def __new__(cls, template = None, key_args = None, **kwargs):
         if isinstance(template, Template):
@@ -24,9 +37,80 @@ class Template(object):
         else:
             self.kwargs = {key: "{" + key + "}" for key in self.get_args()}
 
+    @property
+    def template(self):
+        return self._template
+
+    @template.setter
+    def template(self, template):
+        self._template = template
+        self._plan = None # recompiled on next render
+
     def get_args(self):
         return re.findall(r'{(.*?)}', self.template)
 
+    def compile(self):
+        """
+        compiles the template into a render plan, a tuple of segments:
+            (literal, field, conversion, format_spec, placeholder)
+        where placeholder is the text reinserted if field is not supplied. templates with fields that str.format
+        resolves beyond a plain key (attributes, indices, nested format specs) are not compiled (plan is False) and
+        are rendered by str.format.
+        Returns
+        -------
+        the render plan
+        """
+        plan = []
+        try:
+            for literal, field, spec, conversion in self._formatter.parse(self.template):
+                if field is None:
+                    plan.append((literal, None, None, None, None))
+                    continue
+                if not field.isidentifier() or '{' in spec:
+                    raise ValueError(field)
+                placeholder = "{" + field + ("!" + conversion if conversion else "") + (":" + spec if spec else "") + "}"
+                plan.append((literal, field, conversion, spec, placeholder))
+        except ValueError: # not a plain template, or malformed
+            plan = False
+        self._plan = tuple(plan) if plan is not False else False
+        return self._plan
+
+    def render(self, kwargs):
+        """
+        renders the template with the dictionary kwargs (see .format(), avoids copying kwargs)
+        Returns
+        -------
+        the rendered string
+        """
+        plan = self._plan
+        if plan is None:
+            plan = self.compile()
+        if plan is False:
+            return self.format_str(kwargs)
+        parts = []
+        append = parts.append
+        for literal, field, conversion, spec, placeholder in plan:
+            if literal:
+                append(literal)
+            if field is None:
+                continue
+            if field not in kwargs:
+                append(placeholder)
+                continue
+            value = kwargs[field]
+            if conversion:
+                value = self._formatter.convert_field(value, conversion)
+            append(value if spec == '' and type(value) is str else format(value, spec))
+        return ''.join(parts)
+
+    def format_str(self, kwargs):
+        mkwargs = self.kwargs | kwargs
+        try:
+            return self.template.format(**mkwargs)
+        except KeyError as e:
+            mkwargs = {key: "{" + key + "}" for key in self.get_args()} | mkwargs # keep missing keys as placeholders
+            return self.template.format(**mkwargs)
+
 #    def __format__(self, **kwargs):
 #        mkwargs = self.kwargs | kwargs
 #        return self.template.format(mkwargs)
@@ -38,12 +122,7 @@ class Template(object):
         :param kwargs:
         :return self.template.format(**kwargs) (str): template string formatted with kwargs.
         """
-        mkwargs = self.kwargs | kwargs
-        try:
-            return self.template.format(**mkwargs)
-        except KeyError as e:
-            mkwargs = mkwargs | {key: "{" + key + "}" for key in self.get_args()}
-            return self.template.format(**mkwargs)
+        return self.render(kwargs)
 
     def update(self, **kwargs):
         """
@@ -157,9 +236,32 @@ class Submit(object):
         else:
             templates = self.templates
         """
-        _jtuple = [template.format(**kwargs) for template in self.templates]
+        _jtuple = [template.render(kwargs) for template in self.templates]
         return self._jtuple(*_jtuple)
 
+    def format_jobs(self, kwargs_list):
+        """
+        batch counterpart of format_job(), renders a job (submit, script, path, handles) for each dictionary of kwargs
+        in kwargs_list. the templates are compiled once for the whole batch.
+        Parameters
+        ----------
+        kwargs_list - iterable of dictionaries of kwargs (see format_job()), env is serialized if it is a dictionary
+        Returns
+        -------
+        list of job namedtuples (submit script path handles)
+        """
+        renders = [template.render for template in self.templates]
+        for template in self.templates:
+            template._plan is None and template.compile()
+        jtuple = self._jtuple
+        sh = serializers['sh']
+        jobs = []
+        for kwargs in kwargs_list:
+            if isinstance(kwargs.get('env'), dict):
+                kwargs = kwargs | {'env': sh(kwargs['env'])}
+            jobs.append(jtuple(*[render(kwargs) for render in renders]))
+        return jobs
+
     def update_templates(self, **kwargs):
         #kwargs = serialize(kwargs, var = 'env', serializer = 'sh')
         for template in self.templates:
@@ -198,6 +300,33 @@ kwargs:
             if missing:
                 raise KeyError("Missing keys in {}: {}".format(fmt, missing))
 
+    @classmethod
+    def query_jobs(cls, job_ids):
+        """
+        queries the state of many jobs at once (see runtk.JobMonitor), to be implemented by inherited classes
+        Parameters
+        ----------
+        job_ids - list of job ids (str)
+        Returns
+        -------
+        {job_id: state} where state is one of runtk.QUEUED, runtk.RUNNING, runtk.FINISHED, runtk.FAILED, runtk.UNKNOWN
+        """
+        return {job_id: runtk.UNKNOWN for job_id in job_ids}
+
+    @classmethod
+    def cancel_job(cls, job_id):
+        """
+        cancels a submitted (queued or running) job through the scheduler (see runtk.SHDispatcher.cancel), to be
+        implemented by inherited classes
+        Parameters
+        ----------
+        job_id - the job id (str), "{job_id}.{task}" for a task of an array job
+        Returns
+        -------
+        True if the job was cancelled, False otherwise (i.e. the job already finished)
+        """
+        return False
+
     def __format__(self, template = False, **kwargs): #dunder method, (self, spec)
         template = template or self.script_template
         mkwargs = self.kwargs | kwargs
@@ -209,6 +338,28 @@ kwargs:
         else:
             return deserializers['eq'](self.handles.template)
 
+    def write_table(self, table):
+        """
+        writes the parameter table of a multi task job (array or packed jobs, see runtk.SGEArraySubmit), one row of
+        environment variables (json) per line to the runtk.TABLE handle
+        """
+        try:
+            with path_open(self.get_handles()[runtk.TABLE], 'w') as fptr:
+                fptr.writelines("{}\n".format(json.dumps(row)) for row in table)
+        except Exception as e:
+            raise Exception("Failed to write table to file: {}\n{}".format(self.get_handles()[runtk.TABLE], e))
+
+    def get_task_handles(self, task):
+        """
+        Parameters
+        ----------
+        task - the (1-indexed) task id of a multi task job
+        Returns
+        -------
+        the handles of the task
+        """
+        return {handle: path.replace('{task}', str(task)) for handle, path in self.get_handles().items()}
+
 
 class ZSHSubmit(Submit):
     script_args = {'label', 'project_path', 'output_path', 'env', 'command'}
@@ -246,6 +397,31 @@ echo $pid >&1
             raise(Exception("Job submission failed:\n{}\n{}\n{}\n{}".format(self.submit, self.script, proc.stdout, proc.stderr)))
         return self.job_id
 
+    @classmethod
+    def query_jobs(cls, job_ids):
+        """
+        a single `ps` call for every pid, pids that no longer exist have finished
+        """
+        job_ids = list(job_ids)
+        proc = subprocess.run(['ps', '-o', 'pid=,stat=', '-p', ','.join(job_ids)], text=True, stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE) # N.B. exits 1 if none of the pids exist
+        if proc.returncode not in (0, 1):
+            raise RuntimeError("ps failed: {}".format(proc.stderr))
+        running = dict(line.split()[:2] for line in proc.stdout.splitlines() if len(line.split()) > 1)
+        return {job_id: runtk.FINISHED if running.get(job_id, 'Z').startswith('Z') else runtk.RUNNING
+                for job_id in job_ids}
+
+    @classmethod
+    def cancel_job(cls, job_id):
+        """
+        terminates the nohup'd command (SIGTERM to the pid echoed by the script, see submit_job())
+        """
+        try:
+            os.kill(int(job_id), signal.SIGTERM)
+        except ProcessLookupError:
+            return False
+        return True
+
 class ZSHSubmitSFS(ZSHSubmit):
     script_args = {'label', 'project_path', 'output_path', 'env', 'command'}
     script_template = \
@@ -282,6 +458,40 @@ echo $pid >&1
                       runtk.STDOUT: '{output_path}/{label}.run',
                       runtk.SOCKET: '{sockname}'}
 
+class ForkSubmit(object):
+    """
+    mixin of the ZSH submits that runs the command in a child forked from a fork server (see runtk.zygotes) rather than
+    in a new interpreter, skipping the startup of python and the imports (i.e. NEURON, netpyne and the mechanisms)
+    preloaded by the server. the job script is rendered and written as usual (it can still be run by hand), its working
+    directory, exports, command and output are handed to the server. the job id is the pid of the child, so that jobs
+    are monitored (see ZSHSubmit.query_jobs) and cancelled (see ZSHSubmit.cancel_job) as nohup'd jobs are.
+
+    use:
+        start_fork_server('/tmp/zygote.s', preload=['pubtk.netpyne'], mechanisms=['mod'])
+        submit = ZSHForkSubmitSOCK(socket_name='/tmp/zygote.s')
+    """
+    def __init__(self, socket_name=None, **kwargs):
+        """
+        Parameters
+        ----------
+        socket_name - the AF_UNIX socket file of the fork server (see runtk.zygotes.start_fork_server)
+        """
+        super().__init__(**kwargs)
+        self.socket_name = socket_name
+
+    def submit_job(self):
+        from pubtk.runtk.zygotes import ForkClient, parse_script
+        cwd, env, command, stdout = parse_script(self.script)
+        with path_open(os.path.join(cwd or '', stdout), 'w') as fptr: # relative to the working directory of the job
+            self.job_id = ForkClient(self.socket_name).spawn(command, env=os.environ | env, cwd=cwd, stdout=fptr)
+        return self.job_id
+
+class ZSHForkSubmitSFS(ForkSubmit, ZSHSubmitSFS):
+    pass
+
+class ZSHForkSubmitSOCK(ForkSubmit, ZSHSubmitSOCK):
+    pass
+
 class SGESubmit(Submit):
     script_args = {'label', 'project_path', 'output_path', 'env', 'command', 'cores', 'vmem', }
     script_template = \
@@ -319,6 +529,60 @@ export JOBID=$JOB_ID
     def set_handles(self):
         pass
 
+    @classmethod
+    def query_jobs(cls, job_ids):
+        """
+        a single `qstat -xml` call for every job, jobs (or array tasks, "{job_id}.{task}") that are no longer listed
+        have finished, jobs in an error state (Eqw) have failed
+        """
+        proc = subprocess.run(['qstat', '-xml'], text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if proc.returncode:
+            raise RuntimeError("qstat failed: {}".format(proc.stderr))
+        return cls.parse_qstat(proc.stdout, job_ids)
+
+    @classmethod
+    def cancel_job(cls, job_id):
+        """
+        `qdel` the job, or a single task ("{job_id}.{task}") of an array job
+        """
+        number, _, task = str(job_id).partition('.')
+        proc = subprocess.run(['qdel', number] + (['-t', task] if task else []), text=True, stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE)
+        return proc.returncode == 0
+
+    @staticmethod
+    def parse_qstat(xml, job_ids):
+        listed = {} # job number -> [(tasks, state)]
+        for job in ElementTree.fromstring(xml).iter('job_list'):
+            number, code = job.findtext('JB_job_number', '').strip(), job.findtext('state', '').strip()
+            if 'E' in code:
+                state = runtk.FAILED
+            elif any(c in code for c in 'rtRs'): # running, transferring, restarted, suspended
+                state = runtk.RUNNING
+            else: # qw, hqw, ...
+                state = runtk.QUEUED
+            listed.setdefault(number, []).append((job.findtext('tasks', '').strip(), state))
+        states = {}
+        for job_id in job_ids:
+            number, _, task = str(job_id).partition('.')
+            states[job_id] = runtk.FINISHED
+            for tasks, state in listed.get(number, []):
+                if not task or not tasks or SGESubmit.in_tasks(int(task), tasks):
+                    states[job_id] = state
+                    break
+        return states
+
+    @staticmethod
+    def in_tasks(task, tasks):
+        # tasks is either a single task id or a range of pending tasks ("1-10:1", "1,3,5-7:2")
+        for chunk in tasks.split(','):
+            span, _, step = chunk.partition(':')
+            start, _, stop = span.partition('-')
+            start, stop, step = int(start), int(stop or start), int(step or 1)
+            if start <= task <= stop and (task - start) % step == 0:
+                return True
+        return False
+
 class SGESubmitSFS(SGESubmit):
     script_args = {'label', 'project_path', 'output_path', 'env', 'command', 'cores', 'vmem', }
     script_template = \
@@ -362,5 +626,304 @@ export JOBID=$JOB_ID
                       runtk.STDOUT: '{output_path}/{label}.run',
                       runtk.SOCKET: '{sockname}'
                       }
+class SGEArraySubmit(SGESubmit):
+    """
+    SGE array job submission (qsub -t 1-N), bundles N trials into a single script and a single qsub call.
+    the per task mappings are written as one row per task to a parameter table ({output_path}/{label}.tbl, json lines),
+    the runner of each task selects its row by $SGE_TASK_ID (see runtk.Runner, TBLFILE and TASKID).
+    communication is through the shared file system, with per task .out and .sgl files (see get_task_handles)
+    """
+    script_args = {'label', 'project_path', 'output_path', 'env', 'command', 'cores', 'vmem', 'tasks'}
+    script_template = \
+        """\
+#!/bin/bash
+#$ -N j{label}
+#$ -t 1-{tasks}
+#$ -pe smp {cores}
+#$ -l h_vmem={vmem}
+#$ -o {output_path}/{label}.$TASK_ID.run
+cd {project_path}
+source ~/.bashrc
+export TBLFILE="{output_path}/{label}.tbl"
+export TASKID=$SGE_TASK_ID
+export OUTFILE="{output_path}/{label}.$SGE_TASK_ID.out"
+export SGLFILE="{output_path}/{label}.$SGE_TASK_ID.sgl"
+export JOBID=$JOB_ID
+{env}
+{command}
+"""
+    script_handles = {runtk.SUBMIT: '{output_path}/{label}.sh',
+                      runtk.TABLE: '{output_path}/{label}.tbl',
+                      runtk.STDOUT: '{output_path}/{label}.{task}.run',
+                      runtk.MSGOUT: '{output_path}/{label}.{task}.out',
+                      runtk.SGLOUT: '{output_path}/{label}.{task}.sgl',
+                      }
+
+    def create_job(self, table=None, **kwargs):
+        """
+        creates the array job script and its parameter table
+        Parameters
+        ----------
+        table - list of dictionaries (formatted environment variables, see runtk.Dispatcher.format_env), one per task
+        **kwargs - see Submit.create_job, env is shared between all tasks
+        """
+        table = table or [{}]
+        super().create_job(tasks=len(table), **kwargs)
+        self.write_table(table)
+
+    def submit_job(self, **kwargs):
+        super().submit_job() # Your job-array 1234.1-4:1 ("jlabel") has been submitted
+        self.job_id = self.job_id.split('.')[0]
+        return self.job_id
+
 SGESubmitINET = SGESubmitSOCK
 SGESubmitUNIX = SGESubmitSOCK
+
+
+class SLURMSubmit(Submit):
+    script_args = {'label', 'project_path', 'output_path', 'env', 'command', 'cores', 'vmem', }
+    script_template = \
+        """\
+#!/bin/bash
+#SBATCH --job-name={label}
+#SBATCH --ntasks=1
+#SBATCH --cpus-per-task={cores}
+#SBATCH --mem={vmem}
+#SBATCH -o {output_path}/{label}.run
+cd {project_path}
+source ~/.bashrc
+export JOBID=$SLURM_JOB_ID
+{env}
+{command}
+"""
+    script_handles = {runtk.SUBMIT: '{output_path}/{label}.sh',
+                      runtk.STDOUT: '{output_path}/{label}.run'}
+    states = {'PD': runtk.QUEUED, 'CF': runtk.QUEUED, 'RQ': runtk.QUEUED, 'RF': runtk.QUEUED, 'RH': runtk.QUEUED,
+              'R': runtk.RUNNING, 'CG': runtk.RUNNING, 'S': runtk.RUNNING, 'ST': runtk.RUNNING, 'SO': runtk.RUNNING,
+              'CD': runtk.FINISHED, 'F': runtk.FAILED, 'NF': runtk.FAILED, 'BF': runtk.FAILED, 'OOM': runtk.FAILED,
+              'TO': runtk.FAILED, 'CA': runtk.FAILED, 'DL': runtk.FAILED, 'PR': runtk.FAILED}
+    def __init__(self, **kwargs):
+        super().__init__(
+            submit_template = Template(template="sbatch {output_path}/{label}.sh",
+                                       key_args={'output_path',  'label'}),
+            script_template = Template(template=self.script_template,
+                                       key_args=self.script_args),
+            handles = self.script_handles,
+            )
+
+    def submit_job(self, **kwargs):
+        proc = super().submit_job()
+        try: # Submitted batch job 1234 (or 1234;cluster with --parsable)
+            self.job_id = proc.stdout.split()[-1].split(';')[0]
+            int(self.job_id)
+        except Exception as e:
+            raise(Exception("{}\nJob submission failed:\n{}\n{}\n{}\n{}".format(e, self.submit, self.script, proc.stdout, proc.stderr)))
+        return self.job_id
+
+    def set_handles(self):
+        pass
+
+    @classmethod
+    def query_jobs(cls, job_ids):
+        """
+        a single `squeue` call for every job of the user, jobs (or array / packed tasks, "{job_id}.{task}") that are no
+        longer listed have finished
+        """
+        proc = subprocess.run(['squeue', '-h', '-u', getpass.getuser(), '-o', '%i %t'], text=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if proc.returncode:
+            raise RuntimeError("squeue failed: {}".format(proc.stderr))
+        return cls.parse_squeue(proc.stdout, job_ids)
+
+    @classmethod
+    def cancel_job(cls, job_id):
+        """
+        `scancel` the job, or a single task ("{job_id}.{task}" -> {job_id}_{task}) of an array job
+        """
+        number, _, task = str(job_id).partition('.')
+        proc = subprocess.run(['scancel', "{}_{}".format(number, task) if task else number], text=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return proc.returncode == 0
+
+    @classmethod
+    def parse_squeue(cls, stdout, job_ids):
+        listed = {} # job number -> [(tasks, state)]
+        for line in stdout.splitlines():
+            if not line.strip():
+                continue
+            job, code = line.split()[:2]
+            number, _, tasks = job.partition('_') # 1234, 1234_5, 1234_[6-10%2]
+            tasks = tasks.strip('[]').split('%')[0]
+            listed.setdefault(number, []).append((tasks, cls.states.get(code, runtk.UNKNOWN)))
+        states = {}
+        for job_id in job_ids:
+            number, _, task = str(job_id).partition('.')
+            states[job_id] = runtk.FINISHED
+            for tasks, state in listed.get(number, []):
+                if not task or not tasks or SGESubmit.in_tasks(int(task), tasks):
+                    states[job_id] = state
+                    break
+        return states
+
+class SLURMSubmitSFS(SLURMSubmit):
+    script_args = {'label', 'project_path', 'output_path', 'env', 'command', 'cores', 'vmem', }
+    script_template = \
+        """\
+#!/bin/bash
+#SBATCH --job-name={label}
+#SBATCH --ntasks=1
+#SBATCH --cpus-per-task={cores}
+#SBATCH --mem={vmem}
+#SBATCH -o {output_path}/{label}.run
+cd {project_path}
+source ~/.bashrc
+export OUTFILE="{output_path}/{label}.out"
+export SGLFILE="{output_path}/{label}.sgl"
+export JOBID=$SLURM_JOB_ID
+{env}
+{command}
+"""
+    script_handles = {runtk.SUBMIT: '{output_path}/{label}.sh',
+                      runtk.STDOUT: '{output_path}/{label}.run',
+                      runtk.MSGOUT: '{output_path}/{label}.out',
+                      runtk.SGLOUT: '{output_path}/{label}.sgl',
+                      }
+
+class SLURMSubmitSOCK(SLURMSubmit):
+    script_args = {'label', 'project_path', 'output_path', 'env', 'command', 'cores', 'vmem', 'sockname'}
+    script_template = \
+        """\
+#!/bin/bash
+#SBATCH --job-name={label}
+#SBATCH --ntasks=1
+#SBATCH --cpus-per-task={cores}
+#SBATCH --mem={vmem}
+#SBATCH -o {output_path}/{label}.run
+cd {project_path}
+source ~/.bashrc
+export SOCNAME="{sockname}"
+export JOBID=$SLURM_JOB_ID
+{env}
+{command}
+"""
+    script_handles = {runtk.SUBMIT: '{output_path}/{label}.sh',
+                      runtk.STDOUT: '{output_path}/{label}.run',
+                      runtk.SOCKET: '{sockname}'
+                      }
+
+class SLURMArraySubmit(SLURMSubmit):
+    """
+    SLURM array job submission (sbatch --array=1-N), the SLURM counterpart of runtk.SGEArraySubmit: N trials in a
+    single script and a single sbatch call, the runner of each task selects its row of the parameter table by
+    $SLURM_ARRAY_TASK_ID (see runtk.Runner, TBLFILE and TASKID). communication is through the shared file system.
+    """
+    script_args = {'label', 'project_path', 'output_path', 'env', 'command', 'cores', 'vmem', 'tasks'}
+    script_template = \
+        """\
+#!/bin/bash
+#SBATCH --job-name={label}
+#SBATCH --array=1-{tasks}
+#SBATCH --ntasks=1
+#SBATCH --cpus-per-task={cores}
+#SBATCH --mem={vmem}
+#SBATCH -o {output_path}/{label}.%a.run
+cd {project_path}
+source ~/.bashrc
+export TBLFILE="{output_path}/{label}.tbl"
+export TASKID=$SLURM_ARRAY_TASK_ID
+export OUTFILE="{output_path}/{label}.$SLURM_ARRAY_TASK_ID.out"
+export SGLFILE="{output_path}/{label}.$SLURM_ARRAY_TASK_ID.sgl"
+export JOBID=$SLURM_ARRAY_JOB_ID
+{env}
+{command}
+"""
+    script_handles = SGEArraySubmit.script_handles
+
+    def create_job(self, table=None, **kwargs):
+        """
+        creates the array job script and its parameter table (see runtk.SGEArraySubmit.create_job)
+        """
+        table = table or [{}]
+        super().create_job(tasks=len(table), **kwargs)
+        self.write_table(table)
+
+class SLURMPackSubmit(SLURMSubmit):
+    """
+    packed SLURM job submission, a single allocation of {tasks} x {cores} cpus runs every trial of the parameter table
+    as a concurrent `srun` job step sized by {cores}. small simulations share one node allocation rather than each
+    waiting in the queue. (see runtk.SLURMArraySubmit for the table and handles)
+    as with the other SLURM classes, {vmem} is the memory of a single trial: each job step is limited to --mem={vmem}
+    and the allocation requests the total, --mem={total_vmem} ({tasks} x {vmem}, see scale_memory())
+    """
+    script_args = {'label', 'project_path', 'output_path', 'env', 'command', 'cores', 'vmem', 'tasks', 'total_vmem'}
+    script_template = \
+        """\
+#!/bin/bash
+#SBATCH --job-name={label}
+#SBATCH --ntasks={tasks}
+#SBATCH --cpus-per-task={cores}
+#SBATCH --mem={total_vmem}
+#SBATCH -o {output_path}/{label}.run
+cd {project_path}
+source ~/.bashrc
+export TBLFILE="{output_path}/{label}.tbl"
+export JOBID=$SLURM_JOB_ID
+{env}
+for task in $(seq 1 {tasks}); do
+    TASKID=$task OUTFILE="{output_path}/{label}.$task.out" SGLFILE="{output_path}/{label}.$task.sgl" \\
+    srun --exact --ntasks=1 --cpus-per-task={cores} --mem={vmem} {command} > {output_path}/{label}.$task.run 2>&1 &
+done
+wait
+"""
+    script_handles = SGEArraySubmit.script_handles
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.vmem = None
+
+    def update_templates(self, **kwargs):
+        """
+        see Submit.update_templates, the per trial {vmem} is kept to size the allocation on create_job()
+        """
+        if 'vmem' in kwargs:
+            self.vmem = kwargs['vmem']
+        super().update_templates(**kwargs)
+
+    def create_job(self, table=None, **kwargs):
+        """
+        creates the packed job script and its parameter table (see runtk.SGEArraySubmit.create_job)
+        """
+        table = table or [{}]
+        vmem = kwargs.get('vmem', self.vmem)
+        if vmem is not None and 'total_vmem' not in kwargs:
+            kwargs['total_vmem'] = scale_memory(vmem, len(table))
+        super().create_job(tasks=len(table), **kwargs)
+        self.write_table(table)
+
+    @classmethod
+    def cancel_job(cls, job_id):
+        """
+        the tasks of a packed job are job steps of a single allocation and cannot be cancelled individually, only the
+        whole job is
+        """
+        if '.' in str(job_id):
+            return False
+        return super().cancel_job(job_id)
+
+def scale_memory(vmem, factor):
+    """
+    Parameters
+    ----------
+    vmem   - a SLURM memory specification, an integer with an optional unit suffix (K, M, G, T), i.e. '2G' or 512
+    factor - the multiplier, i.e. the number of tasks
+    Returns
+    -------
+    the memory specification vmem x factor in the same unit (rounded up), i.e. scale_memory('1.5G', 3) == '5G'
+    """
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*', str(vmem), re.IGNORECASE)
+    if not match:
+        raise ValueError("invalid memory specification {!r}".format(vmem))
+    return "{}{}".format(math.ceil(float(match.group(1)) * factor), match.group(2).upper())
+
+SLURMSubmitINET = SLURMSubmitSOCK
+SLURMSubmitUNIX = SLURMSubmitSOCK
@@ -0,0 +1,147 @@
+import json
+import time
+from pubtk import runtk
+
+# lifecycle phases marked by the dispatchers (see runtk.SHDispatcher) and runners (see runtk.Runner)
+DISPATCHER = 'dispatcher'
+RUNNER = 'runner'
+PHASES = {
+    DISPATCHER: ('init_run', 'create_job', 'submit_job', 'accept', 'first_byte', 'recv', 'clean'),
+    RUNNER: ('start', 'connect', 'send'),
+}
+
+# (name, (source, phase) start, (source, phase) end) of the durations derived by merge_timelines()
+DURATIONS = (
+    ('render', (DISPATCHER, 'init_run'), (DISPATCHER, 'create_job')),   # script rendering
+    ('submit', (DISPATCHER, 'create_job'), (DISPATCHER, 'submit_job')), # scheduler submission
+    ('queue', (DISPATCHER, 'submit_job'), (RUNNER, 'start')),           # scheduler queue wait and interpreter startup
+    ('connect', (RUNNER, 'start'), (RUNNER, 'connect')),                # model setup up to the connection
+    ('accept', (DISPATCHER, 'submit_job'), (DISPATCHER, 'accept')),
+    ('simulate', (RUNNER, 'connect'), (RUNNER, 'send')),
+    ('run', (RUNNER, 'start'), (RUNNER, 'send')),
+    ('transfer', (RUNNER, 'send'), (DISPATCHER, 'recv')),              # result serialization and transfer
+    ('receive', (DISPATCHER, 'first_byte'), (DISPATCHER, 'recv')),
+    ('clean', (DISPATCHER, 'recv'), (DISPATCHER, 'clean')),
+    ('total', (DISPATCHER, 'init_run'), (DISPATCHER, 'clean')),
+)
+
+class Timeline(object):
+    """
+    monotonic timestamps of the lifecycle phases of a dispatcher or runner (see PHASES)
+    timestamps are taken with time.monotonic(), the anchor (time.time() - time.monotonic() at creation) converts them
+    to wall clock time so that the timelines of a dispatcher and its runner (another process, possibly another host)
+    can be merged (see merge_timelines()).
+    the runner sends its timeline back with its result when TIMELINE is exported (see runtk.Dispatcher, timeline=True)
+
+    use:
+        timeline = Timeline(DISPATCHER)
+        timeline.mark('init_run')
+        ...
+        timeline.elapsed('init_run', 'clean')
+    """
+    def __init__(self, source, anchor=None, marks=None):
+        """
+        Parameters
+        ----------
+        source - the source of the timeline, DISPATCHER or RUNNER
+        *Optional*
+        anchor - the offset (in seconds) of the monotonic clock to the wall clock, defaults to the current offset
+        marks  - dictionary of {phase: monotonic timestamp}
+        """
+        self.source = source
+        self.anchor = time.time() - time.monotonic() if anchor is None else anchor
+        self.marks = marks or {}
+
+    def mark(self, phase, timestamp=None):
+        """
+        records the (latest) timestamp of phase
+        Parameters
+        ----------
+        phase     - the name of the phase
+        timestamp - *Optional* the time.monotonic() timestamp, defaults to now
+        Returns
+        -------
+        the timestamp
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        self.marks[phase] = timestamp
+        return timestamp
+
+    def wall(self, phase):
+        """
+        Returns
+        -------
+        the wall clock time (seconds since the epoch) of phase, None if the phase was not marked
+        """
+        if phase not in self.marks:
+            return None
+        return self.anchor + self.marks[phase]
+
+    def elapsed(self, start, end):
+        """
+        Returns
+        -------
+        the time (in seconds) between phases start and end, None if either was not marked
+        """
+        if start not in self.marks or end not in self.marks:
+            return None
+        return self.marks[end] - self.marks[start]
+
+    def clear(self):
+        self.marks = {}
+
+    def to_dict(self):
+        return {'source': self.source, 'anchor': self.anchor, 'marks': dict(self.marks)}
+
+    @classmethod
+    def from_dict(cls, dictionary):
+        return cls(dictionary['source'], anchor=dictionary['anchor'], marks=dictionary['marks'])
+
+    def frame(self, data):
+        """
+        Returns
+        -------
+        data prefixed with the timeline (runtk.TIMELINE header line), see unframe()
+        """
+        return "{}{}\n{}".format(runtk.TIMELINE, json.dumps(self.to_dict()), data)
+
+    @classmethod
+    def unframe(cls, data):
+        """
+        Returns
+        -------
+        (data, Timeline) of data framed by frame(), (data, None) if data is not framed
+        """
+        if not isinstance(data, str) or not data.startswith(runtk.TIMELINE):
+            return data, None
+        header, _, data = data.partition('\n')
+        return data, cls.from_dict(json.loads(header[len(runtk.TIMELINE):]))
+
+    def __repr__(self):
+        return "Timeline({}, {})".format(self.source, self.marks)
+
+def merge_timelines(*timelines, label=None):
+    """
+    merges the timelines of a trial into a single (json serializable) record
+    Parameters
+    ----------
+    *timelines - the Timeline objects of the trial (i.e. the dispatcher's and the runner's), None entries are ignored
+    label      - *Optional* the label of the trial
+    Returns
+    -------
+    dictionary of
+        label     - the label of the trial
+        start     - the wall clock time of the first phase
+        phases    - list of {'source', 'phase', 'time'}, in order, where time is relative to start (in seconds)
+        durations - {name: seconds} of the DURATIONS for which both phases were marked
+
+    use:
+        record = merge_timelines(dispatcher.timeline, dispatcher.runner_timeline, label=dispatcher.label)
+    """
+    walls = {(timeline.source, phase): timeline.wall(phase)
+             for timeline in timelines if timeline for phase in timeline.marks}
+    start = min(walls.values(), default=None)
+    phases = sorted(({'source': source, 'phase': phase, 'time': wall - start}
+                     for (source, phase), wall in walls.items()), key=lambda entry: entry['time'])
+    durations = {name: walls[end] - walls[begin] for name, begin, end in DURATIONS if begin in walls and end in walls}
+    return {'label': label, 'start': start, 'phases': phases, 'durations': durations}
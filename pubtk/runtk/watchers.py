@@ -0,0 +1,253 @@
+import os
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from concurrent.futures import Future
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_NONBLOCK    = os.O_NONBLOCK
+IN_CLOEXEC     = 0o2000000
+IN_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT = struct.Struct('iIII') # wd, mask, cookie, len (followed by len bytes of name)
+
+
+class Inotify(object):
+    """
+    minimal ctypes binding to linux inotify, watching directories for created / closed / moved-in files.
+    raises OSError if inotify is not available (non linux platforms, exhausted watches, etc.)
+    N.B. inotify only sees changes made through the local kernel, so files written to a network file system by another
+    host may not generate events (see SFSWatcher, which falls back to scanning)
+    """
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError("inotify not supported")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = {} # wd -> path
+        self.wds = {}   # path -> wd
+
+    def add(self, path):
+        if path in self.wds:
+            return self.wds[path]
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), IN_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed for {}".format(path))
+        self.paths[wd] = path
+        self.wds[path] = wd
+        return wd
+
+    def remove(self, path):
+        wd = self.wds.pop(path, None)
+        if wd is not None:
+            self.paths.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self):
+        """
+        Returns
+        -------
+        list of (directory, filename) tuples for the pending events (nonblocking)
+        """
+        events = []
+        try:
+            buffer = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return events
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, cookie, length = EVENT.unpack_from(buffer, offset)
+            offset += EVENT.size
+            name = buffer[offset: offset + length].rstrip(b'\0')
+            offset += length
+            if wd in self.paths and name:
+                events.append((self.paths[wd], os.fsdecode(name)))
+        return events
+
+    def fileno(self):
+        return self.fd
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class SFSWatcher(object):
+    """
+    shared completion watcher for shared file system (SFS) handles
+    a single background thread watches every pending file (i.e. the .sgl / .out handles of SFSDispatchers) and
+    delivers completions as concurrent.futures.Future objects (and optional callbacks), replacing per-dispatcher
+    busy polling with os.path.exists.
+
+    inotify is used when available to wake on completion immediately. regardless, every directory with pending files
+    is checked with a single os.scandir per poll tick (catching writes from remote hosts on network file systems),
+    with the poll interval backing off from min_interval to max_interval while nothing completes.
+
+    use:
+        watcher = SFSWatcher()
+        future = watcher.watch('/path/to/output/label.sgl', callback=lambda future: print(future.result()))
+        future.result() # blocking, returns the path once the file exists
+    """
+    def __init__(self, min_interval=0.05, max_interval=5.0, backoff=2.0, inotify=True):
+        """
+        *Optional* Parameters
+        ----------
+        min_interval - the shortest time (in seconds) between scans of the watched directories
+        max_interval - the longest time (in seconds) between scans of the watched directories
+        backoff      - the factor the interval is multiplied by after each scan that finds nothing
+        inotify      - whether to use inotify (if supported) in addition to scanning
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self.pending = {} # directory -> {filename: [futures]}
+        self.lock = threading.Lock()
+        self.inotify = None
+        if inotify:
+            try:
+                self.inotify = Inotify()
+            except OSError:
+                self.inotify = None
+        self.wake_r, self.wake_w = os.pipe()
+        self.thread = None
+        self.closed = False
+
+    def start(self):
+        if not self.thread:
+            self.thread = threading.Thread(target=self.serve, daemon=True)
+            self.thread.start()
+
+    def watch(self, path, callback=None):
+        """
+        watches for the creation of path
+        Parameters
+        ----------
+        path     - the file to watch for
+        callback - *Optional* callable added to the future with .add_done_callback(callback)
+        Returns
+        -------
+        future - a concurrent.futures.Future whose result is path once it exists
+        """
+        future = Future()
+        callback and future.add_done_callback(callback)
+        directory, filename = os.path.split(os.path.abspath(path))
+        with self.lock:
+            files = self.pending.setdefault(directory, {})
+            files.setdefault(filename, []).append(future)
+            if self.inotify and len(files) == 1:
+                try:
+                    self.inotify.add(directory)
+                except OSError:
+                    pass
+            self.interval = self.min_interval
+        self.start()
+        if os.path.exists(path): # completed before it was watched
+            self.resolve(directory, filename)
+        else:
+            os.write(self.wake_w, b'\0')
+        return future
+
+    def unwatch(self, path):
+        """
+        stops watching path, cancelling any pending futures
+        """
+        directory, filename = os.path.split(os.path.abspath(path))
+        with self.lock:
+            futures = self.pending.get(directory, {}).pop(filename, [])
+            self.prune(directory)
+        for future in futures:
+            future.cancel()
+
+    def prune(self, directory):
+        # called with self.lock held
+        if directory in self.pending and not self.pending[directory]:
+            del self.pending[directory]
+            self.inotify and self.inotify.remove(directory)
+
+    def resolve(self, directory, filename):
+        with self.lock:
+            futures = self.pending.get(directory, {}).pop(filename, [])
+            self.prune(directory)
+            if futures:
+                self.interval = self.min_interval
+        for future in futures:
+            if future.set_running_or_notify_cancel():
+                future.set_result(os.path.join(directory, filename))
+        return bool(futures)
+
+    def scan(self):
+        """
+        checks every directory with pending files with a single os.scandir
+        Returns
+        -------
+        True if any file completed
+        """
+        with self.lock:
+            pending = {directory: set(files) for directory, files in self.pending.items()}
+        completed = False
+        for directory, filenames in pending.items():
+            try:
+                with os.scandir(directory) as entries:
+                    found = [entry.name for entry in entries if entry.name in filenames]
+            except OSError:
+                continue
+            for filename in found:
+                completed = self.resolve(directory, filename) or completed
+        return completed
+
+    def serve(self):
+        fds = [self.wake_r] + ([self.inotify.fileno()] if self.inotify else [])
+        deadline = time.monotonic()
+        while not self.closed:
+            ready, _, _ = select.select(fds, [], [], max(deadline - time.monotonic(), 0))
+            if self.wake_r in ready:
+                os.read(self.wake_r, 4096)
+            if self.inotify and self.inotify.fileno() in ready:
+                for directory, filename in self.inotify.read():
+                    self.resolve(directory, filename)
+            if time.monotonic() >= deadline:
+                if not self.scan():
+                    with self.lock:
+                        self.interval = min(self.interval * self.backoff, self.max_interval)
+                deadline = time.monotonic() + self.interval
+            elif self.wake_r in ready: # new watch, rescan at the reset interval
+                deadline = min(deadline, time.monotonic() + self.interval)
+
+    def close(self):
+        self.closed = True
+        os.write(self.wake_w, b'\0')
+        if self.thread:
+            self.thread.join()
+        with self.lock:
+            futures = [future for files in self.pending.values() for futures in files.values() for future in futures]
+            self.pending = {}
+        for future in futures:
+            future.cancel()
+        self.inotify and self.inotify.close()
+        os.close(self.wake_r)
+        os.close(self.wake_w)
+
+_watcher = None
+_watcher_lock = threading.Lock()
+def get_watcher():
+    """
+    Returns
+    -------
+    the process wide SFSWatcher shared by SFSDispatchers that are not given their own watcher
+    """
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = SFSWatcher()
+        return _watcher
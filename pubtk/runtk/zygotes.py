@@ -0,0 +1,435 @@
+"""
+fork server (zygote), runs local jobs in children forked from a warm interpreter rather than in new interpreters.
+the server imports the modules of the runners (i.e. pubtk.netpyne, neuron) and loads the compiled mechanisms once,
+then forks a child per job with the job's environment, working directory and output: the loaded libraries are shared
+copy on write and the startup of a job drops from seconds (interpreter, imports, mechanisms) to milliseconds.
+python commands (`python script.py ...`, `python -m module ...`) run in the forked child, other commands are
+executed by it (no savings). the server is local and single threaded (forking a multi threaded process is unsafe).
+
+used through the ZSH submits (see runtk.ZSHForkSubmitSFS, runtk.ZSHForkSubmitSOCK) or the local pool
+(see runtk.LocalPoolDispatcher, fork_server=...)
+
+use:
+    server = start_fork_server('/tmp/zygote.s', preload=['pubtk.netpyne', 'neuron'], mechanisms=['mod'])
+    submit = ZSHForkSubmitSFS(socket_name='/tmp/zygote.s')
+    ...
+    ForkClient('/tmp/zygote.s').stop()
+or from the command line:
+    python -m pubtk.runtk.zygotes --socket /tmp/zygote.s --preload pubtk.netpyne neuron --mechanisms mod
+"""
+import os
+import re
+import sys
+import time
+import runpy
+import shlex
+import signal
+import socket
+import argparse
+import importlib
+import selectors
+import tempfile
+import traceback
+import subprocess
+from pubtk.runtk.sockets import Socket, UNIXSocket
+
+
+def parse_command(command):
+    """
+    Returns
+    -------
+    (argv, python) of the command line, where python is True if the command runs a script or `-m module` with the
+    interpreter (the interpreter is dropped from argv), False otherwise (i.e. interpreter options, executed as is)
+    """
+    argv = shlex.split(command) if isinstance(command, str) else list(command)
+    if len(argv) > 1 and re.fullmatch(r'python[\d.]*', os.path.basename(argv[0])) and \
+            (argv[1] == '-m' or not argv[1].startswith('-')):
+        return argv[1:], True
+    return argv, False
+
+def parse_script(script):
+    """
+    Returns
+    -------
+    (cwd, env, command, stdout) of a rendered ZSH job script (see runtk.ZSHSubmit): the working directory, the exports
+    (quoted or not, unquoted values are kept verbatim, i.e. JOBID=$$ is set by the forked child), the nohup'd command
+    and the file its output is redirected to
+    """
+    cwd = re.search(r'^cd (.*)$', script, re.M)
+    env = {key: quoted or unquoted # the unmatched group is ''
+           for key, quoted, unquoted in re.findall(r'^export (\w+)=(?:"(.*?)"|(\S*))$', script, re.M)}
+    command = re.search(r'^nohup (.*) > (\S+) 2>&1 &$', script, re.M)
+    if not command:
+        raise ValueError("no nohup'd command in script:\n{}".format(script))
+    return cwd and cwd.group(1).strip(), env, command.group(1), command.group(2)
+
+
+class ForkServer(object):
+    """
+    fork server, see module docstring
+    """
+    def __init__(self, socket_name, preload=(), mechanisms=()):
+        """
+        Parameters
+        ----------
+        socket_name - the AF_UNIX socket file the server listens on
+        preload     - *Optional* the modules imported once by the server (i.e. 'pubtk.netpyne', 'neuron')
+        mechanisms  - *Optional* the directories of compiled NEURON mechanisms (mod files) loaded once by the server
+        """
+        self.socket = UNIXSocket(socket_name=socket_name)
+        self.name = socket_name
+        self.preload = list(preload)
+        self.mechanisms = list(mechanisms)
+        self.waiting = {} # pid -> Socket of the client waiting for the returncode
+        self.selector = None
+        self.wakeups = ()
+        self.closed = False
+
+    def load(self):
+        for module in self.preload:
+            importlib.import_module(module)
+        if self.mechanisms:
+            from neuron import load_mechanisms
+            for path in self.mechanisms:
+                load_mechanisms(os.path.abspath(path))
+
+    def serve(self):
+        """
+        loads the modules and mechanisms, then serves requests until stopped (blocking, from the main thread)
+        """
+        self.load()
+        if os.path.exists(self.name): # stale socket file of a previous server
+            os.unlink(self.name)
+        self.socket.listen(socket.SOMAXCONN)
+        self.selector = selectors.DefaultSelector()
+        self.wakeups = socket.socketpair() # signals (SIGCHLD) wake select() to reap the children
+        wakeup, writer = self.wakeups
+        for end in self.wakeups:
+            end.setblocking(False)
+        signal.set_wakeup_fd(writer.fileno())
+        signal.signal(signal.SIGCHLD, lambda *_: None)
+        self.selector.register(self.socket.socket, selectors.EVENT_READ, self.accept)
+        self.selector.register(wakeup, selectors.EVENT_READ, lambda fileobj: fileobj.recv(4096))
+        try:
+            while not self.closed:
+                for key, _ in self.selector.select(timeout=1.0):
+                    key.data(key.fileobj)
+                self.reap()
+        finally:
+            signal.set_wakeup_fd(-1)
+            self.close()
+
+    def accept(self, fileobj):
+        connection, _ = fileobj.accept()
+        connection.settimeout(10.0) # local clients send their request at once
+        peer = Socket(socket_name=self.name, socket_type=socket.AF_UNIX, connection=connection)
+        try:
+            keep = self.handle(peer)
+        except Exception as e:
+            try:
+                peer.send({'error': repr(e)})
+            except OSError:
+                pass
+            keep = False
+        if not keep:
+            peer.close()
+
+    def handle(self, peer):
+        """
+        Internal function handling a request
+        Returns
+        -------
+        True if the connection is kept open (the client waits for the returncode of the child)
+        """
+        request = peer.recv()
+        if request is None:
+            return False
+        fds = []
+        if request.get('fds'): # stdout (and stderr) of the child, passed with SCM_RIGHTS
+            _, fds, _, _ = socket.recv_fds(peer.connection, 1, request['fds'])
+        command = request.get('command')
+        if command == 'spawn':
+            pid = self.fork(request, fds, peer)
+            peer.send({'pid': pid})
+            if request.get('wait'):
+                self.waiting[pid] = peer
+                return True
+        elif command == 'ping':
+            peer.send({'pid': os.getpid(), 'preload': self.preload, 'mechanisms': self.mechanisms})
+        elif command == 'stop':
+            self.closed = True
+            peer.send({'pid': os.getpid()})
+        else:
+            raise ValueError("unknown command {}".format(command))
+        return False
+
+    def fork(self, request, fds, peer):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            self.run_child(request, fds, [peer, *self.waiting.values()]) # does not return
+        for fd in fds:
+            os.close(fd)
+        return pid
+
+    def run_child(self, request, fds, peers):
+        """
+        Internal function, runs the command of request in the forked child then exits
+        """
+        code = 1
+        try:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            self.selector.close()
+            self.socket.socket.close() # the socket file belongs to the server
+            for end in self.wakeups:
+                end.close()
+            for peer in peers:
+                peer.connection.close()
+            os.setsid() # a job of its own, signaled (see runtk.ZSHSubmit.cancel_job) without the server
+            for target, fd in zip((1, 2), fds + fds[:1]): # stderr defaults to stdout
+                os.dup2(fd, target)
+            for fd in fds:
+                os.close(fd)
+            request.get('cwd') and os.chdir(request['cwd'])
+            env = request.get('env')
+            if env is not None:
+                os.environ.clear()
+                os.environ.update(env)
+            os.environ['JOBID'] = str(os.getpid()) # JOBID=$$ in the scripts, the child is the job
+            if 'CPUSET' in os.environ and hasattr(os, 'sched_setaffinity'): # see runtk.LocalPoolDispatcher, pin=True
+                os.sched_setaffinity(0, {int(cpu) for cpu in os.environ['CPUSET'].split(',')})
+            argv, python = parse_command(request['argv'])
+            if not python:
+                os.execvp(argv[0], argv)
+            if argv[0] == '-m':
+                sys.argv = argv[1:]
+                sys.path.insert(0, os.getcwd())
+                runpy.run_module(argv[1], run_name='__main__', alter_sys=True)
+            else:
+                sys.argv = argv
+                sys.path.insert(0, os.path.dirname(os.path.abspath(argv[0])))
+                runpy.run_path(argv[0], run_name='__main__')
+            code = 0
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                code = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            peer = self.waiting.pop(pid, None)
+            if peer:
+                try:
+                    peer.send({'pid': pid, 'returncode': os.waitstatus_to_exitcode(status)})
+                except OSError: # the client is gone
+                    pass
+                peer.close()
+
+    def close(self):
+        for peer in self.waiting.values():
+            peer.close()
+        self.waiting = {}
+        self.selector and self.selector.close()
+        for end in self.wakeups:
+            end.close()
+        self.socket.close()
+
+
+class ForkedProcess(object):
+    """
+    a child of the fork server, with the subset of the subprocess.Popen interface used by the dispatchers
+    (see ForkClient.popen)
+    """
+    def __init__(self, args, pid, peer, stdout, stderr):
+        self.args = args
+        self.pid = pid
+        self.peer = peer
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self):
+        if self.returncode is None:
+            reply = self.peer.recv()
+            self.peer.close()
+            if reply is None:
+                raise RuntimeError("fork server closed the connection of child {}".format(self.pid))
+            self.returncode = reply['returncode']
+        return self.returncode
+
+    def communicate(self):
+        """
+        Returns
+        -------
+        (stdout, stderr) text of the child, once it exited
+        """
+        self.wait()
+        outputs = []
+        for fptr in (self.stdout, self.stderr):
+            fptr.seek(0)
+            outputs.append(fptr.read().decode())
+            fptr.close()
+        return tuple(outputs)
+
+    def send_signal(self, signum):
+        try:
+            os.kill(self.pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+class ForkClient(object):
+    """
+    client of a ForkServer
+    """
+    def __init__(self, socket_name, timeout=None):
+        self.name = socket_name
+        self.timeout = timeout
+
+    def request(self, message, fds=()):
+        """
+        Internal function
+        Returns
+        -------
+        (reply, Socket) of the request, the socket is left open
+        """
+        peer = Socket(socket_name=self.name, socket_type=socket.AF_UNIX, timeout=self.timeout)
+        peer.connect()
+        try:
+            peer.send(dict(message, fds=len(fds)))
+            if fds:
+                socket.send_fds(peer.connection, [b'\x00'], list(fds))
+            reply = peer.recv()
+        except Exception:
+            peer.close()
+            raise
+        if reply is None or 'error' in reply:
+            peer.close()
+            raise RuntimeError("fork server {}: {}".format(self.name, reply and reply['error']))
+        return reply, peer
+
+    def spawn(self, command, env=None, cwd=None, stdout=None, stderr=None):
+        """
+        forks a child running command
+        Parameters
+        ----------
+        command - the command line (str or list), see parse_command()
+        env     - *Optional* the environment of the child, defaults to that of the server
+        cwd     - *Optional* the working directory of the child
+        stdout  - *Optional* file object the output of the child is written to, defaults to that of the server
+        stderr  - *Optional* file object the errors of the child are written to, defaults to stdout
+        Returns
+        -------
+        the pid of the child
+        """
+        fds = [fptr.fileno() for fptr in (stdout, stderr) if fptr is not None]
+        reply, peer = self.request({'command': 'spawn', 'argv': command, 'env': env, 'cwd': cwd}, fds)
+        peer.close()
+        return reply['pid']
+
+    def popen(self, command, env=None, cwd=None):
+        """
+        forks a child running command, its output is captured (see ForkedProcess.communicate())
+        Returns
+        -------
+        ForkedProcess
+        """
+        stdout, stderr = tempfile.TemporaryFile(), tempfile.TemporaryFile()
+        try:
+            reply, peer = self.request({'command': 'spawn', 'argv': command, 'env': env, 'cwd': cwd, 'wait': True},
+                                       [stdout.fileno(), stderr.fileno()])
+        except Exception:
+            stdout.close()
+            stderr.close()
+            raise
+        return ForkedProcess(command, reply['pid'], peer, stdout, stderr)
+
+    def ping(self):
+        """
+        Returns
+        -------
+        {'pid', 'preload', 'mechanisms'} of the server
+        """
+        reply, peer = self.request({'command': 'ping'})
+        peer.close()
+        return reply
+
+    def stop(self):
+        reply, peer = self.request({'command': 'stop'})
+        peer.close()
+        return reply
+
+
+def start_fork_server(socket_name, preload=(), mechanisms=(), env=None, timeout=60.0):
+    """
+    starts a ForkServer in a new process and waits until it serves requests
+    Parameters
+    ----------
+    socket_name - see ForkServer
+    preload     - see ForkServer
+    mechanisms  - see ForkServer
+    env         - *Optional* the environment of the server (inherited by the children unless a job provides its own)
+    timeout     - *Optional* the time (in seconds) to wait for the server to load
+    Returns
+    -------
+    subprocess.Popen of the server
+    """
+    args = [sys.executable, '-m', 'pubtk.runtk.zygotes', '--socket', socket_name]
+    preload and args.extend(['--preload', *preload])
+    mechanisms and args.extend(['--mechanisms', *mechanisms])
+    proc = subprocess.Popen(args, env=env, start_new_session=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            ForkClient(socket_name).ping()
+            return proc
+        except (OSError, RuntimeError):
+            if proc.poll() is not None:
+                raise RuntimeError("fork server exited with {}".format(proc.returncode))
+            if time.monotonic() > deadline:
+                proc.terminate()
+                raise TimeoutError("fork server {} did not start in {} seconds".format(socket_name, timeout))
+            time.sleep(0.05)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="pubtk fork server (zygote)")
+    parser.add_argument('--socket', required=True, help='the AF_UNIX socket file of the server')
+    parser.add_argument('--preload', nargs='*', default=[], help='the modules imported once by the server')
+    parser.add_argument('--mechanisms', nargs='*', default=[], help='the directories of compiled NEURON mechanisms')
+    args = parser.parse_args(argv)
+    server = ForkServer(args.socket, preload=args.preload, mechanisms=args.mechanisms)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: setattr(server, 'closed', True))
+    server.serve()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+from pubtk.runtk import FileRunner
+
+runner = FileRunner()
+runner.send(str(runner.mappings['intvalue'] * runner.mappings['scale']))
+runner.close()
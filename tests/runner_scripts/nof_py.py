@@ -0,0 +1,6 @@
+from pubtk.runtk import Runner
+import os
+
+runner = Runner()
+cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else []
+print(runner.mappings['intvalue'] * runner.mappings['scale'], ','.join(str(cpu) for cpu in cpus))
@@ -0,0 +1,7 @@
+from array import array
+from pubtk.runtk import SHMRunner
+
+runner = SHMRunner()
+n = runner.mappings['n']
+runner.send_arrays(rates=array('d', [i * runner.mappings['scale'] for i in range(n)]), ids=array('i', range(n)))
+runner.close()
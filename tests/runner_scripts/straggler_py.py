@@ -0,0 +1,11 @@
+import os
+import time
+from pubtk.runtk import FileRunner
+
+runner = FileRunner()
+marker = runner.mappings['marker']
+if runner.mappings['straggle'] and not os.path.exists(marker): # the first attempt of a straggler
+    open(marker, 'w').close()
+    time.sleep(30)
+runner.send(str(runner.mappings['index']))
+runner.close()
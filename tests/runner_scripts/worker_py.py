@@ -0,0 +1,13 @@
+from pubtk.runtk import SocketRunner
+import sys
+
+runner = SocketRunner()
+try:
+    runner.connect() # connect to dispatcher
+    for mappings in runner.tasks(): # wait for the next configuration
+        runner.send(str(mappings['intvalue'] * mappings['scale']))
+    runner.close()
+except Exception as e:
+    runner.close()
+    print(e)
+    sys.exit()
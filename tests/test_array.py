@@ -0,0 +1,44 @@
+import pytest
+import os
+from pubtk import runtk
+from pubtk.runtk.dispatchers import SFSArrayDispatcher
+from pubtk.runtk.submits import SGEArraySubmit
+from pubtk.runtk.runners import FileRunner
+from pubtk.utils import get_exports
+
+
+class TestSGEArray:
+    @pytest.fixture
+    def dispatcher_setup(self, tmp_path):
+        dispatcher = SFSArrayDispatcher(project_path=str(tmp_path),
+                                        submit=SGEArraySubmit(),
+                                        gid='test_array')
+        dispatcher.update_env({'shared': 'value'})
+        for i in range(3):
+            dispatcher.add_task({'intvalue': i, 'fltvalue': i / 2})
+        dispatcher.submit.update_templates(command='python runner.py', cores='1', vmem='1G')
+        return dispatcher
+
+    def test_job(self, dispatcher_setup):
+        dispatcher = dispatcher_setup
+        dispatcher.create_job()
+        with open(dispatcher.handles[runtk.SUBMIT], 'r') as fptr:
+            script = fptr.read()
+        assert '#$ -t 1-3' in script
+        assert 'export TASKID=$SGE_TASK_ID' in script
+        assert 'intvalue' not in script # per task mappings are in the table
+        assert len(dispatcher.tasks) == 3
+        for task, task_dispatcher in enumerate(dispatcher.tasks, 1):
+            handles = task_dispatcher.handles
+            assert handles[runtk.MSGOUT].endswith('test_array.{}.out'.format(task))
+            env = get_exports(dispatcher.handles[runtk.SUBMIT]) | {'TASKID': str(task),
+                                                                   'OUTFILE': handles[runtk.MSGOUT],
+                                                                   'SGLFILE': handles[runtk.SGLOUT]}
+            runner = FileRunner(env=env)
+            assert runner.mappings == {'shared': 'value', 'intvalue': task - 1, 'fltvalue': (task - 1) / 2}
+            runner.send(str(runner.mappings['intvalue']))
+        assert dispatcher.recv(timeout=5) == ['0', '1', '2']
+        assert dispatcher.tasks[1].recv(timeout=5) == '1'
+        dispatcher.clean([runtk.MSGOUT, runtk.SGLOUT, runtk.TABLE])
+        assert not os.path.exists(dispatcher.tasks[0].handles[runtk.MSGOUT])
+        assert not os.path.exists(dispatcher.handles[runtk.TABLE])
@@ -0,0 +1,62 @@
+import pytest
+import os
+import socket
+import asyncio
+from pubtk import runtk
+from pubtk.runtk.dispatchers import AsyncINETDispatcher, AsyncUNIXDispatcher
+from pubtk.runtk.submits import ZSHSubmitSOCK
+from pubtk.runtk.runners import SocketRunner
+from pubtk.utils import get_exports
+
+
+async def exchange(dispatcher, socket_type):
+    await dispatcher.create_job()
+    assert os.path.exists(dispatcher.handles[runtk.SUBMIT])
+    runner = SocketRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+    await asyncio.gather(dispatcher.accept(), asyncio.to_thread(runner.connect, socket_type))
+    await asyncio.to_thread(runner.send, 'runner -> dispatcher message')
+    assert await dispatcher.recv() == 'runner -> dispatcher message'
+    await dispatcher.send('dispatcher -> runner message')
+    assert await asyncio.to_thread(runner.recv) == 'dispatcher -> runner message'
+    runner.close()
+    assert await dispatcher.recv() is None
+    await dispatcher.clean()
+    return runner.mappings
+
+class TestAsyncDispatcher:
+    @pytest.mark.parametrize('constructor, socket_type', [(AsyncINETDispatcher, socket.AF_INET),
+                                                          (AsyncUNIXDispatcher, socket.AF_UNIX)])
+    def test_job(self, tmp_path, constructor, socket_type):
+        dispatcher = constructor(project_path=str(tmp_path),
+                                 submit=ZSHSubmitSOCK(),
+                                 gid='test_async')
+        dispatcher.update_env({'strvalue': '1',
+                               'intvalue': 2,
+                               'fltvalue': 3.0})
+        dispatcher.submit.update_templates(command='python runner.py')
+        mappings = asyncio.run(exchange(dispatcher, socket_type))
+        assert mappings == {'strvalue': '1', 'intvalue': 2, 'fltvalue': 3.0}
+
+    def test_gather(self, tmp_path):
+        dispatchers = [AsyncINETDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSOCK(),
+                                           gid='test_async_{}'.format(i)) for i in range(8)]
+        async def main():
+            return await asyncio.gather(*[exchange(dispatcher, socket.AF_INET) for dispatcher in dispatchers])
+        assert len(asyncio.run(main())) == 8
+
+    def test_timeout(self, tmp_path):
+        dispatcher = AsyncINETDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSOCK(), gid='test_async_timeout')
+        dispatcher.update_env({'intvalue': 2})
+        async def main():
+            await dispatcher.create_job()
+            with pytest.raises(TimeoutError): # no runner connects
+                await dispatcher.accept(timeout=0.2)
+            runner = SocketRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+            await asyncio.gather(dispatcher.accept(timeout=10), asyncio.to_thread(runner.connect, socket.AF_INET))
+            with pytest.raises(TimeoutError): # the runner does not send
+                await dispatcher.recv(timeout=0.2)
+            await asyncio.to_thread(runner.send, 'late')
+            assert await dispatcher.recv(timeout=10) == 'late'
+            runner.close()
+            await dispatcher.clean()
+        asyncio.run(main())
@@ -0,0 +1,85 @@
+import pytest
+import os
+import socket
+import threading
+from pubtk import runtk
+from pubtk.runtk.dispatchers import Dispatcher, SFSDispatcher, INETDispatcher, hash_env
+from pubtk.runtk.submits import ZSHSubmitSFS, ZSHSubmitSOCK
+from pubtk.runtk.runners import FileRunner, SocketRunner
+from pubtk.runtk.caches import ResultCache
+from pubtk.utils import get_exports
+
+
+class TestHash:
+    def test_canonical(self):
+        dispatcher0 = Dispatcher()
+        dispatcher0.update_env({'foo': 1, 'bar': 2.0})
+        dispatcher1 = Dispatcher()
+        dispatcher1.update_env({'bar': 2.0})
+        dispatcher1.update_env({'foo': 1})
+        assert dispatcher0.env != dispatcher1.env
+        assert dispatcher0.get_hash() == dispatcher1.get_hash()
+
+    def test_type_stable(self):
+        assert hash_env({'INTRUNTK0': 'foo=1'}) != hash_env({'FLOATRUNTK0': 'foo=1.0'})
+        assert hash_env({'INTRUNTK0': 'foo=1'}) != hash_env({'STRRUNTK0': 'foo=1'})
+        assert hash_env({'INTRUNTK0': 'foo=1'}) == hash_env({'INTRUNTK5': 'foo = 1'})
+
+class TestResultCache:
+    def test_cache(self, tmp_path):
+        cache = ResultCache(str(tmp_path / 'cache'))
+        key = hash_env({'INTRUNTK0': 'foo=1'})
+        assert key not in cache
+        assert cache.get(key) is None
+        cache.put(key, '{"loss": 0.5}')
+        assert key in cache
+        assert cache.get(key) == '{"loss": 0.5}'
+        assert os.path.exists(os.path.join(str(tmp_path / 'cache'), key[:2], "{}.out".format(key)))
+        cache.remove(key)
+        assert key not in cache
+        assert not cache.put(key, object()) and key not in cache # not supported, not cached
+
+class TestDispatcherCache:
+    def test_run(self, tmp_path):
+        cache = ResultCache(str(tmp_path / 'cache'))
+        dispatcher = SFSDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSFS(), gid='test_cache0', cache=cache)
+        dispatcher.update_env({'intvalue': 2})
+        dispatcher.create_job()
+        runner = FileRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+        threading.Timer(0.05, runner.send, args=('result',)).start()
+        assert dispatcher.recv(timeout=5) == 'result'
+        dispatcher.clean([runtk.MSGOUT, runtk.SGLOUT])
+        # same configuration, different gid: no job is created or submitted
+        dispatcher = SFSDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSFS(), gid='test_cache1', cache=cache)
+        dispatcher.update_env({'intvalue': 2})
+        dispatcher.run()
+        assert dispatcher.handles is None
+        assert dispatcher.accept() is None
+        assert dispatcher.recv() == 'result'
+        dispatcher.clean()
+
+    @pytest.mark.parametrize('data', [{'loss': 0.1, 'rates': [1.0, 2.0]}, bytearray(b'\x00raw\xff')])
+    def test_frames(self, tmp_path, data): # json and bytes frames
+        cache = ResultCache(str(tmp_path / 'cache'))
+        dispatcher = INETDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSOCK(), gid='test_frames0',
+                                    cache=cache)
+        dispatcher.update_env({'intvalue': 2})
+        dispatcher.create_job()
+        def runner_job():
+            runner = SocketRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+            runner.connect(socket.AF_INET)
+            runner.send(data)
+            runner.close()
+        thread = threading.Thread(target=runner_job, daemon=True)
+        thread.start()
+        dispatcher.accept(timeout=10)
+        assert dispatcher.recv() == data
+        thread.join()
+        dispatcher.clean()
+        dispatcher = INETDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSOCK(), gid='test_frames1',
+                                    cache=cache)
+        dispatcher.update_env({'intvalue': 2})
+        dispatcher.run()
+        cached = dispatcher.recv()
+        assert cached == data and type(cached) is type(data)
+        dispatcher.clean()
@@ -0,0 +1,91 @@
+import pytest
+import os
+import sys
+import time
+import shutil
+import subprocess
+from pubtk import runtk
+from pubtk.runtk.dispatchers import SFSDispatcher, cancel_live
+from pubtk.runtk.submits import ZSHSubmit, ZSHSubmitSFS, SGESubmit, SLURMSubmit, SLURMPackSubmit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def get_dispatcher(path, label, command='sleep 30'):
+    submit = ZSHSubmitSFS()
+    submit.submit_template.template = "sh {output_path}/{label}.sh" # zsh may not be installed
+    submit.update_templates(command=command)
+    dispatcher = SFSDispatcher(project_path=str(path), submit=submit, gid=label)
+    dispatcher.update_env({'intvalue': 1})
+    return dispatcher
+
+def wait_finished(job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if ZSHSubmit.query_jobs([str(job_id)])[str(job_id)] == runtk.FINISHED:
+            return True
+        time.sleep(0.1)
+    return False
+
+class TestCancel:
+    def test_zsh(self, tmp_path):
+        dispatcher = get_dispatcher(tmp_path, 'test_cancel')
+        assert not dispatcher.cancel() # not submitted
+        dispatcher.run()
+        assert ZSHSubmit.query_jobs([str(dispatcher.job_id)])[str(dispatcher.job_id)] == runtk.RUNNING
+        assert dispatcher.cancel()
+        assert wait_finished(dispatcher.job_id)
+        dispatcher.clean()
+
+    def test_live(self, tmp_path):
+        dispatchers = [get_dispatcher(tmp_path, 'test_live_{}'.format(i)) for i in range(3)]
+        for dispatcher in dispatchers:
+            dispatcher.run()
+        dispatchers[0].clean() # cleaned dispatchers are no longer live
+        assert cancel_live() == 2
+        assert cancel_live() == 0
+        for dispatcher in dispatchers[1:]:
+            assert wait_finished(dispatcher.job_id)
+        dispatchers[0].cancel()
+
+    def test_reentrant(self, tmp_path):
+        from pubtk.runtk import dispatchers
+        dispatcher = get_dispatcher(tmp_path, 'test_reentrant')
+        dispatcher.run()
+        with dispatchers._live_lock: # i.e. a signal handled while the main thread adds a dispatcher
+            assert cancel_live() == 1
+        assert wait_finished(dispatcher.job_id)
+        dispatcher.clean()
+
+    def test_signal(self, tmp_path):
+        script = (
+            "import os, signal, sys\n"
+            "sys.path.insert(0, {root!r})\n"
+            "from tests.test_cancel import get_dispatcher\n"
+            "from pubtk.runtk.dispatchers import cancel_on_exit\n"
+            "cancel_on_exit()\n"
+            "dispatcher = get_dispatcher({path!r}, 'test_signal')\n"
+            "dispatcher.run()\n"
+            "print(dispatcher.job_id, flush=True)\n"
+            "os.kill(os.getpid(), signal.SIGTERM)\n"
+        ).format(root=ROOT, path=str(tmp_path))
+        proc = subprocess.run([sys.executable, '-c', script], text=True, stdout=subprocess.PIPE, timeout=60)
+        assert proc.returncode == -15 # the default handler ran after the jobs were cancelled
+        assert wait_finished(proc.stdout.strip())
+
+    @pytest.mark.parametrize('submit_constructor, command, job_id, args', [
+        (SGESubmit, 'qdel', '1234', '1234'),
+        (SGESubmit, 'qdel', '1234.3', '1234 -t 3'),
+        (SLURMSubmit, 'scancel', '1234', '1234'),
+        (SLURMSubmit, 'scancel', '1234.3', '1234_3'),
+        (SLURMPackSubmit, 'scancel', '1234', '1234'),
+    ])
+    def test_scheduler(self, tmp_path, monkeypatch, submit_constructor, command, job_id, args):
+        bash = shutil.which('bash')
+        if not bash:
+            pytest.skip("bash is required")
+        (tmp_path / command).write_text('#!{}\necho "$@" > {}/args\n'.format(bash, tmp_path))
+        (tmp_path / command).chmod(0o755)
+        monkeypatch.setenv('PATH', "{}:{}".format(tmp_path, os.environ['PATH']))
+        assert submit_constructor.cancel_job(job_id)
+        assert (tmp_path / 'args').read_text().strip() == args
+        assert not SLURMPackSubmit.cancel_job('1234.3') # a job step of the allocation
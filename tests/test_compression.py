@@ -0,0 +1,76 @@
+import pytest
+import os
+import json
+import socket
+import threading
+from pubtk import runtk
+from pubtk.runtk.dispatchers import SFSDispatcher, INETDispatcher
+from pubtk.runtk.submits import ZSHSubmitSFS, ZSHSubmitSOCK
+from pubtk.runtk.runners import FileRunner, SocketRunner
+from pubtk.runtk.sockets import INETSocket, HEADER
+from pubtk.utils import get_exports
+
+RASTER = json.dumps({'spkt': [i * 0.025 for i in range(20000)], 'spkid': [i % 100 for i in range(20000)]})
+
+class TestCompression:
+    @pytest.fixture
+    def connection_setup(self):
+        server, client = INETSocket(), INETSocket()
+        server.listen()
+        client.connect(server.name)
+        server.accept()
+        yield server, client
+        server.close()
+        client.close()
+
+    def test_hello(self, connection_setup):
+        server, client = connection_setup
+        assert client.send(RASTER) == HEADER.size + len(RASTER) # not negotiated
+        assert server.recv() == RASTER
+        client.hello(1000)
+        assert client.send(RASTER) < len(RASTER) / 2
+        assert client.send("small") == HEADER.size + len("small") # below the threshold
+        assert server.compress is None
+        assert server.recv() == RASTER
+        assert server.compress == 1000 # the HELLO frame was consumed
+        assert server.recv() == "small"
+        assert server.send(RASTER) < len(RASTER) / 2
+        buffer = bytearray(len(RASTER))
+        frame_type, flags, meta, length = client.recv_into(buffer)
+        assert flags == 0 and length == len(RASTER) and buffer.decode() == RASTER
+
+    def test_sfs(self, tmp_path):
+        dispatcher = SFSDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSFS(), gid='test_compression',
+                                   compress=1000)
+        dispatcher.create_job()
+        runner = FileRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+        runner.send(RASTER)
+        with open(dispatcher.handles[runtk.MSGOUT], 'rb') as fptr:
+            data = fptr.read()
+        assert data.startswith(runtk.ZLIB) and len(data) < len(RASTER) / 2
+        assert dispatcher.recv(timeout=10) == RASTER
+        runner.send("small")
+        with open(dispatcher.handles[runtk.MSGOUT], 'r') as fptr:
+            assert fptr.read() == "small"
+        assert dispatcher.get_run() == "small"
+        dispatcher.clean([runtk.SUBMIT, runtk.MSGOUT, runtk.SGLOUT])
+
+    def test_socket(self, tmp_path):
+        dispatcher = INETDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSOCK(), gid='test_compression',
+                                    compress=1000)
+        dispatcher.create_job()
+        def runner_job():
+            runner = SocketRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+            runner.connect(socket.AF_INET)
+            assert runner.socket.compress == 1000
+            runner.send(RASTER)
+            assert runner.recv() == RASTER[::-1]
+            runner.close()
+        thread = threading.Thread(target=runner_job, daemon=True)
+        thread.start()
+        dispatcher.accept(timeout=10)
+        assert dispatcher.recv() == RASTER
+        assert dispatcher.socket.compress == 1000 # negotiated by the runner
+        dispatcher.send(RASTER[::-1])
+        thread.join()
+        dispatcher.clean()
@@ -0,0 +1,83 @@
+import pytest
+import os
+import sys
+import json
+import subprocess
+from pubtk import runtk
+from pubtk.runtk.emulators import SchedulerEmulator
+from pubtk.runtk.monitors import JobMonitor
+from pubtk.runtk.dispatchers import SFSDispatcher, SFSArrayDispatcher
+from pubtk.runtk.sockets import UNIXSocket
+from pubtk.runtk.submits import SGESubmit, SGESubmitSFS, SGEArraySubmit, SLURMSubmitSFS
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runner_scripts')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def emulator(tmp_path, monkeypatch):
+    emulator = SchedulerEmulator(str(tmp_path / 'scheduler.s'), slots=2, latency=0.05)
+    monkeypatch.setenv('PATH', "{}:{}".format(emulator.install(str(tmp_path / 'bin')), os.environ['PATH']))
+    monkeypatch.setenv('PYTHONPATH', ROOT)
+    monkeypatch.setenv('HOME', str(tmp_path)) # the scripts source ~/.bashrc
+    emulator.start()
+    yield emulator
+    emulator.close()
+
+def get_submit(submit_constructor):
+    submit = submit_constructor()
+    submit.update_templates(command="{} {}/file_py.py".format(sys.executable, SCRIPTS), cores=1, vmem='1G')
+    return submit
+
+class TestSchedulerEmulator:
+    @pytest.mark.parametrize('submit_constructor', [SGESubmitSFS, SLURMSubmitSFS])
+    def test_job(self, tmp_path, emulator, submit_constructor):
+        dispatchers = []
+        for i in range(4):
+            dispatcher = SFSDispatcher(project_path=str(tmp_path), submit=get_submit(submit_constructor),
+                                       gid='test_emulator_{}'.format(i))
+            dispatcher.update_env({'intvalue': i, 'scale': 3})
+            dispatcher.run()
+            dispatchers.append(dispatcher)
+        assert [dispatcher.recv(timeout=10) for dispatcher in dispatchers] == [str(i * 3) for i in range(4)]
+        stats = json.loads(emulator.stats())
+        assert stats['finished'] + stats['running'] == 4 # a runner may still be exiting after signaling
+        assert stats['finished'] and stats['wait'] >= 0.05
+        for dispatcher in dispatchers:
+            dispatcher.clean([runtk.MSGOUT, runtk.SGLOUT])
+
+    def test_array(self, tmp_path, emulator):
+        dispatcher = SFSArrayDispatcher(project_path=str(tmp_path), submit=get_submit(SGEArraySubmit), gid='test_array')
+        dispatcher.update_env({'scale': 2})
+        for i in range(5):
+            dispatcher.add_task({'intvalue': i})
+        dispatcher.run()
+        assert dispatcher.recv(timeout=10) == [str(i * 2) for i in range(5)]
+        dispatcher.clean([runtk.MSGOUT, runtk.SGLOUT, runtk.TABLE])
+
+    def test_failure(self, tmp_path, emulator):
+        emulator.failure_rate = 1.0
+        monitor = JobMonitor(interval=0.05)
+        dispatcher = SFSDispatcher(project_path=str(tmp_path), submit=get_submit(SGESubmitSFS), monitor=monitor,
+                                   gid='test_failure')
+        dispatcher.update_env({'intvalue': 1, 'scale': 1})
+        dispatcher.run()
+        with pytest.raises(RuntimeError):
+            dispatcher.recv(timeout=10)
+        assert SGESubmit.query_jobs([dispatcher.job_id]) == {dispatcher.job_id: runtk.FAILED}
+        subprocess.run(['qdel', dispatcher.job_id], check=True, stdout=subprocess.PIPE)
+        assert SGESubmit.query_jobs([dispatcher.job_id]) == {dispatcher.job_id: runtk.FINISHED}
+        dispatcher.clean()
+        monitor.close()
+
+    @pytest.mark.parametrize('command', ['close', 'handle', 'missing'])
+    def test_command(self, emulator, command):
+        def request(command):
+            client = UNIXSocket(socket_name=emulator.name)
+            client.connect()
+            client.send(json.dumps({'command': command, 'args': [], 'cwd': '.', 'env': {}}))
+            reply = json.loads(client.recv())
+            client.close()
+            return reply
+        reply = request(command)
+        assert reply['returncode'] == 1 and 'unknown command' in reply['stderr']
+        assert not emulator.closed and request('stats')['returncode'] == 0 # still serving
@@ -0,0 +1,118 @@
+import pytest
+import os
+import time
+import socket
+import threading
+from pubtk import runtk
+from pubtk.runtk.dispatchers import SFSDispatcher, INETDispatcher
+from pubtk.runtk.submits import ZSHSubmitSFS, ZSHSubmitSOCK
+from pubtk.runtk.runners import FileRunner, SocketRunner
+from pubtk.utils import get_exports
+
+
+class FakeH: # the parts of neuron.h used by runtk.Runner.schedule_heartbeat
+    def __init__(self):
+        self.t, self.events, self.handlers = 0.0, [], []
+        self.cvode = self
+
+    def event(self, t, callback):
+        self.events.append((t, callback))
+
+    def FInitializeHandler(self, callback):
+        self.handlers.append(callback)
+        return callback
+
+    def finitialize(self):
+        self.t, self.events = 0.0, []
+        for callback in self.handlers:
+            callback()
+
+    def psolve(self, tstop, delay): # delay (in seconds) per event, the heartbeat thread does not run meanwhile
+        while self.events and min(self.events)[0] <= tstop:
+            self.events.sort(key=lambda event: event[0])
+            self.t, callback = self.events.pop(0)
+            time.sleep(delay)
+            callback()
+
+class TestHeartbeat:
+    def run_socket(self, dispatcher, simulate):
+        def runner_job():
+            runner = SocketRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+            runner.connect(socket.AF_INET)
+            simulate(runner)
+            runner.close()
+        thread = threading.Thread(target=runner_job, daemon=True)
+        thread.start()
+        dispatcher.accept(timeout=10)
+        return thread
+
+    def test_socket(self, tmp_path):
+        dispatcher = INETDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSOCK(), gid='test_heartbeat',
+                                    heartbeat=0.05, hang_timeout=5)
+        dispatcher.create_job()
+        assert dispatcher.get_progress() is None and not dispatcher.is_hung()
+        def simulate(runner):
+            start = time.monotonic()
+            runner.progress = lambda: time.monotonic() - start
+            time.sleep(0.3)
+            runner.send({'loss': 0.5})
+        thread = self.run_socket(dispatcher, simulate)
+        assert dispatcher.recv() == {'loss': 0.5}
+        progress = dispatcher.get_progress()
+        assert progress['count'] >= 3 and progress['sim_time'] > 0 and progress['rss'] > 0
+        assert progress['wall_time'] >= progress['sim_time'] and not dispatcher.is_hung()
+        thread.join()
+        dispatcher.clean()
+
+    @pytest.mark.parametrize('stop', [False, True]) # stalled simulated time, no heartbeats
+    def test_hang(self, tmp_path, stop):
+        dispatcher = INETDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSOCK(), gid='test_hang',
+                                    heartbeat=0.05, hang_timeout=0.3)
+        dispatcher.create_job()
+        done = threading.Event()
+        def simulate(runner):
+            runner.progress = lambda: 10.0
+            stop and runner.stop_heartbeat()
+            done.wait(10)
+        thread = self.run_socket(dispatcher, simulate)
+        start = time.monotonic()
+        with pytest.raises(RuntimeError, match='hung'):
+            dispatcher.recv()
+        assert time.monotonic() - start < 5
+        done.set()
+        thread.join()
+        dispatcher.clean()
+
+    def test_sfs(self, tmp_path):
+        dispatcher = SFSDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSFS(), gid='test_heartbeat',
+                                   heartbeat=0.05, hang_timeout=0.5)
+        dispatcher.create_job()
+        runner = FileRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+        time.sleep(0.2)
+        progress = dispatcher.get_progress()
+        assert progress['count'] >= 2 and progress['sim_time'] is None and progress['age'] < 0.5
+        assert os.path.exists(dispatcher.handles[runtk.HBTOUT])
+        runner.close() # stops the heartbeats without sending a result
+        with pytest.raises(RuntimeError, match='hung'):
+            dispatcher.recv(timeout=10)
+        dispatcher.clean([runtk.SUBMIT])
+        assert not os.path.exists(dispatcher.handles[runtk.HBTOUT])
+
+    def test_schedule(self, tmp_path):
+        dispatcher = SFSDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSFS(), gid='test_schedule',
+                                   heartbeat=0.05, hang_timeout=0.3)
+        dispatcher.create_job()
+        runner = FileRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+        runner.stop_heartbeat() # as during h.psolve(), only the simulation's events send heartbeats
+        h = FakeH()
+        runner.schedule_heartbeat(h, step=1.0)
+        h.finitialize()
+        h.psolve(20, 0.025) # 0.5 seconds, above hang_timeout
+        progress = dispatcher.get_progress()
+        assert progress['count'] >= 5 and 15 <= progress['sim_time'] <= 20 and not dispatcher.is_hung()
+        runner.send_beat()
+        count = dispatcher.get_progress()['count']
+        runner.pulse() # within the heartbeat interval
+        assert dispatcher.get_progress()['count'] == count
+        runner.close()
+        dispatcher.clean([runtk.SUBMIT])
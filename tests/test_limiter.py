@@ -0,0 +1,31 @@
+import pytest
+from pubtk.runtk.limiters import ConcurrencyController
+
+
+class TestConcurrencyController:
+    def test_widen(self):
+        controller = ConcurrencyController(initial=2, maximum=6, target_wait=10)
+        limits = [controller.observe(wait=1, now=t) for t in range(8)] # jobs start immediately
+        assert limits == [3, 4, 5, 6, 6, 6, 6, 6]
+        assert controller.rate == 1.0
+
+    def test_shrink(self):
+        controller = ConcurrencyController(initial=16, target_wait=10, alpha=1)
+        assert controller.observe(wait=60, now=0) == 8 # jobs sit in the queue
+        for t in range(1, 8): # the trials in flight were submitted at the previous limit
+            assert controller.observe(wait=60, now=t) == 8
+        assert controller.observe(wait=60, now=8) == 4
+        assert controller.observe(wait=1, now=9) == 5 # the queue drained
+
+    def test_bounds(self):
+        controller = ConcurrencyController(initial=2, minimum=2, target_wait=10, alpha=1)
+        assert controller.observe(wait=60, now=0) == 2
+        assert controller.observe(runtime=5, now=1) == 2 # no wait observed, the limit is kept
+        assert ConcurrencyController(initial=100, maximum=8).limit == 8
+
+    def test_capacity(self):
+        controller = ConcurrencyController(initial=2, maximum=64, target_wait=10, alpha=1, headroom=1.5)
+        assert controller.capacity() == 64 # unknown throughput
+        for t in range(10): # one completion per 10 s, 20 s per trial: 2 in flight sustain the rate
+            controller.observe(wait=1, runtime=20, now=10 * t)
+        assert controller.capacity() == 3 and controller.limit == 3
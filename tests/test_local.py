@@ -0,0 +1,66 @@
+import pytest
+import os
+import sys
+import time
+from pubtk.runtk.dispatchers import LocalPoolDispatcher
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runner_scripts')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestLocalPoolDispatcher:
+    @pytest.fixture
+    def dispatcher_setup(self):
+        dispatcher = LocalPoolDispatcher(cmdstr="{} {}/nof_py.py".format(sys.executable, SCRIPTS),
+                                         env={'PYTHONPATH': ROOT}, gid='test_local')
+        dispatcher.update_env({'scale': 10})
+        return dispatcher
+
+    def test_run(self, dispatcher_setup):
+        dispatcher = dispatcher_setup
+        results = dict(dispatcher.run({'intvalue': i} for i in range(8)))
+        assert sorted(results) == list(range(8))
+        for index, proc in results.items():
+            value, cpus = proc.stdout.split()
+            assert proc.returncode == 0
+            assert value == str(index * 10)
+            if dispatcher.pin:
+                assert len(cpus.split(',')) == dispatcher.threads
+        assert 'PATH' not in dispatcher.env # os.environ is merged at run time, not copied
+
+    def test_concurrency(self):
+        dispatcher = LocalPoolDispatcher(cmdstr='true', threads=1, concurrency=2)
+        assert len(dispatcher.get_chunks()) == 2
+        dispatcher = LocalPoolDispatcher(cmdstr='true', threads=len(os.sched_getaffinity(0)) + 1)
+        assert dispatcher.concurrency == 1 and not dispatcher.pin
+
+    def test_pinning(self, dispatcher_setup):
+        dispatcher = dispatcher_setup
+        if not dispatcher.pin:
+            pytest.skip("not enough cores to pin")
+        chunk = dispatcher.get_chunks()[0]
+        cpus = ','.join(str(cpu) for cpu in sorted(chunk))
+        if dispatcher.taskset:
+            assert dispatcher.get_command(chunk)[:3] == [dispatcher.taskset, '-c', cpus]
+        assert dispatcher.get_command(None) == dispatcher.cmdstr.split()
+        dispatcher.taskset = None # the runner pins itself from CPUSET
+        dispatcher.concurrency = 1
+        index, proc = next(dispatcher.run([{'intvalue': 1}]))
+        assert proc.stdout.split() == ['10', cpus]
+
+    def test_close(self, tmp_path):
+        script = tmp_path / 'sleep_py.py'
+        script.write_text("import signal, time\nfrom pubtk.runtk import Runner\n"
+                          "signal.signal(signal.SIGTERM, signal.SIG_IGN) # only killed\n"
+                          "time.sleep(Runner().mappings['delay'])\n")
+        dispatcher = LocalPoolDispatcher(cmdstr="{} {}".format(sys.executable, script), env={'PYTHONPATH': ROOT},
+                                         concurrency=3, pin=False, kill_timeout=0.5, gid='test_close')
+        results = dispatcher.run({'delay': delay} for delay in [0, 60, 60, 60, 60])
+        start = time.monotonic()
+        index, proc = next(results)
+        while len(dispatcher.procs) < 2: # the other two subprocesses started
+            time.sleep(0.01)
+        procs = list(dispatcher.procs.values())
+        results.close() # i.e. breaking out of the loop
+        assert index == 0 and time.monotonic() - start < 10
+        for proc in procs:
+            assert proc.wait(timeout=10) == -9 # killed, not waited for
@@ -0,0 +1,37 @@
+import pytest
+from pubtk.runtk.dispatchers import format_env
+from pubtk.runtk.runners import Runner, LazyMappings, Encoded
+
+ENV = format_env({'intvalue': 2, 'floatvalue': 0.5, 'strvalue': 'three'})
+ENV.update({'JSONRUNTK9': 'cfg.weights=[1, 2, 3]', 'RUNTK10': 'untyped=[4, 5]'})
+
+class TestMappings:
+    def test_lazy(self):
+        runner = Runner(env=ENV, lazy=True)
+        assert runner._greptups is None and runner._mappings is None # grepped on first access
+        mappings = runner.mappings
+        assert isinstance(mappings, LazyMappings) and len(mappings) == 5
+        assert all(type(value) is Encoded for value in mappings.data.values())
+        assert mappings['floatvalue'] == 0.5
+        assert type(mappings.data['intvalue']) is Encoded # only the accessed mapping was deserialized
+        assert mappings['cfg.weights'] == [1, 2, 3] and mappings['untyped'] == [4, 5]
+        mappings = Runner(env={'BADRUNTK0': 'bad=1'}, lazy=True).mappings
+        with pytest.raises(KeyError): # unsupported types are raised on access
+            mappings['bad']
+
+    def test_eager(self):
+        eager, lazy = Runner(env=ENV).mappings, Runner(env=ENV, lazy=True).mappings
+        assert isinstance(eager, dict) and lazy == eager
+        merged = eager | Runner(env={'STRRUNTK0': 'strvalue=four'}, lazy=True).mappings
+        assert isinstance(merged, LazyMappings) and merged['strvalue'] == 'four' and merged['intvalue'] == 2
+
+    def test_schema(self):
+        env = {'RUNTK0': 'cfg.dt=1', 'RUNTK1': 'cfg.label=100', 'STRRUNTK2': 'cfg.seed=7'}
+        assert Runner(env=env).mappings == {'cfg.dt': 1, 'cfg.label': 100, 'cfg.seed': '7'} # inferred
+        schema = {'cfg.dt': float, 'cfg.label': 'STR', 'cfg.seed': int}
+        for lazy in (False, True):
+            mappings = Runner(env=env, lazy=lazy, schema=schema).mappings
+            assert mappings == {'cfg.dt': 1.0, 'cfg.label': '100', 'cfg.seed': 7}
+            assert isinstance(mappings['cfg.dt'], float)
+        with pytest.raises(KeyError):
+            Runner(env=env, schema={'cfg.dt': complex})
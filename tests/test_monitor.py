@@ -0,0 +1,80 @@
+import pytest
+import os
+import sys
+import subprocess
+from pubtk import runtk
+from pubtk.runtk.monitors import JobMonitor
+from pubtk.runtk.dispatchers import SFSDispatcher
+from pubtk.runtk.submits import ZSHSubmit, ZSHSubmitSFS, SGESubmit
+
+QSTAT = """\
+<?xml version='1.0'?>
+<job_info xmlns:xsd="http://arc.liv.ac.uk/repos/darcs/sge/source/dist/util/resources/schemas/qstat/qstat.xsd">
+  <queue_info>
+    <job_list state="running">
+      <JB_job_number>101</JB_job_number>
+      <state>r</state>
+    </job_list>
+    <job_list state="running">
+      <JB_job_number>103</JB_job_number>
+      <state>r</state>
+      <tasks>2</tasks>
+    </job_list>
+  </queue_info>
+  <job_info>
+    <job_list state="pending">
+      <JB_job_number>102</JB_job_number>
+      <state>Eqw</state>
+    </job_list>
+    <job_list state="pending">
+      <JB_job_number>103</JB_job_number>
+      <state>qw</state>
+      <tasks>3-7:2</tasks>
+    </job_list>
+  </job_info>
+</job_info>
+"""
+
+class TestQueryJobs:
+    def test_sge(self):
+        states = SGESubmit.parse_qstat(QSTAT, ['101', '102', '103.2', '103.5', '103.4', '104'])
+        assert states == {'101': runtk.RUNNING, '102': runtk.FAILED, '103.2': runtk.RUNNING, '103.5': runtk.QUEUED,
+                          '103.4': runtk.FINISHED, '104': runtk.FINISHED}
+
+    def test_zsh(self):
+        proc = subprocess.Popen(['sleep', '10'])
+        done = subprocess.Popen(['true'])
+        done.wait()
+        states = ZSHSubmit.query_jobs([str(proc.pid), str(done.pid)])
+        proc.kill()
+        proc.wait()
+        assert states == {str(proc.pid): runtk.RUNNING, str(done.pid): runtk.FINISHED}
+
+class TestJobMonitor:
+    def test_poll(self):
+        monitor = JobMonitor(interval=0.05)
+        proc = subprocess.Popen(['sleep', '10'])
+        monitor.register(ZSHSubmit(), proc.pid)
+        assert monitor.status(ZSHSubmit, proc.pid) == runtk.UNKNOWN
+        monitor.poll()
+        assert monitor.alive(ZSHSubmit, proc.pid)
+        proc.kill()
+        proc.wait()
+        monitor.poll()
+        assert monitor.status(ZSHSubmit, proc.pid) == runtk.FINISHED
+        monitor.unregister(ZSHSubmit, proc.pid)
+        assert monitor.jobs == {}
+        monitor.close()
+
+    def test_dead_job(self, tmp_path):
+        monitor = JobMonitor(interval=0.05)
+        submit = ZSHSubmitSFS()
+        submit.submit_template.template = "sh {output_path}/{label}.sh" # the script is POSIX compatible
+        submit.update_templates(command="{} -c 'import sys; sys.exit(1)'".format(sys.executable))
+        dispatcher = SFSDispatcher(project_path=str(tmp_path), submit=submit, monitor=monitor, gid='test_monitor')
+        dispatcher.update_env({'intvalue': 1})
+        dispatcher.run()
+        with pytest.raises(RuntimeError):
+            dispatcher.recv(timeout=10)
+        dispatcher.clean()
+        monitor.close()
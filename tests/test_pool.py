@@ -0,0 +1,40 @@
+import pytest
+import os
+import sys
+from pubtk.runtk.dispatchers import INETDispatcher
+from pubtk.runtk.submits import ZSHSubmitSOCK
+from pubtk.runtk.pools import WorkerPool
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runner_scripts')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestWorkerPool:
+    @pytest.fixture
+    def submit_setup(self):
+        submit = ZSHSubmitSOCK()
+        submit.submit_template.template = "sh {output_path}/{label}.sh" # the script is POSIX compatible
+        submit.update_templates(command="{} {}/worker_py.py".format(sys.executable, SCRIPTS))
+        return submit
+
+    def test_pool(self, tmp_path, submit_setup):
+        pool = WorkerPool(INETDispatcher, submit=submit_setup, project_path=str(tmp_path), size=3,
+                          label='test_pool', env={'scale': 10})
+        for dispatcher in pool.dispatchers:
+            dispatcher.update_env({'PYTHONPATH': ROOT}, format=False)
+        pool.start()
+        results = list(pool.map({'intvalue': i} for i in range(12)))
+        assert results == [str(i * 10) for i in range(12)]
+        pool.close()
+
+    def test_lost(self, tmp_path, submit_setup):
+        submit_setup.update_templates(command="sleep 5") # the workers never connect
+        pool = WorkerPool(INETDispatcher, submit=submit_setup, project_path=str(tmp_path), size=2,
+                          label='test_lost', env={'scale': 10}, timeout=0.5)
+        pool.start()
+        future = pool.submit({'intvalue': 1})
+        with pytest.raises(RuntimeError, match='did not connect'):
+            future.result(timeout=10)
+        assert pool.alive == 0
+        with pytest.raises(RuntimeError): # submitted after every worker is gone
+            pool.submit({'intvalue': 2}).result(timeout=0)
+        pool.close()
@@ -0,0 +1,72 @@
+import pytest
+import socket
+import threading
+from pubtk import runtk
+from pubtk.runtk.dispatchers import INETDispatcher, UNIXDispatcher, DispatcherServer
+from pubtk.runtk.submits import ZSHSubmitSOCK
+from pubtk.runtk.runners import SocketRunner
+from pubtk.utils import get_exports
+
+
+def runner_job(dispatcher, socket_type):
+    runner = SocketRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+    runner.connect(socket_type)
+    for step in (250, 500, 750):
+        runner.report(step, {'loss': 1000 / step})
+    runner.send('{"loss": 1.0}')
+    assert runner.recv() == runtk.CLOSE
+    runner.close()
+
+def start_runner(dispatcher, socket_type):
+    thread = threading.Thread(target=runner_job, args=(dispatcher, socket_type), daemon=True)
+    thread.start()
+    return thread
+
+class TestReport:
+    @pytest.mark.parametrize('dispatcher_constructor, socket_type', [(INETDispatcher, socket.AF_INET),
+                                                                     (UNIXDispatcher, socket.AF_UNIX)])
+    def test_reports(self, tmp_path, dispatcher_constructor, socket_type):
+        dispatcher = dispatcher_constructor(project_path=str(tmp_path), submit=ZSHSubmitSOCK(), gid='test_report')
+        dispatcher.create_job()
+        thread = start_runner(dispatcher, socket_type)
+        dispatcher.accept(timeout=10)
+        reports = list(dispatcher.reports())
+        assert reports == [{'step': 250, 'metrics': {'loss': 4.0}}, {'step': 500, 'metrics': {'loss': 2.0}},
+                           {'step': 750, 'metrics': {'loss': 1000 / 750}}]
+        assert list(dispatcher.reports()) == [] # the result was received
+        assert dispatcher.recv() == '{"loss": 1.0}'
+        dispatcher.send(runtk.CLOSE)
+        thread.join()
+        dispatcher.clean()
+
+    def test_recv(self, tmp_path):
+        server = DispatcherServer()
+        server.listen()
+        dispatcher = INETDispatcher(server=server, project_path=str(tmp_path), submit=ZSHSubmitSOCK(),
+                                    gid='test_report')
+        dispatcher.create_job()
+        thread = start_runner(dispatcher, socket.AF_INET)
+        dispatcher.accept(timeout=10)
+        assert dispatcher.recv() == '{"loss": 1.0}' # reports are kept
+        assert [report['step'] for report in dispatcher.reports()] == [250, 500, 750]
+        dispatcher.send(runtk.CLOSE)
+        thread.join()
+        dispatcher.clean()
+        server.close()
+
+    def test_no_reports(self, tmp_path):
+        dispatcher = INETDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSOCK(), gid='test_report')
+        dispatcher.create_job()
+        def runner_job():
+            runner = SocketRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+            runner.connect()
+            runner.send('result')
+            runner.close()
+        thread = threading.Thread(target=runner_job, daemon=True)
+        thread.start()
+        dispatcher.accept(timeout=10)
+        assert list(dispatcher.reports()) == []
+        assert dispatcher.recv() == 'result'
+        thread.join()
+        assert dispatcher.recv() is None # closed
+        dispatcher.clean()
@@ -0,0 +1,80 @@
+import pytest
+import array
+import socket
+import threading
+from pubtk import runtk
+from pubtk.runtk.dispatchers import SFSDispatcher, INETDispatcher
+from pubtk.runtk.submits import ZSHSubmitSFS, ZSHSubmitSOCK
+from pubtk.runtk.runners import FileRunner, SocketRunner
+from pubtk.runtk.results import Result, is_result
+from pubtk.runtk.buffers import ALIGNMENT
+from pubtk.runtk.caches import ResultCache
+from pubtk.utils import get_exports
+
+SPKT = array.array('d', [i * 0.025 for i in range(20000)])
+SPKID = array.array('i', [i % 100 for i in range(20000)])
+
+def check(result):
+    assert isinstance(result, Result)
+    assert result.metrics == {'loss': 0.5, 'rate': 12, 'label': 'trial'}
+    assert list(result.arrays) == ['spkt', 'spkid']
+    assert result['spkt'].tolist() == SPKT.tolist() and result['spkid'].tolist() == SPKID.tolist()
+
+class TestResult:
+    @pytest.fixture
+    def result(self):
+        return Result().update(loss=0.5, rate=12, label='trial', spkt=SPKT, spkid=SPKID)
+
+    def test_container(self, result):
+        data = result.to_bytes({'source': 'test'})
+        assert is_result(data) and not is_result(b'text')
+        assert len(data) < len(SPKT) * 8 + len(SPKID) * 4 + 2 * ALIGNMENT + 256 # raw buffers, not text
+        received = Result.from_bytes(bytes(data))
+        check(received)
+        assert received.meta == {'source': 'test'}
+        with pytest.raises(ValueError):
+            Result.from_bytes(b'{"loss": 0.5}')
+
+    def test_numpy(self):
+        numpy = pytest.importorskip('numpy')
+        result = Result().update(loss=numpy.float64(0.5), rates=numpy.arange(12.0).reshape(3, 4).T)
+        assert result.metrics == {'loss': 0.5} and type(result['loss']) is float
+        received = Result.from_bytes(result.to_bytes())
+        assert isinstance(received['rates'], numpy.ndarray) and (received['rates'] == result['rates']).all()
+        pandas = pytest.importorskip('pandas')
+        assert received.to_series()['loss'] == 0.5
+        assert list(Result(arrays={'a': numpy.arange(3)}).to_dataframe().columns) == ['a']
+
+    @pytest.mark.parametrize('compress', [None, 1000])
+    def test_sfs(self, tmp_path, result, compress):
+        dispatcher = SFSDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSFS(), gid='test_result',
+                                   timeline=True, compress=compress)
+        dispatcher.create_job()
+        runner = FileRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+        runner.result.update(result.to_dict())
+        runner.send(runner.result)
+        check(dispatcher.recv(timeout=10))
+        assert dispatcher.runner_timeline is not None and 'send' in dispatcher.runner_timeline.marks
+        dispatcher.clean([runtk.SUBMIT, runtk.MSGOUT, runtk.SGLOUT])
+
+    def test_socket(self, tmp_path, result):
+        dispatcher = INETDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSOCK(), gid='test_result')
+        dispatcher.create_job()
+        def runner_job():
+            runner = SocketRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+            runner.connect(socket.AF_INET)
+            runner.send(result)
+            runner.close()
+        thread = threading.Thread(target=runner_job, daemon=True)
+        thread.start()
+        dispatcher.accept(timeout=10)
+        check(dispatcher.recv())
+        thread.join()
+        dispatcher.clean()
+
+    def test_cache(self, tmp_path, result):
+        cache = ResultCache(str(tmp_path / 'cache'))
+        cache.put('abcdef', result)
+        cache.put('fedcba', 'text')
+        check(cache.get('abcdef'))
+        assert cache.get('fedcba') == 'text'
@@ -0,0 +1,59 @@
+import pytest
+import os
+import socket
+import threading
+from pubtk import runtk
+from pubtk.runtk.dispatchers import INETDispatcher, UNIXDispatcher, DispatcherServer
+from pubtk.runtk.submits import ZSHSubmitSOCK
+from pubtk.runtk.runners import SocketRunner
+from pubtk.runtk.sockets import HEADER, TEXT
+from pubtk.utils import get_exports
+
+
+def runner_job(dispatcher, socket_type):
+    runner = SocketRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+    runner.connect(socket_type)
+    runner.send(json_label(runner))
+    assert runner.recv() == 'goodbye'
+    runner.close()
+
+def json_label(runner):
+    return "{}:{}".format(runner.socket_gid, runner.mappings['value'])
+
+class TestDispatcherServer:
+    @pytest.mark.parametrize('socket_type', [socket.AF_INET, socket.AF_UNIX])
+    def test_route(self, tmp_path, socket_type):
+        socket_name = str(tmp_path / 'server.s') if socket_type == socket.AF_UNIX else None
+        server = DispatcherServer(socket_name=socket_name, socket_type=socket_type)
+        server.listen()
+        constructor = UNIXDispatcher if socket_type == socket.AF_UNIX else INETDispatcher
+        dispatchers = []
+        for i in range(16):
+            dispatcher = constructor(server=server, project_path=str(tmp_path), submit=ZSHSubmitSOCK(),
+                                     gid='test_server_{}'.format(i))
+            dispatcher.update_env({'value': i})
+            dispatcher.create_job()
+            dispatchers.append(dispatcher)
+        threads = [threading.Thread(target=runner_job, args=(dispatcher, socket_type), daemon=True)
+                   for dispatcher in reversed(dispatchers)] # connect out of order
+        for thread in threads:
+            thread.start()
+        for i, dispatcher in enumerate(dispatchers):
+            dispatcher.accept()
+            assert dispatcher.recv() == 'test_server_{}:{}'.format(i, i)
+            dispatcher.send('goodbye')
+        for thread in threads:
+            thread.join()
+        for dispatcher in dispatchers:
+            dispatcher.clean()
+        assert server.routes == {}
+        server.close()
+
+    def test_unknown(self, tmp_path):
+        server = DispatcherServer()
+        server.listen()
+        peer = socket.create_connection(server.name)
+        peer.sendall(HEADER.pack(TEXT, 0, 0, 7) + b'unknown')
+        assert peer.recv(1) == b'' # closed by server
+        peer.close()
+        server.close()
@@ -0,0 +1,53 @@
+import pytest
+import os
+import sys
+from array import array
+from pubtk import runtk
+from pubtk.runtk.dispatchers import SHMDispatcher
+from pubtk.runtk.submits import ZSHSubmitSFS
+from pubtk.runtk.runners import SHMRunner
+from pubtk.runtk.buffers import open_segment
+from pubtk.utils import get_exports
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runner_scripts')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestSHM:
+    @pytest.fixture
+    def dispatcher_setup(self, tmp_path):
+        submit = ZSHSubmitSFS()
+        submit.submit_template.template = "sh {output_path}/{label}.sh" # zsh may not be installed
+        submit.update_templates(command="{} {}/shm_py.py".format(sys.executable, SCRIPTS))
+        dispatcher = SHMDispatcher(project_path=str(tmp_path), submit=submit, gid='test_shm')
+        dispatcher.update_env({'PYTHONPATH': ROOT}, format=False)
+        yield dispatcher
+        dispatcher.clean()
+
+    def test_arrays(self, dispatcher_setup):
+        dispatcher = dispatcher_setup
+        dispatcher.create_job()
+        runner = SHMRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+        grid = memoryview(array('d', range(6))).cast('B').cast('d', [2, 3])
+        runner.send_arrays({'rates': array('d', [0.5, 1.5, 2.5])}, ids=array('i', [3, 2, 1]), grid=grid)
+        arrays = dispatcher.recv(timeout=10)
+        assert list(arrays['rates']) == [0.5, 1.5, 2.5]
+        assert list(arrays['ids']) == [3, 2, 1]
+        assert arrays['grid'].tolist() == [[0.0, 1.0, 2.0], [3.0, 4.0, 5.0]]
+        del arrays
+        dispatcher.clean()
+        with pytest.raises(FileNotFoundError):
+            open_segment(dispatcher.get_segment_name())
+
+    def test_text(self, dispatcher_setup):
+        dispatcher = dispatcher_setup
+        dispatcher.create_job()
+        SHMRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT])).send("text")
+        assert dispatcher.recv(timeout=10) == "text"
+
+    def test_run(self, dispatcher_setup):
+        dispatcher = dispatcher_setup
+        dispatcher.update_env({'n': 1000, 'scale': 0.5})
+        dispatcher.run()
+        arrays = dispatcher.recv(timeout=60) # the segment outlives the runner process
+        assert len(arrays['rates']) == 1000 and arrays['rates'][999] == 499.5
+        assert list(arrays['ids'][:3]) == [0, 1, 2]
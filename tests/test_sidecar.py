@@ -0,0 +1,43 @@
+import pytest
+import os
+from pubtk import runtk
+from pubtk.runtk.dispatchers import SFSDispatcher
+from pubtk.runtk.submits import ZSHSubmitSFS
+from pubtk.runtk.runners import FileRunner
+from pubtk.utils import get_exports
+
+
+class TestSidecar:
+    @pytest.fixture
+    def dispatcher_setup(self, tmp_path):
+        dispatcher = SFSDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSFS(), gid='test_sidecar', sidecar=True)
+        dispatcher.update_env({'intvalue': 2, 'floatvalue': 0.5, 'strvalue': 'three',
+                               'cfg.weights': [[i * j for j in range(100)] for i in range(100)]})
+        dispatcher.update_env({'forced': 1}, value_type='FLOAT')
+        return dispatcher
+
+    def test_sidecar(self, dispatcher_setup):
+        dispatcher = dispatcher_setup
+        dispatcher.create_job()
+        with open(dispatcher.handles[runtk.SUBMIT], 'r') as fptr:
+            script = fptr.read()
+        assert runtk.GREPSTR not in script and 'PRMFILE' in script
+        assert os.path.exists(dispatcher.handles[runtk.PARAMS])
+        runner = FileRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+        assert runner._mappings is None # loaded lazily
+        assert runner.mappings['intvalue'] == 2
+        assert runner.mappings['floatvalue'] == 0.5
+        assert runner.mappings['strvalue'] == 'three'
+        assert runner.mappings['forced'] == 1.0 and isinstance(runner.mappings['forced'], float)
+        assert runner.mappings['cfg.weights'][99][99] == 99 * 99
+        dispatcher.clean([runtk.SUBMIT, runtk.PARAMS])
+        assert not os.path.exists(dispatcher.handles[runtk.PARAMS])
+
+    def test_hash(self, dispatcher_setup, tmp_path):
+        dispatcher = dispatcher_setup
+        other = SFSDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSFS(), sidecar=True)
+        other.update_env({'forced': 1.0, 'cfg.weights': dispatcher.params['cfg.weights'],
+                          'strvalue': 'three', 'floatvalue': 0.5, 'intvalue': 2})
+        assert dispatcher.get_hash() == other.get_hash()
+        other.update_env({'intvalue': 3})
+        assert dispatcher.get_hash() != other.get_hash()
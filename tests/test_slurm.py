@@ -0,0 +1,95 @@
+import pytest
+import os
+import sys
+import shutil
+from pubtk import runtk
+from pubtk.runtk.dispatchers import SFSDispatcher, SFSArrayDispatcher
+from pubtk.runtk.submits import SLURMSubmit, SLURMSubmitSFS, SLURMArraySubmit, SLURMPackSubmit, scale_memory
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runner_scripts')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# local stand-ins for the SLURM commands, sbatch runs the script in the background (once per array task)
+SBATCH = """\
+#!{python}
+import os, re, sys, subprocess
+script = sys.argv[-1]
+with open(script) as fptr:
+    array = re.search(r'#SBATCH --array=1-(\\d+)', fptr.read())
+job = str(os.getpid())
+for task in range(1, int(array.group(1)) + 1) if array else [None]:
+    env = os.environ | {{'SLURM_JOB_ID': job}}
+    if task:
+        env |= {{'SLURM_ARRAY_JOB_ID': job, 'SLURM_ARRAY_TASK_ID': str(task)}}
+    subprocess.Popen(['{bash}', script], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+print("Submitted batch job {{}}".format(job))
+"""
+SRUN = """\
+#!{bash}
+while [ "${{1#--}}" != "$1" ]; do shift; done # drop the step options
+exec "$@"
+"""
+SQUEUE = """\
+#!{bash}
+exit 0
+"""
+
+@pytest.fixture
+def slurm(tmp_path, monkeypatch):
+    bash = shutil.which('bash')
+    if not bash:
+        pytest.skip("bash is required")
+    bin_path = tmp_path / 'bin'
+    bin_path.mkdir()
+    for name, script in {'sbatch': SBATCH, 'srun': SRUN, 'squeue': SQUEUE}.items():
+        (bin_path / name).write_text(script.format(python=sys.executable, bash=bash))
+        (bin_path / name).chmod(0o755)
+    monkeypatch.setenv('PATH', "{}:{}".format(bin_path, os.environ['PATH']))
+    monkeypatch.setenv('PYTHONPATH', ROOT)
+    monkeypatch.setenv('HOME', str(tmp_path)) # the scripts source ~/.bashrc
+    return tmp_path
+
+def get_command():
+    return "{} {}/file_py.py".format(sys.executable, SCRIPTS)
+
+class TestSLURMSubmit:
+    def test_sfs(self, slurm):
+        submit = SLURMSubmitSFS()
+        submit.update_templates(command=get_command(), cores=1, vmem='1G')
+        dispatcher = SFSDispatcher(project_path=str(slurm), submit=submit, gid='test_slurm')
+        dispatcher.update_env({'intvalue': 3, 'scale': 2})
+        dispatcher.run()
+        assert int(dispatcher.job_id) > 0
+        assert dispatcher.recv(timeout=10) == '6'
+        dispatcher.clean([runtk.MSGOUT, runtk.SGLOUT])
+
+    @pytest.mark.parametrize('submit_constructor', [SLURMArraySubmit, SLURMPackSubmit])
+    def test_tasks(self, slurm, submit_constructor):
+        submit = submit_constructor()
+        submit.update_templates(command=get_command(), cores=1, vmem='1G')
+        dispatcher = SFSArrayDispatcher(project_path=str(slurm), submit=submit, gid='test_slurm_tasks')
+        dispatcher.update_env({'scale': 10})
+        for i in range(4):
+            dispatcher.add_task({'intvalue': i})
+        dispatcher.run()
+        assert dispatcher.tasks[2].job_id == "{}.3".format(dispatcher.job_id)
+        assert dispatcher.recv(timeout=10) == [str(i * 10) for i in range(4)]
+        dispatcher.clean([runtk.MSGOUT, runtk.SGLOUT, runtk.TABLE])
+
+    def test_query(self, slurm):
+        assert SLURMSubmit.query_jobs(['1234', '1234.2']) == {'1234': runtk.FINISHED, '1234.2': runtk.FINISHED}
+        squeue = "1234_1 R\n1234_[3-5%2] PD\n1240 F\n1241 CG\n"
+        states = SLURMSubmit.parse_squeue(squeue, ['1234.1', '1234.2', '1234.4', '1240', '1241', '1242'])
+        assert states == {'1234.1': runtk.RUNNING, '1234.2': runtk.FINISHED, '1234.4': runtk.QUEUED,
+                          '1240': runtk.FAILED, '1241': runtk.RUNNING, '1242': runtk.FINISHED}
+
+    def test_pack_memory(self, slurm):
+        submit = SLURMPackSubmit()
+        submit.update_templates(command=get_command(), cores=1, vmem='1.5G')
+        submit.create_job(table=[{}] * 3, label='test_pack', project_path=str(slurm), output_path=str(slurm), env={})
+        assert '#SBATCH --mem=5G\n' in submit.script # the allocation holds every trial
+        assert 'srun --exact --ntasks=1 --cpus-per-task=1 --mem=1.5G ' in submit.script # each trial
+        assert scale_memory(512, 4) == '2048' and scale_memory('2gb', 2) == '4G'
+        with pytest.raises(ValueError):
+            scale_memory('lots', 2)
@@ -1,6 +1,7 @@
 import pytest
 import logging
-from pubtk.runtk.sockets import INETSocket
+import threading
+from pubtk.runtk.sockets import INETSocket, HEADER, TEXT, JSON, BYTES
 
 logger = logging.getLogger('test')
 logger.setLevel(logging.INFO)
@@ -24,3 +25,64 @@ class TestSocket:
         assert sock1.recv() == "hello"
         sock0.close()
         sock1.close()
+
+class TestFraming:
+    @pytest.fixture
+    def connection_setup(self):
+        server, client = INETSocket(), INETSocket()
+        server.listen()
+        client.connect(server.name)
+        server.accept()
+        yield server, client
+        server.close()
+        client.close()
+
+    def test_types(self, connection_setup):
+        server, client = connection_setup
+        client.send("text")
+        client.send({'loss': 0.5, 'data': [1, 2]})
+        client.send(b'\x00\x01bytes')
+        client.send(memoryview(bytearray(b'view')))
+        client.send("json string", frame_type=JSON, flags=6)
+        assert server.recv() == "text"
+        assert server.recv() == {'loss': 0.5, 'data': [1, 2]}
+        assert server.recv() == bytearray(b'\x00\x01bytes')
+        assert server.recv() == bytearray(b'view')
+        assert server.recv_frame() == (JSON, 6, b'', bytearray(b'"json string"'))
+
+    def test_partial_header(self, connection_setup):
+        server, client = connection_setup
+        frame = HEADER.pack(TEXT, 0, 0, 5) + b'hello'
+        for i in range(len(frame)): # the header arrives one byte at a time
+            client.connection.sendall(frame[i:i + 1])
+        assert server.recv() == "hello"
+
+    def test_large(self, connection_setup):
+        server, client = connection_setup
+        payload = bytes(range(256)) * 40000 # ~10 MB, larger than the socket buffers
+        thread = threading.Thread(target=client.send, args=(payload,))
+        thread.start()
+        buffer = bytearray(len(payload) + 16)
+        assert server.recv_into(buffer) == (BYTES, 0, b'', len(payload))
+        thread.join()
+        assert buffer[:len(payload)] == payload
+        client.send(b'too large')
+        with pytest.raises(ValueError):
+            server.recv_into(bytearray(4))
+
+    def test_array(self, connection_setup):
+        numpy = pytest.importorskip('numpy')
+        server, client = connection_setup
+        array = numpy.arange(12, dtype=numpy.float32).reshape(3, 4)
+        client.send(array)
+        client.send(array.T) # not contiguous
+        assert (server.recv() == array).all()
+        received = server.recv()
+        assert received.shape == (4, 3) and (received == array.T).all()
+
+    def test_closed(self, connection_setup):
+        server, client = connection_setup
+        client.connection.sendall(HEADER.pack(TEXT, 0, 0, 5) + b'he') # closed mid frame
+        client.connection.close()
+        client.connection = None
+        assert server.recv() is None
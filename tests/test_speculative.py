@@ -0,0 +1,102 @@
+import pytest
+import os
+import sys
+import time
+import threading
+from pubtk import runtk
+from pubtk.runtk.dispatchers import SFSDispatcher
+from pubtk.runtk.submits import ZSHSubmit, ZSHSubmitSFS
+from pubtk.runtk.pools import SpeculativePool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, 'tests', 'runner_scripts')
+
+class EventDispatcher(object):
+    """
+    dispatcher whose attempts are driven by events: (result, error) are set in OUTCOMES[gid] to finish an attempt
+    """
+    gids = []
+    outcomes = {}
+
+    def __init__(self, gid, **kwargs):
+        self.gid = self.label = gid
+        self.event = threading.Event()
+        EventDispatcher.gids.append(gid)
+        EventDispatcher.outcomes[gid] = self
+
+    def update_env(self, dictionary, value_type=None):
+        pass
+
+    def run(self):
+        pass
+
+    def accept(self, timeout=None):
+        pass
+
+    def recv(self):
+        self.event.wait(10)
+        if self.error:
+            raise self.error
+        return self.data
+
+    def finish(self, data=None, error=None):
+        self.data, self.error = data, error
+        self.event.set()
+
+    def cancel(self):
+        self.finish(error=RuntimeError("cancelled"))
+
+    def clean(self, handles=None):
+        pass
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class TestSpeculative:
+    @pytest.fixture
+    def pool_setup(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('PYTHONPATH', ROOT)
+        submit = ZSHSubmitSFS()
+        submit.submit_template.template = "sh {output_path}/{label}.sh" # zsh may not be installed
+        submit.update_templates(command="{} {}/straggler_py.py".format(sys.executable, SCRIPTS))
+        pool = SpeculativePool(SFSDispatcher, submit=submit, project_path=str(tmp_path), label='test_speculative',
+                               env={'marker': str(tmp_path / 'straggled')}, factor=2.0, min_completed=3,
+                               interval=0.1, handles=[runtk.SUBMIT, runtk.MSGOUT, runtk.SGLOUT])
+        yield pool
+        pool.close()
+
+    def test_straggler(self, pool_setup, tmp_path):
+        pool = pool_setup
+        start = time.monotonic()
+        futures = [pool.submit({'index': i, 'straggle': int(i == 0)}) for i in range(4)]
+        assert [future.result(timeout=20) for future in futures] == ['0', '1', '2', '3']
+        assert time.monotonic() - start < 20 # the straggler (sleeping 30s) lost to its duplicate
+        assert pool.duplicated == 1 and pool.trials == []
+        assert os.path.exists(tmp_path / 'straggled')
+        assert not os.path.exists(tmp_path / 'test_speculative_0_1.out') # the attempts were cleaned
+
+    def test_threshold(self, pool_setup):
+        pool = pool_setup
+        assert pool.get_threshold() is None and pool.speculate() == 0
+        pool.runtimes = [1.0, 3.0, 2.0]
+        assert pool.get_threshold() == 4.0
+
+    def test_failed_attempt(self):
+        pool = SpeculativePool(EventDispatcher, submit=None, project_path='.', label='trial', duplicates=2,
+                               min_completed=1, interval=100)
+        pool.runtimes = [0.001]
+        future = pool.submit({'index': 0})
+        trial = pool.trials[0]
+        assert pool.speculate(now=time.monotonic() + 1) == 1
+        EventDispatcher.outcomes['trial_0'].finish(error=RuntimeError("node failure")) # the duplicate still runs
+        assert wait_for(lambda: len(trial.attempts) == 1)
+        assert pool.speculate(now=time.monotonic() + 1) == 1
+        assert pool.speculate(now=time.monotonic() + 1) == 0 # duplicates are capped, failed ones included
+        assert EventDispatcher.gids == ['trial_0', 'trial_0_1', 'trial_0_2'] # no gid is reused
+        EventDispatcher.outcomes['trial_0_1'].finish(data='result')
+        assert future.result(timeout=10) == 'result' and pool.duplicated == 2
+        assert wait_for(lambda: EventDispatcher.outcomes['trial_0_2'].event.is_set()) # the loser was cancelled
+        pool.close()
@@ -1,7 +1,7 @@
 import pytest
 import os
 from pubtk import runtk
-from pubtk.runtk.submits import Submit
+from pubtk.runtk.submits import Submit, serializers
 from pubtk.utils import get_port_info
 import logging
 import json
@@ -45,3 +45,22 @@ class TestSubmit:
         handles = submit.get_handles()
         logger.info("handles:\n{}".format(json.dumps(handles)))
         logger.info(submit)
+
+class TestTemplate:
+    @pytest.mark.parametrize('submit', [runtk.ZSHSubmitSFS(), runtk.SGESubmitSOCK(), runtk.SGEArraySubmit()])
+    def test_render(self, submit):
+        kwargs = {'project_path': '/tmp/foo', 'output_path': '/tmp/foo/out', 'label': 'test', 'cores': 4,
+                  'env': {'INTRUNTK0': 'foo=1', 'STRRUNTK1': 'bar=baz'}}
+        jobs = submit.format_jobs([kwargs | {'label': 'test{}'.format(i)} for i in range(3)])
+        for i, job in enumerate(jobs):
+            legacy = [template.format_str(kwargs | {'label': 'test{}'.format(i), 'env': serializers['sh'](kwargs['env'])})
+                      for template in submit.templates]
+            assert list(job) == legacy
+            assert '{command}' in job.script # missing keys are kept as placeholders
+
+    def test_update(self):
+        template = runtk.Template("{a} {b!r} {c:>4} {{d}}")
+        assert template.format(a=1, b='x', c=2) == "1 'x'    2 {d}"
+        assert template.format(a=1) == "1 {b!r} {c:>4} {d}"
+        template.update(a='A')
+        assert template.format(b='y') == "A 'y' {c:>4} {d}"
@@ -0,0 +1,128 @@
+import pytest
+import os
+import sys
+import json
+import socket
+import threading
+from pubtk import runtk
+from pubtk.runtk.dispatchers import SFSDispatcher, INETDispatcher
+from pubtk.runtk.submits import ZSHSubmitSFS, ZSHSubmitSOCK
+from pubtk.runtk.runners import FileRunner, SocketRunner
+from pubtk.utils import get_exports
+from pubtk.runtk.timelines import Timeline, merge_timelines, DISPATCHER, RUNNER
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runner_scripts')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def get_dispatcher(dispatcher_constructor, submit, path, script, label, timeline=True):
+    submit.submit_template.template = "sh {output_path}/{label}.sh" # zsh may not be installed
+    submit.update_templates(command="{} {}/{}".format(sys.executable, SCRIPTS, script))
+    dispatcher = dispatcher_constructor(project_path=str(path), submit=submit, gid=label, timeline=timeline)
+    dispatcher.update_env({'PYTHONPATH': ROOT}, format=False)
+    return dispatcher
+
+class TestTimeline:
+    def test_frame(self):
+        timeline = Timeline(RUNNER)
+        timeline.mark('start')
+        timeline.mark('send')
+        data, received = Timeline.unframe(timeline.frame('{"loss": 1.0}\nsecond line'))
+        assert data == '{"loss": 1.0}\nsecond line'
+        assert received.source == RUNNER and received.marks == timeline.marks
+        assert received.anchor == timeline.anchor
+        assert Timeline.unframe('{"loss": 1.0}') == ('{"loss": 1.0}', None)
+        assert Timeline.unframe(None) == (None, None)
+
+    def test_merge(self):
+        dispatcher = Timeline(DISPATCHER, anchor=100.0, marks={'init_run': 1.0, 'create_job': 1.5,
+                                                               'submit_job': 2.0, 'recv': 10.0, 'clean': 10.5})
+        runner = Timeline(RUNNER, anchor=50.0, marks={'start': 53.0, 'send': 59.0}) # another clock
+        record = merge_timelines(dispatcher, runner, label='trial')
+        assert record['label'] == 'trial' and record['start'] == 101.0
+        assert [(entry['source'], entry['phase']) for entry in record['phases']] == [
+            (DISPATCHER, 'init_run'), (DISPATCHER, 'create_job'), (DISPATCHER, 'submit_job'), (RUNNER, 'start'),
+            (RUNNER, 'send'), (DISPATCHER, 'recv'), (DISPATCHER, 'clean')]
+        durations = record['durations']
+        assert durations['render'] == 0.5 and durations['queue'] == 1.0 and durations['run'] == 6.0
+        assert durations['transfer'] == 1.0 and durations['total'] == 9.5
+        assert 'simulate' not in durations # the runner did not connect
+        json.dumps(record)
+        assert merge_timelines(None, label='empty') == {'label': 'empty', 'start': None, 'phases': [], 'durations': {}}
+
+    def test_sfs(self, tmp_path):
+        dispatcher = get_dispatcher(SFSDispatcher, ZSHSubmitSFS(), tmp_path, 'file_py.py', 'test_timeline_sfs')
+        dispatcher.update_env({'intvalue': 3, 'scale': 2})
+        dispatcher.run()
+        assert dispatcher.recv(timeout=60) == '6'
+        dispatcher.clean()
+        record = dispatcher.get_timeline()
+        assert record['label'] == 'test_timeline_sfs'
+        phases = [entry['phase'] for entry in record['phases'] if entry['source'] == DISPATCHER]
+        assert phases == ['init_run', 'create_job', 'submit_job', 'first_byte', 'recv', 'clean']
+        assert dispatcher.runner_timeline and set(dispatcher.runner_timeline.marks) == {'start', 'send'}
+        for duration in ('render', 'submit', 'queue', 'run', 'transfer', 'receive', 'total'):
+            assert record['durations'][duration] >= 0, duration
+
+    def test_socket(self, tmp_path):
+        dispatcher = get_dispatcher(INETDispatcher, ZSHSubmitSOCK(), tmp_path, 'socket_py.py', 'test_timeline_inet')
+        dispatcher.update_env({'intvalue': 1, 'fltvalue': 0.5})
+        dispatcher.run()
+        dispatcher.accept(timeout=60)
+        dispatcher.send('hello')
+        assert json.loads(dispatcher.recv()) == {'intvalue': 1, 'fltvalue': 0.5}
+        assert dispatcher.recv() == '1.5'
+        dispatcher.send(runtk.CLOSE)
+        dispatcher.clean()
+        record = dispatcher.get_timeline()
+        assert set(dispatcher.runner_timeline.marks) == {'start', 'connect', 'send'}
+        for duration in ('queue', 'connect', 'accept', 'simulate', 'transfer', 'total'):
+            assert duration in record['durations'], duration
+
+    def socket_exchange(self, tmp_path, data):
+        dispatcher = INETDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSOCK(), gid='test_timeline_payload',
+                                    timeline=True)
+        dispatcher.create_job()
+        def runner_job():
+            runner = SocketRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+            runner.connect(socket.AF_INET)
+            runner.send(data)
+            runner.close()
+        thread = threading.Thread(target=runner_job, daemon=True)
+        thread.start()
+        dispatcher.accept(timeout=10)
+        received = dispatcher.recv()
+        thread.join()
+        dispatcher.clean()
+        assert set(dispatcher.runner_timeline.marks) == {'start', 'connect', 'send'}
+        return received
+
+    def test_payloads(self, tmp_path):
+        assert self.socket_exchange(tmp_path, {'loss': 1.0, 'rates': [1, 2]}) == {'loss': 1.0, 'rates': [1, 2]}
+        assert self.socket_exchange(tmp_path, b'\x00\x01raw') == b'\x00\x01raw'
+        assert self.socket_exchange(tmp_path, '{"loss": 1.0}') == '{"loss": 1.0}'
+
+    def test_array(self, tmp_path):
+        numpy = pytest.importorskip('numpy')
+        array = numpy.arange(12, dtype='float32').reshape(3, 4)
+        received = self.socket_exchange(tmp_path, array)
+        assert received.dtype == array.dtype and (received == array).all()
+
+    def test_file_payload(self, tmp_path):
+        dispatcher = SFSDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSFS(), gid='test_timeline_file',
+                                   timeline=True)
+        dispatcher.create_job()
+        runner = FileRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+        with pytest.raises(TypeError):
+            runner.send({'loss': 1.0}) # file results are text
+        dispatcher.clean([runtk.SUBMIT])
+
+    def test_untimed(self, tmp_path):
+        dispatcher = get_dispatcher(SFSDispatcher, ZSHSubmitSFS(), tmp_path, 'file_py.py', 'test_untimed', False)
+        dispatcher.update_env({'intvalue': 3, 'scale': 2})
+        dispatcher.run()
+        with open(dispatcher.handles[runtk.SUBMIT], 'r') as fptr:
+            assert 'TIMELINE' not in fptr.read()
+        assert dispatcher.recv(timeout=60) == '6'
+        dispatcher.clean()
+        assert dispatcher.runner_timeline is None
+        assert 'total' in dispatcher.get_timeline()['durations']
@@ -0,0 +1,53 @@
+import pytest
+import os
+import threading
+from pubtk import runtk
+from pubtk.runtk.watchers import SFSWatcher
+from pubtk.runtk.dispatchers import SFSDispatcher
+from pubtk.runtk.submits import ZSHSubmitSFS
+from pubtk.runtk.runners import FileRunner
+from pubtk.utils import get_exports
+
+
+class TestSFSWatcher:
+    @pytest.mark.parametrize('inotify', [True, False])
+    def test_watch(self, tmp_path, inotify):
+        watcher = SFSWatcher(min_interval=0.01, max_interval=0.1, inotify=inotify)
+        paths = [str(tmp_path / '{}.sgl'.format(i)) for i in range(32)]
+        completed = []
+        futures = [watcher.watch(path, callback=lambda future: completed.append(future.result())) for path in paths]
+        open(paths[0], 'w').close()
+        assert futures[0].result(timeout=5) == paths[0]
+        threading.Timer(0.05, lambda: [open(path, 'w').close() for path in paths[1:]]).start()
+        assert [future.result(timeout=5) for future in futures] == paths
+        assert sorted(completed) == sorted(paths)
+        assert watcher.pending == {}
+        watcher.close()
+
+    def test_existing(self, tmp_path):
+        watcher = SFSWatcher()
+        path = str(tmp_path / 'done.sgl')
+        open(path, 'w').close()
+        assert watcher.watch(path).done()
+        watcher.close()
+
+    def test_unwatch(self, tmp_path):
+        watcher = SFSWatcher()
+        path = str(tmp_path / 'never.sgl')
+        future = watcher.watch(path)
+        watcher.unwatch(path)
+        assert future.cancelled()
+        assert watcher.pending == {}
+        watcher.close()
+
+class TestSFSDispatcher:
+    def test_recv(self, tmp_path):
+        dispatcher = SFSDispatcher(project_path=str(tmp_path), submit=ZSHSubmitSFS(), gid='test_watcher')
+        dispatcher.update_env({'intvalue': 2})
+        dispatcher.create_job()
+        with pytest.raises(TimeoutError):
+            dispatcher.recv(timeout=0.1)
+        runner = FileRunner(env=get_exports(dispatcher.handles[runtk.SUBMIT]))
+        threading.Timer(0.05, runner.send, args=(str(runner.mappings['intvalue']),)).start()
+        assert dispatcher.recv(timeout=5) == '2'
+        dispatcher.clean([runtk.MSGOUT, runtk.SGLOUT])
@@ -0,0 +1,95 @@
+import pytest
+import json
+import os
+import sys
+import time
+from pubtk import runtk
+from pubtk.runtk.dispatchers import SFSDispatcher, LocalPoolDispatcher
+from pubtk.runtk.submits import ZSHSubmit, ZSHForkSubmitSFS
+from pubtk.runtk.zygotes import ForkClient, start_fork_server, parse_command, parse_script
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runner_scripts')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def fork_server(tmp_path):
+    socket_name = str(tmp_path / 'zygote.s')
+    proc = start_fork_server(socket_name, preload=['pubtk.runtk', 'json'], env=os.environ | {'PYTHONPATH': ROOT})
+    yield socket_name
+    ForkClient(socket_name).stop()
+    proc.wait(timeout=10)
+
+class TestForkServer:
+    def test_parse(self):
+        assert parse_command('python3.11 runner.py -x 1') == (['runner.py', '-x', '1'], True)
+        assert parse_command('/usr/bin/python -m netpyne.run') == (['-m', 'netpyne.run'], True)
+        assert parse_command('sleep 30') == (['sleep', '30'], False)
+        cwd, env, command, stdout = parse_script(ZSHSubmit.script_template.format(
+            project_path='/project', output_path='/out', label='job', command='python runner.py',
+            env='\nexport FLTRUNTK0="cfg.x=1.0"'))
+        assert (cwd, command, stdout) == ('/project', 'python runner.py', '/out/job.run')
+        assert env == {'JOBID': '$$', 'FLTRUNTK0': 'cfg.x=1.0'}
+
+    def test_ping(self, fork_server):
+        reply = ForkClient(fork_server).ping()
+        assert reply['preload'] == ['pubtk.runtk', 'json'] and reply['pid'] != os.getpid()
+
+    def test_popen(self, fork_server, tmp_path):
+        client = ForkClient(fork_server)
+        proc = client.popen("{} -c pass".format(sys.executable)) # not a script, exec'd
+        assert proc.communicate() == ('', '') and proc.returncode == 0
+        script = tmp_path / 'exit.py'
+        script.write_text("import sys, os\nprint(os.getcwd(), os.environ['VALUE'])\nsys.exit(3)\n")
+        proc = client.popen("python {}".format(script), env={'VALUE': 'forked'}, cwd=str(tmp_path))
+        stdout, stderr = proc.communicate()
+        assert proc.returncode == 3 and stdout.split() == [str(tmp_path), 'forked']
+        script.write_text("raise ValueError('failed')\n")
+        proc = client.popen(["python", str(script)])
+        stdout, stderr = proc.communicate()
+        assert proc.returncode == 1 and 'ValueError: failed' in stderr
+
+    def test_submit(self, fork_server, tmp_path):
+        submit = ZSHForkSubmitSFS(socket_name=fork_server)
+        submit.update_templates(command="python {}/file_py.py".format(SCRIPTS))
+        dispatcher = SFSDispatcher(project_path=str(tmp_path), submit=submit, gid='test_zygote')
+        dispatcher.update_env({'intvalue': 3, 'scale': 2})
+        dispatcher.run()
+        assert dispatcher.recv(timeout=30) == '6'
+        dispatcher.clean([runtk.MSGOUT, runtk.SGLOUT])
+
+    def test_env(self, fork_server, tmp_path):
+        script = tmp_path / 'env_py.py'
+        script.write_text("import os, json\nfrom pubtk.runtk import FileRunner\n"
+                          "runner = FileRunner()\nrunner.send(json.dumps(dict(os.environ)))\nrunner.close()\n")
+        submit = ZSHForkSubmitSFS(socket_name=fork_server)
+        submit.update_templates(command="python {}".format(script))
+        dispatcher = SFSDispatcher(project_path=str(tmp_path), submit=submit, gid='test_env')
+        dispatcher.update_env({'intvalue': 3})
+        dispatcher.run()
+        env = json.loads(dispatcher.recv(timeout=30))
+        assert env['JOBID'] == str(submit.job_id) # not '$$'
+        assert env['OUTFILE'] == dispatcher.handles[runtk.MSGOUT] and env['INTRUNTK0'] == 'intvalue=3'
+        dispatcher.clean([runtk.MSGOUT, runtk.SGLOUT])
+
+    def test_cancel(self, fork_server, tmp_path):
+        submit = ZSHForkSubmitSFS(socket_name=fork_server)
+        submit.update_templates(command="sleep 30")
+        dispatcher = SFSDispatcher(project_path=str(tmp_path), submit=submit, gid='test_zygote_cancel')
+        dispatcher.update_env({'intvalue': 1})
+        dispatcher.run()
+        job_id = str(dispatcher.job_id)
+        assert ZSHSubmit.query_jobs([job_id])[job_id] == runtk.RUNNING
+        assert dispatcher.cancel()
+        deadline = time.monotonic() + 10
+        while ZSHSubmit.query_jobs([job_id])[job_id] != runtk.FINISHED and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert ZSHSubmit.query_jobs([job_id])[job_id] == runtk.FINISHED
+        dispatcher.clean()
+
+    def test_pool(self, fork_server):
+        dispatcher = LocalPoolDispatcher(cmdstr="{} {}/nof_py.py".format(sys.executable, SCRIPTS),
+                                         gid='test_zygote_pool', fork_server=fork_server)
+        dispatcher.update_env({'scale': 10})
+        results = dict(dispatcher.run({'intvalue': i} for i in range(6)))
+        for index, proc in results.items():
+            assert proc.returncode == 0 and proc.stdout.split()[0] == str(index * 10)